@@ -0,0 +1,317 @@
+#!/usr/bin/env node
+import * as fs from 'fs';
+import { performance } from 'perf_hooks';
+import { AsyncTaskScheduler } from '../src/scheduler/AsyncTaskScheduler';
+import { IndexedPriorityQueue } from '../src/scheduler/IndexedPriorityQueue';
+import { NumericPriorityQueue } from '../src/scheduler/NumericPriorityQueue';
+import { PriorityQueue, PriorityQueueMode } from '../src/scheduler/PriorityQueue';
+import { SchedulerStatsSnapshot } from '../src/scheduler/SchedulerStats';
+import { ScheduledTask, TaskScheduler } from '../src/scheduler/TaskScheduler';
+
+interface BenchmarkResult {
+  subject: string;
+  backend: string;
+  tasks: number;
+  scheduleOpsPerSec: number;
+  cancelOpsPerSec: number;
+  dispatchOpsPerSec: number;
+  lagP50Ms: number | null;
+  lagP99Ms: number | null;
+}
+
+interface Regression {
+  key: string;
+  metric: string;
+  baseline: number;
+  current: number;
+}
+
+interface BenchmarkedScheduler {
+  schedule(task: ScheduledTask): void;
+  cancelTask(taskId: string): boolean;
+  start(): Promise<void>;
+  stop(): void;
+  pendingCount(): number;
+  getStats(): SchedulerStatsSnapshot;
+}
+
+interface SchedulerBackend {
+  subject: string;
+  backend: string;
+  create: () => BenchmarkedScheduler;
+}
+
+const THROUGHPUT_METRICS: Array<keyof BenchmarkResult> = ['scheduleOpsPerSec', 'cancelOpsPerSec', 'dispatchOpsPerSec'];
+const POLL_INTERVAL_MS = 10;
+const LAG_SAMPLE = 10000;
+const LAG_WINDOW_MS = 1000;
+const PRIORITY_LEVELS = 10;
+
+const SCHEDULER_BACKENDS: SchedulerBackend[] = [
+  { subject: 'TaskScheduler', backend: 'heap', create: () => new TaskScheduler({ pollInterval: POLL_INTERVAL_MS }) },
+  { subject: 'TaskScheduler', backend: 'wheel', create: () => new TaskScheduler({ pollInterval: POLL_INTERVAL_MS, timeIndex: 'wheel' }) },
+  { subject: 'AsyncTaskScheduler', backend: 'concurrency-1', create: () => new AsyncTaskScheduler() },
+  { subject: 'AsyncTaskScheduler', backend: 'concurrency-64', create: () => new AsyncTaskScheduler({ maxConcurrency: 64 }) }
+];
+
+const noop = async () => {};
+
+/**
+ * Tasks with mixed priorities whose `executeAt` values are scattered over
+ * `spreadMs` from `start` by a multiplicative hash, so runs are reproducible.
+ */
+function makeTasks(count: number, start: number, spreadMs: number, prefix: string = 'task'): ScheduledTask[] {
+  const tasks: ScheduledTask[] = [];
+  for (let i = 0; i < count; i++) {
+    tasks.push({
+      id: `${prefix}_${i}`,
+      name: 'bench',
+      executeAt: new Date(start + ((i * 2654435761) % Math.max(1, spreadMs))),
+      priority: i % PRIORITY_LEVELS,
+      handler: noop
+    });
+  }
+  return tasks;
+}
+
+function opsPerSec(ops: number, ms: number): number {
+  return Math.round(ops / (Math.max(ms, 0.001) / 1000));
+}
+
+function benchmarkPriorityQueue(count: number, mode: PriorityQueueMode): BenchmarkResult {
+  const queue = new PriorityQueue<number>({ mode });
+  const enqueueStart = performance.now();
+  for (let i = 0; i < count; i++) {
+    queue.enqueue(i, (i * 2654435761) % PRIORITY_LEVELS);
+  }
+  const enqueueMs = performance.now() - enqueueStart;
+  const dequeueStart = performance.now();
+  while (queue.dequeue() !== null) {
+    // drain
+  }
+  const dequeueMs = performance.now() - dequeueStart;
+  return {
+    subject: 'PriorityQueue',
+    backend: mode === 'heap' ? 'binary-heap' : 'bucket-queue',
+    tasks: count,
+    scheduleOpsPerSec: opsPerSec(count, enqueueMs),
+    cancelOpsPerSec: 0,
+    dispatchOpsPerSec: opsPerSec(count, dequeueMs),
+    lagP50Ms: null,
+    lagP99Ms: null
+  };
+}
+
+function benchmarkNumericPriorityQueue(count: number): BenchmarkResult {
+  const queue = new NumericPriorityQueue();
+  const enqueueStart = performance.now();
+  for (let i = 0; i < count; i++) {
+    queue.enqueue(i, (i * 2654435761) % PRIORITY_LEVELS);
+  }
+  const enqueueMs = performance.now() - enqueueStart;
+  const dequeueStart = performance.now();
+  while (queue.dequeue() !== null) {
+    // drain
+  }
+  const dequeueMs = performance.now() - dequeueStart;
+  return {
+    subject: 'NumericPriorityQueue',
+    backend: 'typed-array-heap',
+    tasks: count,
+    scheduleOpsPerSec: opsPerSec(count, enqueueMs),
+    cancelOpsPerSec: 0,
+    dispatchOpsPerSec: opsPerSec(count, dequeueMs),
+    lagP50Ms: null,
+    lagP99Ms: null
+  };
+}
+
+function benchmarkIndexedPriorityQueue(count: number): BenchmarkResult {
+  const queue = new IndexedPriorityQueue<number>();
+  const ids: string[] = [];
+  for (let i = 0; i < count; i++) {
+    ids.push(`item_${i}`);
+  }
+  const enqueueStart = performance.now();
+  for (let i = 0; i < count; i++) {
+    queue.enqueue(ids[i], i, (i * 2654435761) % PRIORITY_LEVELS);
+  }
+  const enqueueMs = performance.now() - enqueueStart;
+  const removeStart = performance.now();
+  for (let i = 0; i < count; i += 2) {
+    queue.remove(queue.get(ids[i])!);
+  }
+  const removeMs = performance.now() - removeStart;
+  const remaining = queue.size();
+  const dequeueStart = performance.now();
+  while (queue.dequeue() !== null) {
+    // drain
+  }
+  const dequeueMs = performance.now() - dequeueStart;
+  return {
+    subject: 'IndexedPriorityQueue',
+    backend: 'indexed-heap',
+    tasks: count,
+    scheduleOpsPerSec: opsPerSec(count, enqueueMs),
+    cancelOpsPerSec: opsPerSec(Math.ceil(count / 2), removeMs),
+    dispatchOpsPerSec: opsPerSec(remaining, dequeueMs),
+    lagP50Ms: null,
+    lagP99Ms: null
+  };
+}
+
+async function waitFor(condition: () => boolean): Promise<void> {
+  while (!condition()) {
+    await new Promise(resolve => setTimeout(resolve, 5));
+  }
+}
+
+/**
+ * Runs four phases against a fresh scheduler each: schedule() throughput,
+ * cancelTask() throughput for half of the tasks, dispatch throughput for a
+ * backlog that is already due, and dispatch lag for a sample of tasks due
+ * over the next second while the rest of the queue sits in the future.
+ */
+async function benchmarkScheduler(backend: SchedulerBackend, count: number): Promise<BenchmarkResult> {
+  const spreadMs = 60 * 60 * 1000;
+
+  let scheduler = backend.create();
+  let tasks = makeTasks(count, Date.now() + spreadMs, spreadMs);
+  const scheduleStart = performance.now();
+  for (const task of tasks) {
+    scheduler.schedule(task);
+  }
+  const scheduleMs = performance.now() - scheduleStart;
+  const cancelStart = performance.now();
+  for (let i = 0; i < count; i += 2) {
+    scheduler.cancelTask(tasks[i].id);
+  }
+  const cancelMs = performance.now() - cancelStart;
+
+  scheduler = backend.create();
+  tasks = makeTasks(count, Date.now() - spreadMs, spreadMs);
+  for (const task of tasks) {
+    scheduler.schedule(task);
+  }
+  const dispatchStart = performance.now();
+  let running = scheduler.start();
+  await waitFor(() => scheduler.pendingCount() === 0);
+  const dispatchMs = performance.now() - dispatchStart;
+  scheduler.stop();
+  await running;
+
+  scheduler = backend.create();
+  const sample = Math.min(count, LAG_SAMPLE);
+  const now = Date.now();
+  for (const task of makeTasks(count - sample, now + spreadMs, spreadMs, 'future')) {
+    scheduler.schedule(task);
+  }
+  for (const task of makeTasks(sample, now + 50, LAG_WINDOW_MS, 'lag')) {
+    scheduler.schedule(task);
+  }
+  running = scheduler.start();
+  await waitFor(() => scheduler.getStats().completed >= sample);
+  scheduler.stop();
+  await running;
+  const lag = scheduler.getStats().dispatchLag;
+
+  return {
+    subject: backend.subject,
+    backend: backend.backend,
+    tasks: count,
+    scheduleOpsPerSec: opsPerSec(count, scheduleMs),
+    cancelOpsPerSec: opsPerSec(Math.ceil(count / 2), cancelMs),
+    dispatchOpsPerSec: opsPerSec(count, dispatchMs),
+    lagP50Ms: lag.p50,
+    lagP99Ms: lag.p99
+  };
+}
+
+function resultKey(result: BenchmarkResult): string {
+  return `${result.subject}/${result.backend}/${result.tasks}`;
+}
+
+/**
+ * Lists throughput metrics that dropped by more than `tolerance` relative to
+ * a previous run's JSON output.
+ */
+function findRegressions(results: BenchmarkResult[], baselinePath: string, tolerance: number): Regression[] {
+  const baseline: { results: BenchmarkResult[] } = JSON.parse(fs.readFileSync(baselinePath, 'utf-8'));
+  const previous = new Map(baseline.results.map(result => [resultKey(result), result]));
+  const regressions: Regression[] = [];
+  for (const result of results) {
+    const before = previous.get(resultKey(result));
+    if (!before) {
+      continue;
+    }
+    for (const metric of THROUGHPUT_METRICS) {
+      const baselineValue = before[metric] as number;
+      const currentValue = result[metric] as number;
+      if (baselineValue > 0 && currentValue < baselineValue * (1 - tolerance)) {
+        regressions.push({ key: resultKey(result), metric, baseline: baselineValue, current: currentValue });
+      }
+    }
+  }
+  return regressions;
+}
+
+function parseArgs(args: string[]): { sizes: number[]; baseline?: string; tolerance: number; output?: string } {
+  const options: { sizes: number[]; baseline?: string; tolerance: number; output?: string } = {
+    sizes: [10000, 100000, 1000000],
+    tolerance: 0.2
+  };
+  for (let i = 0; i < args.length; i++) {
+    switch (args[i]) {
+      case '--baseline':
+        options.baseline = args[++i];
+        break;
+      case '--tolerance':
+        options.tolerance = parseFloat(args[++i]);
+        break;
+      case '--output':
+        options.output = args[++i];
+        break;
+      default:
+        options.sizes = args[i].split(',').map(size => parseInt(size, 10));
+    }
+  }
+  return options;
+}
+
+async function main() {
+  const options = parseArgs(process.argv.slice(2));
+  const results: BenchmarkResult[] = [];
+  for (const count of options.sizes) {
+    results.push(benchmarkPriorityQueue(count, 'heap'));
+    results.push(benchmarkPriorityQueue(count, 'bucket'));
+    results.push(benchmarkNumericPriorityQueue(count));
+    results.push(benchmarkIndexedPriorityQueue(count));
+    for (const backend of SCHEDULER_BACKENDS) {
+      results.push(await benchmarkScheduler(backend, count));
+    }
+  }
+  const report: Record<string, unknown> = {
+    node: process.version,
+    sizes: options.sizes,
+    pollIntervalMs: POLL_INTERVAL_MS,
+    lagSample: LAG_SAMPLE,
+    results
+  };
+  let regressions: Regression[] = [];
+  if (options.baseline) {
+    regressions = findRegressions(results, options.baseline, options.tolerance);
+    report.baseline = options.baseline;
+    report.tolerance = options.tolerance;
+    report.regressions = regressions;
+  }
+  const json = JSON.stringify(report, null, 2);
+  if (options.output) {
+    fs.writeFileSync(options.output, json + '\n');
+  }
+  console.log(json);
+  if (regressions.length > 0) {
+    process.exitCode = 1;
+  }
+}
+
+main();
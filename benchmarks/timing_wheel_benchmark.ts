@@ -0,0 +1,96 @@
+#!/usr/bin/env node
+import { performance } from 'perf_hooks';
+import { IndexedPriorityQueue } from '../src/scheduler/IndexedPriorityQueue';
+import { ScheduledTask, compareScheduledTasks } from '../src/scheduler/TaskScheduler';
+import { TimingWheel } from '../src/scheduler/TimingWheel';
+
+interface TimeIndexResult {
+  timeIndex: string;
+  tasks: number;
+  insertOpsPerSec: number;
+  expireOpsPerSec: number;
+  totalMs: number;
+}
+
+const POLL_INTERVAL_MS = 100;
+
+function makeTasks(count: number, spreadMs: number, start: number): ScheduledTask[] {
+  const tasks: ScheduledTask[] = [];
+  const handler = async () => {};
+  for (let i = 0; i < count; i++) {
+    tasks.push({
+      id: `task_${i}`,
+      name: 'bench',
+      executeAt: new Date(start + 1 + ((i * 2654435761) % spreadMs)),
+      priority: i % 10,
+      handler
+    });
+  }
+  return tasks;
+}
+
+function benchmarkHeap(tasks: ScheduledTask[], start: number, spreadMs: number): TimeIndexResult {
+  const queue = new IndexedPriorityQueue<ScheduledTask>(compareScheduledTasks);
+  const insertStart = performance.now();
+  for (const task of tasks) {
+    queue.enqueue(task.id, task, task.priority);
+  }
+  const insertMs = performance.now() - insertStart;
+
+  const expireStart = performance.now();
+  let expired = 0;
+  for (let now = start; now <= start + spreadMs + POLL_INTERVAL_MS; now += POLL_INTERVAL_MS) {
+    let next = queue.peek();
+    while (next && next.executeAt.getTime() <= now) {
+      queue.dequeue();
+      expired++;
+      next = queue.peek();
+    }
+  }
+  const expireMs = performance.now() - expireStart;
+  return summarize('heap', expired, insertMs, expireMs);
+}
+
+function benchmarkWheel(tasks: ScheduledTask[], start: number, spreadMs: number): TimeIndexResult {
+  const wheel = new TimingWheel<ScheduledTask>(start);
+  const insertStart = performance.now();
+  for (const task of tasks) {
+    wheel.add(task.id, task, task.executeAt.getTime());
+  }
+  const insertMs = performance.now() - insertStart;
+
+  const expireStart = performance.now();
+  let expired = 0;
+  for (let now = start; now <= start + spreadMs + POLL_INTERVAL_MS; now += POLL_INTERVAL_MS) {
+    expired += wheel.advance(now).length;
+  }
+  const expireMs = performance.now() - expireStart;
+  return summarize('wheel', expired, insertMs, expireMs);
+}
+
+function summarize(timeIndex: string, tasks: number, insertMs: number, expireMs: number): TimeIndexResult {
+  return {
+    timeIndex,
+    tasks,
+    insertOpsPerSec: Math.round(tasks / (insertMs / 1000)),
+    expireOpsPerSec: Math.round(tasks / (expireMs / 1000)),
+    totalMs: Math.round(insertMs + expireMs)
+  };
+}
+
+function main() {
+  const args = process.argv.slice(2);
+  const count = parseInt(args[0] ?? '1000000', 10);
+  const hours = parseFloat(args[1] ?? '4');
+  const spreadMs = Math.round(hours * 60 * 60 * 1000);
+  const start = Date.now();
+  const tasks = makeTasks(count, spreadMs, start);
+
+  const results = [
+    benchmarkHeap(tasks, start, spreadMs),
+    benchmarkWheel(tasks, start, spreadMs)
+  ];
+  console.log(JSON.stringify({ tasks: count, spreadHours: hours, pollIntervalMs: POLL_INTERVAL_MS, results }, null, 2));
+}
+
+main();
@@ -1,37 +1,511 @@
-export interface ScheduledTask {
-  id: string;
+import { performance } from 'perf_hooks';
+import { IndexedPriorityQueue } from './IndexedPriorityQueue';
+import { PendingTaskSource, PendingTasksQuery, listSource, queueSource, walkPendingTasks } from './PendingTasks';
+import { OverflowPolicy, SchedulerCapacity } from './SchedulerCapacity';
+import { SchedulerStats, SchedulerStatsSnapshot, TaskOutcome } from './SchedulerStats';
+import { TaskDependencies } from './TaskDependencies';
+import {
+  RetryState,
+  ScheduledTask,
+  compareScheduledTasks,
+  nextExecutionTime,
+  planRetry,
+  runHandler,
+  validateBatch,
+  validateTask
+} from './TaskScheduler';
+import { RateLimit, TokenBucket } from './TokenBucket';
+
+export type { PendingTasksQuery, ScheduledTask };
+
+// setTimeout cannot wait longer than 2^31 - 1 ms.
+const MAX_TIMER_DELAY = 2147483647;
+
+/**
+ * A concurrency budget for tasks whose priority is at least `minPriority`
+ * (and below the next lane up). Lanes let critical work keep free slots
+ * while bulk work is saturating its own limit.
+ */
+export interface ConcurrencyLane {
   name: string;
-  executeAt: Date;
-  priority: number;
-  handler: () => Promise<void>;
+  minPriority: number;
+  maxConcurrency: number;
+}
+
+export interface AsyncTaskSchedulerOptions {
+  maxConcurrency?: number;
+  lanes?: ConcurrencyLane[];
+  /** Emit a `performance.measure` entry for every dispatched task. */
+  perfHooks?: boolean;
+  /** Fraction of cancelled entries the task queue tolerates before compacting. */
+  compactionThreshold?: number;
+  /** Token-bucket limits keyed by `ScheduledTask.name`. */
+  rateLimits?: Record<string, RateLimit>;
+  /** Maximum number of pending tasks, running ones included. Unbounded by default. */
+  capacity?: number;
+  /** What schedule() does once `capacity` is reached. Defaults to `reject`. */
+  overflow?: OverflowPolicy;
+  /** Default for `ScheduledTask.slackMs`: how late a task may start so nearby tasks share one wake-up. */
+  slackMs?: number;
+}
+
+interface LaneState {
+  lane: ConcurrencyLane;
+  ready: IndexedPriorityQueue<ScheduledTask>;
+  inFlight: number;
 }
 
+/**
+ * Runs tasks from a single timer armed for the earliest `executeAt` instead
+ * of polling. The timer is re-armed whenever the head of the queue changes,
+ * so an idle scheduler does not wake up at all.
+ *
+ * Due tasks move from the time-ordered queue into per-lane ready queues and
+ * are started in priority order while the pool has free slots.
+ *
+ * Tasks whose name has a rate limit take a token when they are started. A
+ * task that finds its bucket empty reserves the next token and goes back
+ * into the time-ordered queue until then, so it never holds a slot while
+ * it waits.
+ *
+ * With a slack window the timer is not armed for the head's `executeAt` but
+ * for the earliest `executeAt + slackMs` among pending tasks, and every
+ * task due by then is dispatched from that one firing, so a dense schedule
+ * costs one wake-up per window instead of one per task.
+ *
+ * Tasks with unfinished `dependsOn` tasks are held back and enter the
+ * time-ordered queue once the last of them succeeds, so independent
+ * branches of a dependency graph run side by side in the pool.
+ */
 export class AsyncTaskScheduler {
-  private tasks: ScheduledTask[] = [];
+  private tasks: IndexedPriorityQueue<ScheduledTask>;
+  private lanes: LaneState[];
+  private runningTasks: Map<string, ScheduledTask> = new Map();
+  private cancelledWhileRunning: Set<string> = new Set();
+  private abortControllers: Map<string, AbortController> = new Map();
+  private retries: Map<string, RetryState> = new Map();
+  private dependencies: TaskDependencies = new TaskDependencies();
+  private inFlight: Set<Promise<void>> = new Set();
+  private maxConcurrency: number;
+  private slackMs: number;
   private isRunning: boolean = false;
+  private wakeTimer: NodeJS.Timeout | null = null;
+  /** The wake time the timer was last armed for, Infinity when it is not armed. */
+  private armedAt: number = Infinity;
+  private wake: (() => void) | null = null;
+  private stats: SchedulerStats;
+  private capacity: SchedulerCapacity;
+  private rateLimits: Map<string, TokenBucket> = new Map();
+  /** Tasks deferred to their reserved rate-limit token, with the executeAt they had before. */
+  private reserved: Map<string, Date> = new Map();
+
+  constructor(options: AsyncTaskSchedulerOptions = {}) {
+    this.stats = new SchedulerStats({ perfHooks: options.perfHooks });
+    this.capacity = new SchedulerCapacity({ capacity: options.capacity, overflow: options.overflow });
+    this.tasks = new IndexedPriorityQueue(compareScheduledTasks, { compactionThreshold: options.compactionThreshold });
+    const lanes = options.lanes ?? [{ name: 'default', minPriority: -Infinity, maxConcurrency: options.maxConcurrency ?? 1 }];
+    this.maxConcurrency = options.maxConcurrency ?? lanes.reduce((total, lane) => total + lane.maxConcurrency, 0);
+    if (this.maxConcurrency < 1 || lanes.some(lane => lane.maxConcurrency < 1)) {
+      throw new Error('maxConcurrency must be at least 1');
+    }
+    this.slackMs = options.slackMs ?? 0;
+    if (!(this.slackMs >= 0)) {
+      throw new Error('slackMs must not be negative');
+    }
+    this.lanes = lanes
+      .slice()
+      .sort((a, b) => b.minPriority - a.minPriority)
+      .map(lane => ({
+        lane,
+        ready: new IndexedPriorityQueue<ScheduledTask>(undefined, { compactionThreshold: options.compactionThreshold }),
+        inFlight: 0
+      }));
+    for (const [name, limit] of Object.entries(options.rateLimits ?? {})) {
+      this.rateLimits.set(name, new TokenBucket(limit));
+    }
+  }
 
   schedule(task: ScheduledTask): void {
-    throw new Error('Schedule failed');
+    if (this.isPending(task.id)) {
+      throw new Error(`Task ${task.id} is already scheduled`);
+    }
+    validateTask(task);
+    const victim = this.capacity.admit(task, this.pendingCount());
+    if (victim) {
+      this.cancelTask(victim.id);
+    }
+    if (!this.dependencies.block(task, taskId => this.isPending(taskId))) {
+      this.capacity.track(task);
+      this.enqueue(task);
+    }
+  }
+
+  /**
+   * Schedules `task` once SchedulerCapacity.waitToSchedule() finds room.
+   */
+  async scheduleAsync(task: ScheduledTask): Promise<void> {
+    await this.capacity.waitToSchedule(task, () => this.pendingCount(), taskId => this.isPending(taskId));
+    this.schedule(task);
+  }
+
+  /**
+   * Schedules a batch of tasks, validating all of them first and merging
+   * them into the queue in linear time. Tasks with the same time and
+   * priority keep their order in `tasks`. Tasks in the batch may depend on
+   * each other in any order, as long as they do not form a cycle.
+   */
+  scheduleMany(tasks: ScheduledTask[]): void {
+    validateBatch(tasks, taskId => this.isPending(taskId));
+    this.capacity.admitMany(tasks.length, this.pendingCount());
+    const runnable = this.dependencies.blockMany(tasks, taskId => this.isPending(taskId));
+    for (const task of runnable) {
+      this.capacity.track(task);
+    }
+    this.tasks.enqueueMany(runnable.map(task => ({ id: task.id, value: task, priority: task.priority })));
+    if (runnable.some(task => this.deadline(task) < this.armedAt)) {
+      this.rearm();
+    }
   }
 
   async start(): Promise<void> {
-    throw new Error('Start failed');
+    if (this.isRunning) {
+      return;
+    }
+    this.isRunning = true;
+    while (this.isRunning) {
+      this.promoteDueTasks(Date.now());
+      this.dispatchReadyTasks();
+      if (this.isRunning) {
+        await this.waitForNextTask();
+      }
+    }
+    await Promise.all(this.inFlight);
   }
 
   stop(): void {
-    throw new Error('Stop failed');
+    this.isRunning = false;
+    this.wakeUp();
   }
 
   getPendingTasks(): ScheduledTask[] {
-    throw new Error('Get pending tasks failed');
+    const ready: ScheduledTask[] = [];
+    for (const state of this.lanes) {
+      ready.push(...state.ready.toArray());
+    }
+    ready.sort((a, b) => b.priority - a.priority);
+    return [...this.runningTasks.values(), ...ready, ...this.tasks.toArray(), ...this.dependencies.values()];
+  }
+
+  /**
+   * Yields pending tasks in the same order as getPendingTasks() without
+   * copying the queues. `after` resumes behind the task with that id; once
+   * that task has left the scheduler the view starts from the front again.
+   */
+  pendingTasks(query: PendingTasksQuery = {}): IterableIterator<ScheduledTask> {
+    return walkPendingTasks(this.pendingSources(), query);
+  }
+
+  pendingCount(): number {
+    return this.runningTasks.size + this.queuedCount();
+  }
+
+  getStats(): SchedulerStatsSnapshot {
+    return this.stats.snapshot(this.queuedCount(), this.runningTasks.size);
   }
 
+  /**
+   * Cancels a task together with every task that depends on it.
+   */
   cancelTask(taskId: string): boolean {
-    throw new Error('Cancel task failed');
+    const cancelled = this.removeTask(taskId);
+    if (cancelled) {
+      this.capacity.untrack(taskId);
+      this.retries.delete(taskId);
+      this.reserved.delete(taskId);
+      this.settleDependents(taskId, 'cancelled');
+      this.capacity.release(this.pendingCount());
+    }
+    return cancelled;
   }
 
-  private sleep(ms: number): Promise<void> {
-    return new Promise(resolve => setTimeout(resolve, ms));
+  updateTaskPriority(taskId: string, priority: number): boolean {
+    const updated = this.changePriority(taskId, priority);
+    if (updated) {
+      this.capacity.reprioritize(taskId, priority);
+    }
+    return updated;
+  }
+
+  private removeTask(taskId: string): boolean {
+    if (this.dependencies.remove(taskId)) {
+      return true;
+    }
+    const handle = this.tasks.get(taskId);
+    if (!handle) {
+      if (this.runningTasks.has(taskId)) {
+        this.cancelledWhileRunning.add(taskId);
+        this.abortControllers.get(taskId)!.abort(new Error(`Task ${taskId} was cancelled`));
+        return true;
+      }
+      const state = this.readyLaneOf(taskId);
+      return state !== undefined && state.ready.remove(state.ready.get(taskId)!);
+    }
+    const wasHead = this.tasks.peek() === handle.value;
+    this.tasks.remove(handle);
+    if (wasHead) {
+      this.rearm();
+    }
+    return true;
+  }
+
+  private changePriority(taskId: string, priority: number): boolean {
+    const blocked = this.dependencies.get(taskId);
+    if (blocked) {
+      blocked.priority = priority;
+      return true;
+    }
+    const handle = this.tasks.get(taskId);
+    if (handle) {
+      this.tasks.updatePriority(handle, priority);
+      handle.value.priority = priority;
+      return true;
+    }
+    const state = this.readyLaneOf(taskId);
+    if (!state) {
+      return false;
+    }
+    const readyHandle = state.ready.get(taskId)!;
+    const task = readyHandle.value;
+    state.ready.remove(readyHandle);
+    task.priority = priority;
+    this.laneFor(priority).ready.enqueue(task.id, task, priority);
+    this.wakeUp();
+    return true;
+  }
+
+  private pendingSources(): PendingTaskSource[] {
+    return [
+      listSource(this.runningTasks),
+      ...this.lanes.map(state => queueSource(state.ready)),
+      queueSource(this.tasks),
+      listSource(this.dependencies)
+    ];
+  }
+
+  private enqueue(task: ScheduledTask): void {
+    this.tasks.enqueue(task.id, task, task.priority);
+    if (this.deadline(task) < this.armedAt) {
+      this.rearm();
+    }
+  }
+
+  private isPending(taskId: string): boolean {
+    if (this.tasks.has(taskId) || this.runningTasks.has(taskId) || this.dependencies.has(taskId)) {
+      return true;
+    }
+    return this.readyLaneOf(taskId) !== undefined;
+  }
+
+  private queuedCount(): number {
+    const ready = this.lanes.reduce((total, state) => total + state.ready.size(), 0);
+    return ready + this.tasks.size() + this.dependencies.size();
   }
-}
 
+  private laneFor(priority: number): LaneState {
+    for (const state of this.lanes) {
+      if (priority >= state.lane.minPriority) {
+        return state;
+      }
+    }
+    return this.lanes[this.lanes.length - 1];
+  }
+
+  private readyLaneOf(taskId: string): LaneState | undefined {
+    return this.lanes.find(state => state.ready.has(taskId));
+  }
+
+  private promoteDueTasks(now: number): void {
+    let task = this.tasks.peek();
+    while (task && task.executeAt.getTime() <= now) {
+      this.tasks.dequeue();
+      this.laneFor(task.priority).ready.enqueue(task.id, task, task.priority);
+      task = this.tasks.peek();
+    }
+  }
+
+  private dispatchReadyTasks(): void {
+    while (this.isRunning && this.inFlight.size < this.maxConcurrency) {
+      const state = this.nextLane();
+      if (!state) {
+        return;
+      }
+      const task = state.ready.dequeue()!;
+      if (!this.throttle(task)) {
+        this.dispatch(state, task);
+      }
+    }
+  }
+
+  /**
+   * Takes a rate-limit token for `task`, or defers the task to the time its
+   * reserved token becomes available and returns true. A deferred task gets
+   * its own executeAt back before it is dispatched, so its dispatch lag and
+   * the phase of its next interval run do not depend on the wait.
+   */
+  private throttle(task: ScheduledTask): boolean {
+    const bucket = this.rateLimits.get(task.name);
+    const executeAt = this.reserved.get(task.id);
+    if (executeAt) {
+      this.reserved.delete(task.id);
+      task.executeAt = executeAt;
+      return false;
+    }
+    if (!bucket) {
+      return false;
+    }
+    const now = Date.now();
+    const wait = bucket.reserve(now);
+    if (wait === 0) {
+      return false;
+    }
+    this.reserved.set(task.id, task.executeAt);
+    task.executeAt = new Date(now + wait);
+    this.enqueue(task);
+    return true;
+  }
+
+  /**
+   * Picks the lane whose next ready task has the highest priority among the
+   * lanes that still have capacity.
+   */
+  private nextLane(): LaneState | undefined {
+    let best: LaneState | undefined;
+    for (const state of this.lanes) {
+      const head = state.ready.peek();
+      if (!head || state.inFlight >= state.lane.maxConcurrency) {
+        continue;
+      }
+      if (!best || head.priority > best.ready.peek()!.priority) {
+        best = state;
+      }
+    }
+    return best;
+  }
+
+  private dispatch(state: LaneState, task: ScheduledTask): void {
+    state.inFlight++;
+    const run = this.execute(task).finally(() => {
+      state.inFlight--;
+      this.inFlight.delete(run);
+      this.capacity.release(this.pendingCount());
+      this.wakeUp();
+    });
+    this.inFlight.add(run);
+  }
+
+  private async execute(task: ScheduledTask): Promise<void> {
+    const controller = new AbortController();
+    this.capacity.untrack(task.id);
+    this.runningTasks.set(task.id, task);
+    this.abortControllers.set(task.id, controller);
+    this.stats.recordDispatch(task.executeAt.getTime(), Date.now());
+    const startedAt = performance.now();
+    const outcome = await runHandler(task, controller);
+    this.stats.recordCompletion(task.name, startedAt, outcome);
+    this.runningTasks.delete(task.id);
+    this.abortControllers.delete(task.id);
+    this.reschedule(task, outcome);
+  }
+
+  /**
+   * Failed tasks with a retry policy go back into the time-ordered queue
+   * under their backoff time rather than waiting in their slot.
+   */
+  private reschedule(task: ScheduledTask, outcome: TaskOutcome): void {
+    if (this.cancelledWhileRunning.delete(task.id)) {
+      this.retries.delete(task.id);
+      return;
+    }
+    const now = Date.now();
+    const retryAt = planRetry(task, outcome, this.retries, now);
+    const next = retryAt ?? nextExecutionTime(task, now);
+    if (next !== null) {
+      task.executeAt = new Date(next);
+      this.capacity.track(task);
+      this.enqueue(task);
+    }
+    if (retryAt === null) {
+      this.settleDependents(task.id, outcome);
+    }
+  }
+
+  private settleDependents(taskId: string, outcome: TaskOutcome): void {
+    this.dependencies.settle(taskId, outcome, task => {
+      this.capacity.track(task);
+      this.enqueue(task);
+    }, dependent => this.cancelTask(dependent));
+  }
+
+  private waitForNextTask(): Promise<void> {
+    return new Promise(resolve => {
+      this.wake = resolve;
+      this.armTimer();
+    });
+  }
+
+  private rearm(): void {
+    if (this.wake) {
+      this.armTimer();
+    }
+  }
+
+  private armTimer(): void {
+    if (this.wakeTimer) {
+      clearTimeout(this.wakeTimer);
+    }
+    this.armedAt = this.wakeTime();
+    const delay = Math.max(0, this.armedAt - Date.now());
+    this.wakeTimer = setTimeout(() => this.wakeUp(), Math.min(delay, MAX_TIMER_DELAY));
+  }
+
+  /**
+   * The latest time the timer may fire without starting any task later than
+   * its slack allows. Only tasks due before that time can lower it, so the
+   * walk covers the batch the firing will dispatch and nothing more.
+   */
+  private wakeTime(): number {
+    const head = this.tasks.peek();
+    if (!head) {
+      return Infinity;
+    }
+    let wakeAt = this.deadline(head);
+    if (wakeAt === head.executeAt.getTime()) {
+      return wakeAt;
+    }
+    for (const task of this.tasks.values()) {
+      if (task.executeAt.getTime() >= wakeAt) {
+        break;
+      }
+      wakeAt = Math.min(wakeAt, this.deadline(task));
+    }
+    return wakeAt;
+  }
+
+  /**
+   * The latest time `task` may start.
+   */
+  private deadline(task: ScheduledTask): number {
+    return task.executeAt.getTime() + (task.slackMs ?? this.slackMs);
+  }
+
+  private wakeUp(): void {
+    if (this.wakeTimer) {
+      clearTimeout(this.wakeTimer);
+      this.wakeTimer = null;
+    }
+    this.armedAt = Infinity;
+    const wake = this.wake;
+    this.wake = null;
+    wake?.();
+  }
+}
@@ -0,0 +1,58 @@
+/**
+ * Maps string keys onto nodes `0..nodes - 1` with consistent hashing. Every
+ * node owns `virtualNodes` points on a 32-bit ring and a key belongs to the
+ * first point at or after its own hash, so resizing the ring only moves the
+ * keys next to the points that were added or removed.
+ */
+export class ConsistentHashRing {
+  private points: Uint32Array;
+  private owners: Uint32Array;
+
+  constructor(nodes: number, virtualNodes: number = 64) {
+    if (!(nodes >= 1) || !(virtualNodes >= 1)) {
+      throw new Error('A hash ring needs at least one node and one virtual node');
+    }
+    const entries: Array<[number, number]> = [];
+    for (let node = 0; node < nodes; node++) {
+      for (let replica = 0; replica < virtualNodes; replica++) {
+        entries.push([hashKey(`${node}#${replica}`), node]);
+      }
+    }
+    entries.sort((a, b) => a[0] - b[0]);
+    this.points = Uint32Array.from(entries, entry => entry[0]);
+    this.owners = Uint32Array.from(entries, entry => entry[1]);
+  }
+
+  nodeFor(key: string): number {
+    const hash = hashKey(key);
+    let low = 0;
+    let high = this.points.length;
+    while (low < high) {
+      const middle = (low + high) >>> 1;
+      if (this.points[middle] < hash) {
+        low = middle + 1;
+      } else {
+        high = middle;
+      }
+    }
+    return this.owners[low === this.points.length ? 0 : low];
+  }
+}
+
+/**
+ * 32-bit FNV-1a followed by the murmur3 finalizer, which spreads keys that
+ * differ only in their last characters across the whole ring.
+ */
+export function hashKey(key: string): number {
+  let hash = 0x811c9dc5;
+  for (let i = 0; i < key.length; i++) {
+    hash ^= key.charCodeAt(i);
+    hash = Math.imul(hash, 0x01000193);
+  }
+  hash ^= hash >>> 16;
+  hash = Math.imul(hash, 0x85ebca6b);
+  hash ^= hash >>> 13;
+  hash = Math.imul(hash, 0xc2b2ae35);
+  hash ^= hash >>> 16;
+  return hash >>> 0;
+}
@@ -0,0 +1,170 @@
+interface CronField {
+  name: string;
+  min: number;
+  max: number;
+  aliases?: string[];
+}
+
+const FIELDS: CronField[] = [
+  { name: 'minute', min: 0, max: 59 },
+  { name: 'hour', min: 0, max: 23 },
+  { name: 'day of month', min: 1, max: 31 },
+  { name: 'month', min: 1, max: 12, aliases: ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC'] },
+  { name: 'day of week', min: 0, max: 7, aliases: ['SUN', 'MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT'] }
+];
+
+const MACROS: Record<string, string> = {
+  '@yearly': '0 0 1 1 *',
+  '@annually': '0 0 1 1 *',
+  '@monthly': '0 0 1 * *',
+  '@weekly': '0 0 * * 0',
+  '@daily': '0 0 * * *',
+  '@midnight': '0 0 * * *',
+  '@hourly': '0 * * * *'
+};
+
+// A little over four years of days with room for the hour jumps inside each,
+// which covers every satisfiable expression including 29 February.
+const MAX_SEARCH_STEPS = (4 * 366 + 31) * 24;
+
+/**
+ * Standard five-field cron expression (minute, hour, day of month, month,
+ * day of week) evaluated in local time. Each field is parsed once into a
+ * lookup table of the next allowed value, so computing the next fire time
+ * jumps straight to candidate hours and minutes instead of stepping through
+ * them. Parsed expressions are cached by their source text.
+ */
+export class CronExpression {
+  private static cache: Map<string, CronExpression> = new Map();
+
+  readonly source: string;
+  private nextMinute: Int8Array;
+  private nextHour: Int8Array;
+  private days: boolean[];
+  private months: boolean[];
+  private weekdays: boolean[];
+  private dayOfMonthRestricted: boolean;
+  private dayOfWeekRestricted: boolean;
+
+  static parse(source: string): CronExpression {
+    let expression = CronExpression.cache.get(source);
+    if (!expression) {
+      expression = new CronExpression(source);
+      CronExpression.cache.set(source, expression);
+    }
+    return expression;
+  }
+
+  private constructor(source: string) {
+    const expanded = MACROS[source.trim().toLowerCase()] ?? source;
+    const parts = expanded.trim().split(/\s+/);
+    if (parts.length !== FIELDS.length) {
+      throw new Error(`Invalid cron expression "${source}": expected ${FIELDS.length} fields`);
+    }
+    const [minutes, hours, days, months, weekdays] = parts.map((part, i) => parseField(part, FIELDS[i], source));
+    weekdays[0] = weekdays[0] || weekdays[7];
+    this.source = source;
+    this.nextMinute = buildNextTable(minutes);
+    this.nextHour = buildNextTable(hours);
+    this.days = days;
+    this.months = months;
+    this.weekdays = weekdays;
+    this.dayOfMonthRestricted = !parts[2].startsWith('*');
+    this.dayOfWeekRestricted = !parts[4].startsWith('*');
+  }
+
+  /**
+   * Returns the first fire time strictly after `after` (epoch ms).
+   */
+  next(after: number): number {
+    const date = new Date(after);
+    date.setSeconds(0, 0);
+    date.setMinutes(date.getMinutes() + 1);
+    for (let step = 0; step < MAX_SEARCH_STEPS; step++) {
+      if (!this.months[date.getMonth() + 1]) {
+        date.setMonth(date.getMonth() + 1, 1);
+        date.setHours(0, 0, 0, 0);
+        continue;
+      }
+      if (!this.matchesDay(date)) {
+        date.setDate(date.getDate() + 1);
+        date.setHours(0, 0, 0, 0);
+        continue;
+      }
+      const hour = this.nextHour[date.getHours()];
+      if (hour === -1) {
+        date.setDate(date.getDate() + 1);
+        date.setHours(0, 0, 0, 0);
+        continue;
+      }
+      if (hour !== date.getHours()) {
+        date.setHours(hour, 0, 0, 0);
+        continue;
+      }
+      const minute = this.nextMinute[date.getMinutes()];
+      if (minute === -1) {
+        date.setHours(hour + 1, 0, 0, 0);
+        continue;
+      }
+      date.setMinutes(minute, 0, 0);
+      return date.getTime();
+    }
+    throw new Error(`Cron expression "${this.source}" never fires`);
+  }
+
+  private matchesDay(date: Date): boolean {
+    const dayOfMonth = this.days[date.getDate()];
+    const dayOfWeek = this.weekdays[date.getDay()];
+    if (this.dayOfMonthRestricted && this.dayOfWeekRestricted) {
+      return dayOfMonth || dayOfWeek;
+    }
+    return dayOfMonth && dayOfWeek;
+  }
+}
+
+function parseField(part: string, field: CronField, source: string): boolean[] {
+  const allowed: boolean[] = new Array(field.max + 1).fill(false);
+  const fail = (): never => {
+    throw new Error(`Invalid cron expression "${source}": bad ${field.name} field "${part}"`);
+  };
+  for (const item of part.split(',')) {
+    const [range, stepText] = item.split('/');
+    const step = stepText === undefined ? 1 : Number(stepText);
+    if (!Number.isInteger(step) || step < 1) {
+      fail();
+    }
+    let low: number;
+    let high: number;
+    if (range === '*') {
+      low = field.min;
+      high = field.max;
+    } else {
+      const [lowText, highText] = range.split('-');
+      low = parseValue(lowText, field);
+      high = highText === undefined ? (stepText === undefined ? low : field.max) : parseValue(highText, field);
+    }
+    if (Number.isNaN(low) || Number.isNaN(high) || low < field.min || high > field.max || low > high) {
+      fail();
+    }
+    for (let value = low; value <= high; value += step) {
+      allowed[value] = true;
+    }
+  }
+  return allowed;
+}
+
+function parseValue(text: string, field: CronField): number {
+  const alias = field.aliases?.indexOf(text.toUpperCase()) ?? -1;
+  if (alias !== -1) {
+    return alias + (field.min === 1 ? 1 : 0);
+  }
+  return /^\d+$/.test(text) ? Number(text) : NaN;
+}
+
+function buildNextTable(allowed: boolean[]): Int8Array {
+  const table = new Int8Array(allowed.length + 1).fill(-1);
+  for (let value = allowed.length - 1; value >= 0; value--) {
+    table[value] = allowed[value] ? value : table[value + 1];
+  }
+  return table;
+}
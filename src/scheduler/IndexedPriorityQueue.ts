@@ -0,0 +1,325 @@
+import { PriorityItem } from './PriorityQueue';
+
+export interface QueueHandle<T> {
+  readonly id: string;
+  readonly value: T;
+  readonly priority: number;
+}
+
+/**
+ * Orders two items; a negative result means `a` is dequeued before `b`.
+ * Ties fall back to insertion order.
+ */
+export type PriorityComparator<T> = (a: PriorityItem<T>, b: PriorityItem<T>) => number;
+
+export interface IndexedPriorityQueueOptions {
+  /**
+   * Fraction of heap slots that may hold cancelled entries before the heap is
+   * rebuilt without them. Defaults to 0.25.
+   */
+  compactionThreshold?: number;
+}
+
+interface IndexedEntry<T> {
+  id: string;
+  value: T;
+  priority: number;
+  sequence: number;
+  position: number;
+  live: boolean;
+}
+
+const byPriorityDescending = <T>(a: PriorityItem<T>, b: PriorityItem<T>): number => b.priority - a.priority;
+
+/**
+ * Binary heap keyed by a unique id. Every entry tracks its own heap position
+ * and an id index maps ids to entries, so lookups are O(1) and
+ * updatePriority only needs a single O(log n) sift.
+ *
+ * remove() is lazy: the entry leaves the index at once but stays in the heap
+ * as a tombstone that peek and dequeue discard when it reaches the top. Once
+ * tombstones make up `compactionThreshold` of the heap it is rebuilt in one
+ * O(n) pass, so a burst of removals costs amortized O(1) each.
+ */
+export class IndexedPriorityQueue<T> {
+  private heap: IndexedEntry<T>[] = [];
+  private index: Map<string, IndexedEntry<T>> = new Map();
+  private sequence: number = 0;
+  private compare: PriorityComparator<T>;
+  private tombstones: number = 0;
+  private compactionThreshold: number;
+
+  constructor(compare: PriorityComparator<T> = byPriorityDescending, options: IndexedPriorityQueueOptions = {}) {
+    this.compare = compare;
+    this.compactionThreshold = options.compactionThreshold ?? 0.25;
+    if (!(this.compactionThreshold > 0 && this.compactionThreshold <= 1)) {
+      throw new Error('compactionThreshold must be in (0, 1]');
+    }
+  }
+
+  enqueue(id: string, value: T, priority: number): QueueHandle<T> {
+    if (this.index.has(id)) {
+      throw new Error(`Duplicate queue id: ${id}`);
+    }
+    const entry: IndexedEntry<T> = {
+      id,
+      value,
+      priority,
+      sequence: this.sequence++,
+      position: this.heap.length,
+      live: true
+    };
+    this.heap.push(entry);
+    this.index.set(id, entry);
+    this.siftUp(entry.position);
+    return entry;
+  }
+
+  /**
+   * Adds a batch of items in order. Large batches are appended and the whole
+   * heap is rebuilt bottom-up in O(n); small ones are sifted in one by one.
+   * Items keep their relative order for ties either way.
+   */
+  enqueueMany(items: Array<{ id: string; value: T; priority: number }>): void {
+    const ids = new Set<string>();
+    for (const item of items) {
+      if (this.index.has(item.id) || ids.has(item.id)) {
+        throw new Error(`Duplicate queue id: ${item.id}`);
+      }
+      ids.add(item.id);
+    }
+    const total = this.heap.length + items.length;
+    const rebuild = items.length * Math.log2(total + 1) > total;
+    for (const item of items) {
+      const entry: IndexedEntry<T> = {
+        id: item.id,
+        value: item.value,
+        priority: item.priority,
+        sequence: this.sequence++,
+        position: this.heap.length,
+        live: true
+      };
+      this.heap.push(entry);
+      this.index.set(entry.id, entry);
+      if (!rebuild) {
+        this.siftUp(entry.position);
+      }
+    }
+    if (rebuild) {
+      this.heapify();
+    }
+  }
+
+  dequeue(): T | null {
+    this.discardTombstones();
+    if (this.heap.length === 0) {
+      return null;
+    }
+    const top = this.heap[0];
+    this.removeAt(0);
+    this.index.delete(top.id);
+    return top.value;
+  }
+
+  peek(): T | null {
+    this.discardTombstones();
+    return this.heap.length > 0 ? this.heap[0].value : null;
+  }
+
+  has(id: string): boolean {
+    return this.index.has(id);
+  }
+
+  get(id: string): QueueHandle<T> | undefined {
+    return this.index.get(id);
+  }
+
+  remove(handle: QueueHandle<T>): boolean {
+    const entry = this.resolve(handle);
+    if (!entry) {
+      return false;
+    }
+    this.index.delete(entry.id);
+    entry.live = false;
+    this.tombstones++;
+    if (this.tombstones > this.heap.length * this.compactionThreshold) {
+      this.compact();
+    }
+    return true;
+  }
+
+  updatePriority(handle: QueueHandle<T>, priority: number): boolean {
+    const entry = this.resolve(handle);
+    if (!entry) {
+      return false;
+    }
+    entry.priority = priority;
+    this.siftUp(entry.position);
+    this.siftDown(entry.position);
+    return true;
+  }
+
+  isEmpty(): boolean {
+    return this.index.size === 0;
+  }
+
+  size(): number {
+    return this.index.size;
+  }
+
+  /**
+   * Returns every queued value in dequeue order without modifying the heap.
+   */
+  toArray(): T[] {
+    return this.heap
+      .filter(entry => entry.live)
+      .sort((a, b) => this.order(a, b))
+      .map(entry => entry.value);
+  }
+
+  /**
+   * Yields queued values in dequeue order without copying or modifying the
+   * heap, walking it with a frontier of candidate entries so the first k
+   * values cost O(k log k). With `after`, iteration starts behind that handle
+   * (which may already have left the queue). The queue must not be modified
+   * while the iterator is in use.
+   */
+  *values(after?: QueueHandle<T>): IterableIterator<T> {
+    if (this.heap.length === 0) {
+      return;
+    }
+    const frontier = new IndexedPriorityQueue<IndexedEntry<T>>((a, b) => this.order(a.value, b.value));
+    const push = (position: number) => {
+      if (position < this.heap.length) {
+        const entry = this.heap[position];
+        frontier.enqueue(String(entry.sequence), entry, 0);
+      }
+    };
+    const cursor = after as IndexedEntry<T> | undefined;
+    if (cursor) {
+      // Entries at or before the cursor form a subtree at the top of the
+      // heap; the children hanging off it seed the frontier.
+      const stack = [0];
+      while (stack.length > 0) {
+        const position = stack.pop()!;
+        if (this.order(this.heap[position], cursor) > 0) {
+          push(position);
+        } else {
+          for (const child of [2 * position + 1, 2 * position + 2]) {
+            if (child < this.heap.length) {
+              stack.push(child);
+            }
+          }
+        }
+      }
+    } else {
+      push(0);
+    }
+    let entry = frontier.dequeue();
+    while (entry) {
+      push(2 * entry.position + 1);
+      push(2 * entry.position + 2);
+      if (entry.live) {
+        yield entry.value;
+      }
+      entry = frontier.dequeue();
+    }
+  }
+
+  clear(): void {
+    this.heap = [];
+    this.index.clear();
+    this.tombstones = 0;
+  }
+
+  private resolve(handle: QueueHandle<T>): IndexedEntry<T> | undefined {
+    const entry = this.index.get(handle.id);
+    return entry === handle ? entry : undefined;
+  }
+
+  private order(a: IndexedEntry<T>, b: IndexedEntry<T>): number {
+    return this.compare(a, b) || a.sequence - b.sequence;
+  }
+
+  private removeAt(position: number): void {
+    const removed = this.heap[position];
+    const last = this.heap.pop()!;
+    removed.position = -1;
+    if (last !== removed) {
+      this.heap[position] = last;
+      last.position = position;
+      this.siftUp(position);
+      this.siftDown(last.position);
+    }
+  }
+
+  private discardTombstones(): void {
+    while (this.heap.length > 0 && !this.heap[0].live) {
+      this.removeAt(0);
+      this.tombstones--;
+    }
+  }
+
+  /**
+   * Drops every tombstone and rebuilds the heap bottom-up.
+   */
+  private compact(): void {
+    let length = 0;
+    for (const entry of this.heap) {
+      if (entry.live) {
+        this.heap[length++] = entry;
+      } else {
+        entry.position = -1;
+      }
+    }
+    this.heap.length = length;
+    this.tombstones = 0;
+    this.heapify();
+  }
+
+  private heapify(): void {
+    for (let position = 0; position < this.heap.length; position++) {
+      this.heap[position].position = position;
+    }
+    for (let position = (this.heap.length >> 1) - 1; position >= 0; position--) {
+      this.siftDown(position);
+    }
+  }
+
+  private place(entry: IndexedEntry<T>, position: number): void {
+    this.heap[position] = entry;
+    entry.position = position;
+  }
+
+  private siftUp(position: number): void {
+    const entry = this.heap[position];
+    while (position > 0) {
+      const parent = (position - 1) >> 1;
+      if (this.order(entry, this.heap[parent]) >= 0) {
+        break;
+      }
+      this.place(this.heap[parent], position);
+      position = parent;
+    }
+    this.place(entry, position);
+  }
+
+  private siftDown(position: number): void {
+    const length = this.heap.length;
+    const entry = this.heap[position];
+    while (true) {
+      const left = 2 * position + 1;
+      if (left >= length) {
+        break;
+      }
+      const right = left + 1;
+      const child = right < length && this.order(this.heap[right], this.heap[left]) < 0 ? right : left;
+      if (this.order(this.heap[child], entry) >= 0) {
+        break;
+      }
+      this.place(this.heap[child], position);
+      position = child;
+    }
+    this.place(entry, position);
+  }
+}
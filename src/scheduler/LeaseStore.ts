@@ -0,0 +1,274 @@
+import { randomUUID } from 'crypto';
+import * as fs from 'fs';
+import * as os from 'os';
+import * as path from 'path';
+
+export interface LeaseStoreOptions {
+  directory: string;
+  /** How long a claim stays valid without being renewed. Defaults to 30 s. */
+  leaseMs?: number;
+  /** Identifies this process in the store. Defaults to the host name and pid. */
+  owner?: string;
+  /** How long finished runs are remembered, so a late process does not repeat them. Defaults to a day. */
+  retainMs?: number;
+}
+
+/**
+ * One run of a task: processes that schedule the same task id with the same
+ * `executeAt` compete for the same lease.
+ */
+export interface LeaseKey {
+  taskId: string;
+  runAt: number;
+}
+
+/**
+ * `granted`: the caller owns the run until `expiresAt`. `leased`: another
+ * process owns it until `expiresAt`. `done`: the run has already finished.
+ */
+export interface LeaseResult {
+  status: 'granted' | 'leased' | 'done';
+  expiresAt: number;
+}
+
+interface LeaseRecord {
+  owner: string;
+  runAt: number;
+  expiresAt: number;
+  done: boolean;
+}
+
+const LEASES_FILE = 'leases.json';
+const LOCK_FILE = 'leases.lock';
+const LOCK_RETRY_MS = 2;
+
+/**
+ * Time-bounded task leases kept in a JSON file that several scheduler
+ * processes on one machine share. Every operation takes an exclusive lock
+ * file, reads the table, applies a whole batch of keys and writes the
+ * table back through a rename, so one store round trip covers any number of
+ * tasks. Waiting for the lock yields to the event loop. A lease that is
+ * not renewed expires and the next claim for that run takes it over, which
+ * is how the runs of a crashed process are picked up again.
+ */
+export class LeaseStore {
+  readonly owner: string;
+  readonly leaseMs: number;
+  private directory: string;
+  private retainMs: number;
+
+  constructor(options: LeaseStoreOptions) {
+    this.directory = options.directory;
+    this.leaseMs = options.leaseMs ?? 30000;
+    if (!(this.leaseMs > 0)) {
+      throw new Error('leaseMs must be positive');
+    }
+    this.owner = options.owner ?? `${os.hostname()}:${process.pid}`;
+    this.retainMs = options.retainMs ?? 24 * 60 * 60 * 1000;
+    fs.mkdirSync(this.directory, { recursive: true });
+  }
+
+  /**
+   * Tries to take every run in `keys`. A run is granted when nobody holds
+   * it, when its lease has expired or when this process already holds it;
+   * a key newer than the recorded run replaces it.
+   */
+  claim(keys: LeaseKey[], now: number = Date.now()): Promise<LeaseResult[]> {
+    return this.update(now, records => keys.map((key): LeaseResult => {
+      const record = records.get(key.taskId);
+      const free = !record
+        || record.runAt < key.runAt
+        || (record.runAt === key.runAt && !record.done && (record.expiresAt <= now || record.owner === this.owner));
+      if (free) {
+        const expiresAt = now + this.leaseMs;
+        records.set(key.taskId, { owner: this.owner, runAt: key.runAt, expiresAt, done: false });
+        return { status: 'granted', expiresAt };
+      }
+      return { status: record!.done || record!.runAt > key.runAt ? 'done' : 'leased', expiresAt: record!.expiresAt };
+    }));
+  }
+
+  /**
+   * Extends the leases this process still holds on `keys`.
+   */
+  async renew(keys: LeaseKey[], now: number = Date.now()): Promise<void> {
+    await this.update(now, records => {
+      for (const key of keys) {
+        const record = this.held(records, key);
+        if (record) {
+          record.expiresAt = now + this.leaseMs;
+        }
+      }
+    });
+  }
+
+  /**
+   * Keeps the leases this process holds on `keys` until one lease period
+   * past `until`, for runs it will retry then. If the process stops in the
+   * meantime, another process takes the runs over once that lease expires.
+   */
+  async hold(keys: LeaseKey[], until: number, now: number = Date.now()): Promise<void> {
+    await this.update(now, records => {
+      for (const key of keys) {
+        const record = this.held(records, key);
+        if (record) {
+          record.expiresAt = until + this.leaseMs;
+        }
+      }
+    });
+  }
+
+  /**
+   * Marks runs as finished so no other process starts them.
+   */
+  async complete(keys: LeaseKey[], now: number = Date.now()): Promise<void> {
+    await this.update(now, records => {
+      for (const key of keys) {
+        const record = records.get(key.taskId);
+        if (record && record.runAt === key.runAt) {
+          record.done = true;
+          record.expiresAt = now + this.retainMs;
+        }
+      }
+    });
+  }
+
+  /**
+   * Gives up leases on runs this process will not start, so another process
+   * can take them without waiting for the lease to expire.
+   */
+  async release(keys: LeaseKey[], now: number = Date.now()): Promise<void> {
+    await this.update(now, records => {
+      for (const key of keys) {
+        if (this.held(records, key)) {
+          records.delete(key.taskId);
+        }
+      }
+    });
+  }
+
+  private held(records: Map<string, LeaseRecord>, key: LeaseKey): LeaseRecord | undefined {
+    const record = records.get(key.taskId);
+    return record && !record.done && record.runAt === key.runAt && record.owner === this.owner ? record : undefined;
+  }
+
+  /**
+   * Runs `apply` on the lease table under the store lock and writes the
+   * table back. Finished runs past their retention and leases abandoned for
+   * longer than the retention are dropped on the way.
+   */
+  private async update<R>(now: number, apply: (records: Map<string, LeaseRecord>) => R): Promise<R> {
+    await this.lock();
+    try {
+      const records = this.read();
+      for (const [taskId, record] of records) {
+        if (record.expiresAt + (record.done ? 0 : this.retainMs) < now) {
+          records.delete(taskId);
+        }
+      }
+      const result = apply(records);
+      const file = path.join(this.directory, LEASES_FILE);
+      fs.writeFileSync(`${file}.${process.pid}.tmp`, JSON.stringify(Object.fromEntries(records)));
+      fs.renameSync(`${file}.${process.pid}.tmp`, file);
+      return result;
+    } finally {
+      fs.rmSync(path.join(this.directory, LOCK_FILE), { force: true });
+    }
+  }
+
+  private read(): Map<string, LeaseRecord> {
+    let content: string;
+    try {
+      content = fs.readFileSync(path.join(this.directory, LEASES_FILE), 'utf-8');
+    } catch (error) {
+      return new Map();
+    }
+    return new Map(Object.entries(JSON.parse(content)));
+  }
+
+  /**
+   * Creates the lock file exclusively, with a token naming this process as
+   * its content, and waits for the current holder otherwise. A lock is only
+   * broken once its token shows that the holder's process has exited.
+   */
+  private async lock(): Promise<void> {
+    const lockFile = path.join(this.directory, LOCK_FILE);
+    const token = `${os.hostname()}:${process.pid}:${randomUUID()}`;
+    for (;;) {
+      if (this.createLock(lockFile, token)) {
+        return;
+      }
+      let holder: string;
+      try {
+        holder = fs.readFileSync(lockFile, 'utf-8');
+      } catch (error) {
+        continue;
+      }
+      if (!holderExited(holder)) {
+        await new Promise(resolve => setTimeout(resolve, LOCK_RETRY_MS));
+      } else {
+        this.breakLock(lockFile, holder, token);
+      }
+    }
+  }
+
+  /**
+   * Writes the token to a private file and links it into place, so the lock
+   * never exists without its token.
+   */
+  private createLock(lockFile: string, token: string): boolean {
+    const pending = `${lockFile}.${token}`;
+    fs.writeFileSync(pending, token);
+    try {
+      fs.linkSync(pending, lockFile);
+      return true;
+    } catch (error) {
+      if ((error as NodeJS.ErrnoException).code !== 'EEXIST') {
+        throw error;
+      }
+      return false;
+    } finally {
+      fs.rmSync(pending, { force: true });
+    }
+  }
+
+  /**
+   * Moves the lock aside under a private name and deletes it if it still
+   * holds the dead holder's token. If another process took the lock in the
+   * meantime, the lock that was moved is linked back.
+   */
+  private breakLock(lockFile: string, holder: string, token: string): void {
+    const broken = `${lockFile}.${token}.broken`;
+    try {
+      fs.renameSync(lockFile, broken);
+    } catch (error) {
+      return;
+    }
+    try {
+      if (fs.readFileSync(broken, 'utf-8') !== holder) {
+        fs.linkSync(broken, lockFile);
+      }
+    } catch (error) {
+      // Another process took the lock once it was moved; it keeps it.
+    } finally {
+      fs.rmSync(broken, { force: true });
+    }
+  }
+}
+
+/**
+ * True if the lock token names a process on this host that is no longer
+ * running. Locks held from another host are never taken to be abandoned.
+ */
+function holderExited(holder: string): boolean {
+  const parts = holder.split(':');
+  if (parts.slice(0, -2).join(':') !== os.hostname()) {
+    return false;
+  }
+  try {
+    process.kill(Number(parts[parts.length - 2]), 0);
+    return false;
+  } catch (error) {
+    return (error as NodeJS.ErrnoException).code === 'ESRCH';
+  }
+}
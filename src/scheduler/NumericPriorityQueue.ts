@@ -0,0 +1,142 @@
+export type NumericPayload = 'int32' | 'float64';
+
+export interface NumericPriorityQueueOptions {
+  /** Number of items the queue holds before it first grows. */
+  initialCapacity?: number;
+  /** Storage for values: `int32` for ids, `float64` for any number. Defaults to `int32`. */
+  payload?: NumericPayload;
+}
+
+/**
+ * PriorityQueue for numeric values laid out in parallel typed arrays:
+ * priorities and insertion sequences in Float64Arrays, values in an
+ * Int32Array or Float64Array. Enqueue and dequeue allocate nothing; the
+ * arrays double when full. Dequeue order matches PriorityQueue: highest
+ * priority first, equal priorities in insertion order.
+ */
+export class NumericPriorityQueue {
+  private priorities: Float64Array;
+  private sequences: Float64Array;
+  private values: Int32Array | Float64Array;
+  private payload: NumericPayload;
+  private length: number = 0;
+  private sequence: number = 0;
+
+  constructor(options: NumericPriorityQueueOptions = {}) {
+    const capacity = options.initialCapacity ?? 64;
+    if (!Number.isInteger(capacity) || capacity < 1) {
+      throw new Error('initialCapacity must be a positive integer');
+    }
+    this.payload = options.payload ?? 'int32';
+    this.priorities = new Float64Array(capacity);
+    this.sequences = new Float64Array(capacity);
+    this.values = this.payload === 'int32' ? new Int32Array(capacity) : new Float64Array(capacity);
+  }
+
+  enqueue(value: number, priority: number): void {
+    if (this.payload === 'int32' && (value | 0) !== value) {
+      throw new Error(`${value} is not a 32-bit integer`);
+    }
+    if (this.length === this.priorities.length) {
+      this.grow();
+    }
+    this.siftUp(this.length++, value, priority, this.sequence++);
+  }
+
+  dequeue(): number | null {
+    if (this.length === 0) {
+      return null;
+    }
+    const top = this.values[0];
+    const last = --this.length;
+    if (last > 0) {
+      this.siftDown(0, this.values[last], this.priorities[last], this.sequences[last]);
+    }
+    return top;
+  }
+
+  peek(): number | null {
+    return this.length > 0 ? this.values[0] : null;
+  }
+
+  peekPriority(): number | null {
+    return this.length > 0 ? this.priorities[0] : null;
+  }
+
+  isEmpty(): boolean {
+    return this.length === 0;
+  }
+
+  size(): number {
+    return this.length;
+  }
+
+  /**
+   * Number of items the queue can hold before it grows again.
+   */
+  capacity(): number {
+    return this.priorities.length;
+  }
+
+  private grow(): void {
+    const capacity = this.priorities.length * 2;
+    const priorities = new Float64Array(capacity);
+    const sequences = new Float64Array(capacity);
+    const values = this.payload === 'int32' ? new Int32Array(capacity) : new Float64Array(capacity);
+    priorities.set(this.priorities);
+    sequences.set(this.sequences);
+    values.set(this.values);
+    this.priorities = priorities;
+    this.sequences = sequences;
+    this.values = values;
+  }
+
+  private higher(index: number, priority: number, sequence: number): boolean {
+    if (this.priorities[index] !== priority) {
+      return this.priorities[index] > priority;
+    }
+    return this.sequences[index] < sequence;
+  }
+
+  private move(from: number, to: number): void {
+    this.priorities[to] = this.priorities[from];
+    this.sequences[to] = this.sequences[from];
+    this.values[to] = this.values[from];
+  }
+
+  private place(index: number, value: number, priority: number, sequence: number): void {
+    this.priorities[index] = priority;
+    this.sequences[index] = sequence;
+    this.values[index] = value;
+  }
+
+  private siftUp(index: number, value: number, priority: number, sequence: number): void {
+    while (index > 0) {
+      const parent = (index - 1) >> 1;
+      if (this.higher(parent, priority, sequence)) {
+        break;
+      }
+      this.move(parent, index);
+      index = parent;
+    }
+    this.place(index, value, priority, sequence);
+  }
+
+  private siftDown(index: number, value: number, priority: number, sequence: number): void {
+    const length = this.length;
+    while (true) {
+      const left = 2 * index + 1;
+      if (left >= length) {
+        break;
+      }
+      const right = left + 1;
+      const child = right < length && this.higher(right, this.priorities[left], this.sequences[left]) ? right : left;
+      if (!this.higher(child, priority, sequence)) {
+        break;
+      }
+      this.move(child, index);
+      index = child;
+    }
+    this.place(index, value, priority, sequence);
+  }
+}
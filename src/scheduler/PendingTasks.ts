@@ -0,0 +1,72 @@
+import type { IndexedPriorityQueue } from './IndexedPriorityQueue';
+import type { ScheduledTask } from './TaskScheduler';
+
+export interface PendingTasksQuery {
+  /** Maximum number of tasks to return. */
+  limit?: number;
+  /** Id of the last task of the previous page. */
+  after?: string;
+}
+
+/**
+ * One of the queues a scheduler keeps pending tasks in. `values` yields the
+ * queue in dispatch order, starting behind `after` when that task is in it;
+ * `limit` is an upper bound on how many tasks the caller will read.
+ */
+export interface PendingTaskSource {
+  has(taskId: string): boolean;
+  values(after: string | undefined, limit: number): Iterable<ScheduledTask>;
+}
+
+/**
+ * Pages through the queues of a scheduler, shared by the schedulers'
+ * pendingTasks(). `sources` are walked in order; with `after`, the walk
+ * starts behind that task in the source holding it, or from the front if
+ * the task has left the scheduler.
+ */
+export function* walkPendingTasks(sources: PendingTaskSource[], query: PendingTasksQuery = {}): IterableIterator<ScheduledTask> {
+  let remaining = query.limit ?? Infinity;
+  if (remaining <= 0) {
+    return;
+  }
+  const after = query.after;
+  const start = after === undefined ? -1 : sources.findIndex(source => source.has(after));
+  for (let i = Math.max(start, 0); i < sources.length; i++) {
+    for (const task of sources[i].values(i === start ? after : undefined, remaining)) {
+      yield task;
+      if (--remaining === 0) {
+        return;
+      }
+    }
+  }
+}
+
+/**
+ * A source over a heap, resumed through the heap's own handle for `after`.
+ */
+export function queueSource(queue: IndexedPriorityQueue<ScheduledTask>): PendingTaskSource {
+  return {
+    has: taskId => queue.has(taskId),
+    values: after => queue.values(after === undefined ? undefined : queue.get(after))
+  };
+}
+
+/**
+ * A source over tasks kept in insertion order, such as running or blocked
+ * tasks, resumed by scanning past `after`.
+ */
+export function listSource(tasks: { has(taskId: string): boolean; values(): Iterable<ScheduledTask> }): PendingTaskSource {
+  return {
+    has: taskId => tasks.has(taskId),
+    values: function* (after) {
+      let skipping = after !== undefined;
+      for (const task of tasks.values()) {
+        if (!skipping) {
+          yield task;
+        } else if (task.id === after) {
+          skipping = false;
+        }
+      }
+    }
+  };
+}
@@ -3,28 +3,179 @@ export interface PriorityItem<T> {
   priority: number;
 }
 
+interface HeapEntry<T> extends PriorityItem<T> {
+  sequence: number;
+}
+
+/**
+ * `heap` accepts any numeric priority; `bucket` accepts integers from 0 to
+ * `maxPriority` and makes enqueue and dequeue O(1).
+ */
+export type PriorityQueueMode = 'heap' | 'bucket';
+
+export interface PriorityQueueOptions {
+  mode?: PriorityQueueMode;
+  /** Highest priority a bucket queue accepts. Defaults to 255. */
+  maxPriority?: number;
+}
+
+interface Bucket<T> {
+  items: T[];
+  head: number;
+}
+
+/**
+ * Array-backed binary max-heap. Higher priority values are dequeued first and
+ * items with equal priority come out in the order they were enqueued.
+ *
+ * In `bucket` mode the heap is replaced by one FIFO bucket per priority and
+ * a bitmap with a bit set for every non-empty bucket; the highest set bit,
+ * found with Math.clz32 over a handful of words, names the next bucket.
+ */
 export class PriorityQueue<T> {
-  private items: PriorityItem<T>[] = [];
-  private dequeueCount: number = 0;
+  private items: HeapEntry<T>[] = [];
+  private sequence: number = 0;
+  private buckets: Bucket<T>[] | null = null;
+  private bitmap: Uint32Array | null = null;
+  private count: number = 0;
+
+  constructor(options: PriorityQueueOptions = {}) {
+    if (options.mode === 'bucket') {
+      const maxPriority = options.maxPriority ?? 255;
+      if (!Number.isInteger(maxPriority) || maxPriority < 0) {
+        throw new Error('maxPriority must be a non-negative integer');
+      }
+      this.buckets = Array.from({ length: maxPriority + 1 }, () => ({ items: [], head: 0 }));
+      this.bitmap = new Uint32Array((maxPriority >> 5) + 1);
+    }
+  }
 
   enqueue(item: T, priority: number): void {
-    throw new Error('Enqueue failed');
+    if (this.buckets) {
+      this.pushBucket(item, priority);
+      return;
+    }
+    this.items.push({ value: item, priority, sequence: this.sequence++ });
+    this.siftUp(this.items.length - 1);
   }
 
   dequeue(): T | null {
-    throw new Error('Dequeue failed');
+    if (this.buckets) {
+      return this.shiftBucket();
+    }
+    if (this.items.length === 0) {
+      return null;
+    }
+    const top = this.items[0];
+    const last = this.items.pop()!;
+    if (this.items.length > 0) {
+      this.items[0] = last;
+      this.siftDown(0);
+    }
+    return top.value;
   }
 
   peek(): T | null {
-    throw new Error('Peek failed');
+    if (this.buckets) {
+      const priority = this.highestBucket();
+      if (priority === -1) {
+        return null;
+      }
+      const bucket = this.buckets[priority];
+      return bucket.items[bucket.head];
+    }
+    return this.items.length > 0 ? this.items[0].value : null;
   }
 
   isEmpty(): boolean {
-    throw new Error('Is empty failed');
+    return this.size() === 0;
   }
 
   size(): number {
-    throw new Error('Size failed');
+    return this.buckets ? this.count : this.items.length;
+  }
+
+  private pushBucket(item: T, priority: number): void {
+    const buckets = this.buckets!;
+    if (!Number.isInteger(priority) || priority < 0 || priority >= buckets.length) {
+      throw new Error(`Priority ${priority} is outside the bucket range 0-${buckets.length - 1}`);
+    }
+    buckets[priority].items.push(item);
+    this.bitmap![priority >> 5] |= 1 << (priority & 31);
+    this.count++;
+  }
+
+  /**
+   * Takes the oldest item of the highest non-empty bucket. Buckets keep a
+   * head index instead of shifting and drop their consumed prefix once it
+   * makes up half of the array.
+   */
+  private shiftBucket(): T | null {
+    const priority = this.highestBucket();
+    if (priority === -1) {
+      return null;
+    }
+    const bucket = this.buckets![priority];
+    const item = bucket.items[bucket.head];
+    bucket.items[bucket.head++] = undefined as T;
+    if (bucket.head === bucket.items.length) {
+      bucket.items.length = 0;
+      bucket.head = 0;
+      this.bitmap![priority >> 5] &= ~(1 << (priority & 31));
+    } else if (bucket.head * 2 >= bucket.items.length && bucket.head >= 32) {
+      bucket.items.splice(0, bucket.head);
+      bucket.head = 0;
+    }
+    this.count--;
+    return item;
   }
-}
 
+  private highestBucket(): number {
+    const bitmap = this.bitmap!;
+    for (let word = bitmap.length - 1; word >= 0; word--) {
+      if (bitmap[word] !== 0) {
+        return (word << 5) + 31 - Math.clz32(bitmap[word]);
+      }
+    }
+    return -1;
+  }
+
+  private higher(a: HeapEntry<T>, b: HeapEntry<T>): boolean {
+    if (a.priority !== b.priority) {
+      return a.priority > b.priority;
+    }
+    return a.sequence < b.sequence;
+  }
+
+  private siftUp(index: number): void {
+    const entry = this.items[index];
+    while (index > 0) {
+      const parent = (index - 1) >> 1;
+      if (!this.higher(entry, this.items[parent])) {
+        break;
+      }
+      this.items[index] = this.items[parent];
+      index = parent;
+    }
+    this.items[index] = entry;
+  }
+
+  private siftDown(index: number): void {
+    const length = this.items.length;
+    const entry = this.items[index];
+    while (true) {
+      const left = 2 * index + 1;
+      if (left >= length) {
+        break;
+      }
+      const right = left + 1;
+      const child = right < length && this.higher(this.items[right], this.items[left]) ? right : left;
+      if (!this.higher(this.items[child], entry)) {
+        break;
+      }
+      this.items[index] = this.items[child];
+      index = child;
+    }
+    this.items[index] = entry;
+  }
+}
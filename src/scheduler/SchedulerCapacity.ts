@@ -0,0 +1,110 @@
+import { IndexedPriorityQueue } from './IndexedPriorityQueue';
+import type { ScheduledTask } from './TaskScheduler';
+
+/**
+ * What schedule() does when the scheduler is full: `reject` throws, and
+ * `dropLowestPriority` evicts the lowest-priority queued task to make room,
+ * or throws if the new task would itself be the lowest.
+ */
+export type OverflowPolicy = 'reject' | 'dropLowestPriority';
+
+export interface SchedulerCapacityOptions {
+  /** Maximum number of pending tasks, running ones included. */
+  capacity?: number;
+  overflow?: OverflowPolicy;
+}
+
+/**
+ * Admission control shared by the schedulers. Under `dropLowestPriority`
+ * it keeps every queued (not running) task in a min-heap by priority so the
+ * eviction victim is found in O(log n); callers of scheduleAsync() wait in
+ * FIFO order until a slot frees up.
+ */
+export class SchedulerCapacity {
+  readonly capacity: number;
+  private overflow: OverflowPolicy;
+  private evictable: IndexedPriorityQueue<ScheduledTask> | null;
+  private waiters: Array<() => void> = [];
+
+  constructor(options: SchedulerCapacityOptions = {}) {
+    this.capacity = options.capacity ?? Infinity;
+    if (!(this.capacity >= 1)) {
+      throw new Error('capacity must be at least 1');
+    }
+    this.overflow = options.overflow ?? 'reject';
+    this.evictable = this.overflow === 'dropLowestPriority' && this.capacity !== Infinity
+      ? new IndexedPriorityQueue((a, b) => a.priority - b.priority)
+      : null;
+  }
+
+  /**
+   * Checks whether `task` fits next to `pending` tasks. Returns the task to
+   * evict first, or null if there is room; throws if the task is refused.
+   */
+  admit(task: ScheduledTask, pending: number): ScheduledTask | null {
+    if (pending < this.capacity) {
+      return null;
+    }
+    const victim = this.evictable?.peek();
+    if (victim && victim.priority < task.priority) {
+      return victim;
+    }
+    throw new Error(`Scheduler is at capacity (${this.capacity} tasks)`);
+  }
+
+  admitMany(count: number, pending: number): void {
+    if (pending + count > this.capacity) {
+      throw new Error(`Scheduler is at capacity (${this.capacity} tasks)`);
+    }
+  }
+
+  track(task: ScheduledTask): void {
+    this.evictable?.enqueue(task.id, task, task.priority);
+  }
+
+  untrack(taskId: string): void {
+    const handle = this.evictable?.get(taskId);
+    if (handle) {
+      this.evictable!.remove(handle);
+    }
+  }
+
+  reprioritize(taskId: string, priority: number): void {
+    const handle = this.evictable?.get(taskId);
+    if (handle) {
+      this.evictable!.updatePriority(handle, priority);
+    }
+  }
+
+  /**
+   * Resolves once a slot may be free; the caller re-checks before using it.
+   */
+  waitForRoom(): Promise<void> {
+    return new Promise(resolve => this.waiters.push(resolve));
+  }
+
+  /**
+   * Backs scheduleAsync(): waits until fewer than `capacity` tasks are
+   * pending instead of applying the overflow policy. Throws if `task` was
+   * scheduled by another caller in the meantime.
+   */
+  async waitToSchedule(task: ScheduledTask, pendingCount: () => number, isPending: (taskId: string) => boolean): Promise<void> {
+    while (pendingCount() >= this.capacity) {
+      if (isPending(task.id)) {
+        throw new Error(`Task ${task.id} is already scheduled`);
+      }
+      await this.waitForRoom();
+    }
+  }
+
+  /**
+   * Wakes as many waiting callers as there are free slots.
+   */
+  release(pending: number): void {
+    let free = this.capacity - pending;
+    while (free > 0 && this.waiters.length > 0) {
+      this.waiters.shift()!();
+      free--;
+    }
+  }
+}
@@ -0,0 +1,410 @@
+import * as fs from 'fs';
+import * as path from 'path';
+import { RetryPolicy, ScheduledTask } from './TaskScheduler';
+
+/**
+ * The durable part of a ScheduledTask. Handlers cannot be serialized, so
+ * they are re-bound by the scheduler when tasks are restored.
+ */
+export interface PersistedTask {
+  id: string;
+  name: string;
+  executeAt: number;
+  priority: number;
+  interval?: number;
+  cron?: string;
+  dependsOn?: string[];
+  retry?: RetryPolicy;
+  timeoutMs?: number;
+  slackMs?: number;
+}
+
+export interface SchedulerJournalOptions {
+  directory: string;
+  snapshotEvery?: number;
+}
+
+type JournalEvent =
+  | { s: number; t: 'schedule'; task: PersistedTask }
+  | { s: number; t: 'cancel'; id: string }
+  | { s: number; t: 'complete'; id: string; next: number | null }
+  | { s: number; t: 'priority'; id: string; priority: number };
+
+const JOURNAL_FILE = 'journal.log';
+const SNAPSHOT_FILE = 'snapshot.bin';
+const SNAPSHOT_MAGIC = 'TSNP';
+const SNAPSHOT_VERSION = 1;
+const HAS_INTERVAL = 1;
+const HAS_CRON = 2;
+const HAS_DEPENDENCIES = 4;
+const HAS_RETRY = 8;
+const HAS_TIMEOUT = 16;
+const HAS_SLACK = 32;
+
+/**
+ * Append-only journal of schedule, cancel, complete and priority events with
+ * periodic binary snapshots. Every event carries a sequence number and a
+ * snapshot records the last sequence it covers, so restoring reads the
+ * snapshot and replays only the journal tail written after it.
+ *
+ * Events are buffered and written in one batch per event loop turn; call
+ * flush() to force them out.
+ */
+export class SchedulerJournal {
+  private directory: string;
+  private snapshotEvery: number;
+  private live: Map<string, PersistedTask> = new Map();
+  private sequence: number = 0;
+  private eventsSinceSnapshot: number = 0;
+  private buffer: string[] = [];
+  private flushScheduled: boolean = false;
+  private fd: number | null = null;
+
+  constructor(options: SchedulerJournalOptions) {
+    this.directory = options.directory;
+    this.snapshotEvery = options.snapshotEvery ?? 10000;
+    fs.mkdirSync(this.directory, { recursive: true });
+  }
+
+  /**
+   * Reads the latest snapshot and the journal tail and returns the tasks that
+   * were still pending, in the order they were scheduled.
+   */
+  load(): PersistedTask[] {
+    this.live.clear();
+    this.sequence = this.readSnapshot();
+    const snapshotSequence = this.sequence;
+    this.eventsSinceSnapshot = 0;
+    for (const event of this.readJournal()) {
+      if (event.s <= snapshotSequence) {
+        continue;
+      }
+      this.apply(event);
+      this.sequence = event.s;
+      this.eventsSinceSnapshot++;
+    }
+    return Array.from(this.live.values());
+  }
+
+  recordSchedule(task: ScheduledTask): void {
+    const persisted: PersistedTask = {
+      id: task.id,
+      name: task.name,
+      executeAt: task.executeAt.getTime(),
+      priority: task.priority
+    };
+    if (task.interval !== undefined) {
+      persisted.interval = task.interval;
+    }
+    if (task.cron !== undefined) {
+      persisted.cron = task.cron;
+    }
+    if (task.dependsOn !== undefined) {
+      persisted.dependsOn = task.dependsOn.slice();
+    }
+    if (task.retry !== undefined) {
+      persisted.retry = { ...task.retry };
+    }
+    if (task.timeoutMs !== undefined) {
+      persisted.timeoutMs = task.timeoutMs;
+    }
+    if (task.slackMs !== undefined) {
+      persisted.slackMs = task.slackMs;
+    }
+    this.record({ s: ++this.sequence, t: 'schedule', task: persisted });
+  }
+
+  recordCancel(id: string): void {
+    this.record({ s: ++this.sequence, t: 'cancel', id });
+  }
+
+  recordComplete(id: string, next: number | null): void {
+    this.record({ s: ++this.sequence, t: 'complete', id, next });
+  }
+
+  recordPriority(id: string, priority: number): void {
+    this.record({ s: ++this.sequence, t: 'priority', id, priority });
+  }
+
+  /**
+   * Writes the buffered events and waits for them to reach the disk, so
+   * every event batch is durable once it has been flushed.
+   */
+  flush(): void {
+    this.flushScheduled = false;
+    if (this.buffer.length === 0) {
+      return;
+    }
+    const data = this.buffer.join('');
+    this.buffer = [];
+    const fd = this.journalFd();
+    fs.writeSync(fd, data);
+    fs.fdatasyncSync(fd);
+  }
+
+  /**
+   * Writes every pending task to a new snapshot and truncates the journal.
+   * The snapshot is synced to disk and renamed into place, and the rename is
+   * synced before the journal is cut, so a crash leaves either the old
+   * snapshot with the full journal or the new one; events it already covers
+   * are skipped on replay.
+   */
+  snapshot(): void {
+    this.flush();
+    const target = path.join(this.directory, SNAPSHOT_FILE);
+    const temporary = `${target}.tmp`;
+    const fd = fs.openSync(temporary, 'w');
+    try {
+      fs.writeSync(fd, this.encodeSnapshot());
+      fs.fsyncSync(fd);
+    } finally {
+      fs.closeSync(fd);
+    }
+    fs.renameSync(temporary, target);
+    this.syncDirectory();
+    fs.ftruncateSync(this.journalFd(), 0);
+    fs.fsyncSync(this.journalFd());
+    this.eventsSinceSnapshot = 0;
+  }
+
+  close(): void {
+    this.flush();
+    if (this.fd !== null) {
+      fs.closeSync(this.fd);
+      this.fd = null;
+    }
+  }
+
+  private record(event: JournalEvent): void {
+    this.apply(event);
+    this.buffer.push(JSON.stringify(event) + '\n');
+    if (!this.flushScheduled) {
+      this.flushScheduled = true;
+      setImmediate(() => this.flush());
+    }
+    if (++this.eventsSinceSnapshot >= this.snapshotEvery) {
+      this.snapshot();
+    }
+  }
+
+  private apply(event: JournalEvent): void {
+    switch (event.t) {
+      case 'schedule':
+        this.live.set(event.task.id, event.task);
+        break;
+      case 'cancel':
+        this.live.delete(event.id);
+        break;
+      case 'complete': {
+        const task = this.live.get(event.id);
+        if (task && event.next !== null) {
+          task.executeAt = event.next;
+        } else {
+          this.live.delete(event.id);
+        }
+        break;
+      }
+      case 'priority': {
+        const task = this.live.get(event.id);
+        if (task) {
+          task.priority = event.priority;
+        }
+        break;
+      }
+    }
+  }
+
+  private journalFd(): number {
+    if (this.fd === null) {
+      this.fd = fs.openSync(path.join(this.directory, JOURNAL_FILE), 'a');
+      this.syncDirectory();
+    }
+    return this.fd;
+  }
+
+  /**
+   * Makes renames and newly created files in the journal directory durable.
+   * Windows cannot open a directory for syncing, and does not need to.
+   */
+  private syncDirectory(): void {
+    if (process.platform === 'win32') {
+      return;
+    }
+    const fd = fs.openSync(this.directory, 'r');
+    try {
+      fs.fsyncSync(fd);
+    } finally {
+      fs.closeSync(fd);
+    }
+  }
+
+  private readJournal(): JournalEvent[] {
+    let content: string;
+    try {
+      content = fs.readFileSync(path.join(this.directory, JOURNAL_FILE), 'utf-8');
+    } catch (error) {
+      return [];
+    }
+    const lines = content.split('\n');
+    const events: JournalEvent[] = [];
+    for (let i = 0; i < lines.length; i++) {
+      if (lines[i] === '') {
+        continue;
+      }
+      try {
+        events.push(JSON.parse(lines[i]));
+      } catch (error) {
+        // A torn final line is what a crash mid-append leaves behind.
+        if (i < lines.length - 1) {
+          throw new Error(`Corrupt scheduler journal at line ${i + 1}`);
+        }
+      }
+    }
+    return events;
+  }
+
+  private encodeSnapshot(): Buffer {
+    let size = SNAPSHOT_MAGIC.length + 1 + 8 + 4;
+    for (const task of this.live.values()) {
+      size += 4 + Buffer.byteLength(task.id) + 4 + Buffer.byteLength(task.name) + 8 + 8 + 1;
+      if (task.interval !== undefined) {
+        size += 8;
+      }
+      if (task.cron !== undefined) {
+        size += 4 + Buffer.byteLength(task.cron);
+      }
+      if (task.dependsOn !== undefined) {
+        size += 4 + task.dependsOn.reduce((total, id) => total + 4 + Buffer.byteLength(id), 0);
+      }
+      if (task.retry !== undefined) {
+        size += 32;
+      }
+      if (task.timeoutMs !== undefined) {
+        size += 8;
+      }
+      if (task.slackMs !== undefined) {
+        size += 8;
+      }
+    }
+    const buffer = Buffer.allocUnsafe(size);
+    let offset = buffer.write(SNAPSHOT_MAGIC, 0, 'latin1');
+    offset = buffer.writeUInt8(SNAPSHOT_VERSION, offset);
+    offset = buffer.writeDoubleLE(this.sequence, offset);
+    offset = buffer.writeUInt32LE(this.live.size, offset);
+    const writeString = (value: string) => {
+      const length = buffer.write(value, offset + 4, 'utf-8');
+      buffer.writeUInt32LE(length, offset);
+      offset += 4 + length;
+    };
+    for (const task of this.live.values()) {
+      writeString(task.id);
+      writeString(task.name);
+      offset = buffer.writeDoubleLE(task.executeAt, offset);
+      offset = buffer.writeDoubleLE(task.priority, offset);
+      const flags = (task.interval !== undefined ? HAS_INTERVAL : 0)
+        | (task.cron !== undefined ? HAS_CRON : 0)
+        | (task.dependsOn !== undefined ? HAS_DEPENDENCIES : 0)
+        | (task.retry !== undefined ? HAS_RETRY : 0)
+        | (task.timeoutMs !== undefined ? HAS_TIMEOUT : 0)
+        | (task.slackMs !== undefined ? HAS_SLACK : 0);
+      offset = buffer.writeUInt8(flags, offset);
+      if (task.interval !== undefined) {
+        offset = buffer.writeDoubleLE(task.interval, offset);
+      }
+      if (task.cron !== undefined) {
+        writeString(task.cron);
+      }
+      if (task.dependsOn !== undefined) {
+        offset = buffer.writeUInt32LE(task.dependsOn.length, offset);
+        task.dependsOn.forEach(writeString);
+      }
+      if (task.retry !== undefined) {
+        offset = buffer.writeDoubleLE(task.retry.maxAttempts, offset);
+        offset = buffer.writeDoubleLE(task.retry.baseDelayMs, offset);
+        offset = buffer.writeDoubleLE(task.retry.maxDelayMs ?? NaN, offset);
+        offset = buffer.writeDoubleLE(task.retry.jitter ?? NaN, offset);
+      }
+      if (task.timeoutMs !== undefined) {
+        offset = buffer.writeDoubleLE(task.timeoutMs, offset);
+      }
+      if (task.slackMs !== undefined) {
+        offset = buffer.writeDoubleLE(task.slackMs, offset);
+      }
+    }
+    return buffer;
+  }
+
+  private readSnapshot(): number {
+    let buffer: Buffer;
+    try {
+      buffer = fs.readFileSync(path.join(this.directory, SNAPSHOT_FILE));
+    } catch (error) {
+      return 0;
+    }
+    if (buffer.toString('latin1', 0, SNAPSHOT_MAGIC.length) !== SNAPSHOT_MAGIC) {
+      throw new Error('Scheduler snapshot has an unknown format');
+    }
+    let offset = SNAPSHOT_MAGIC.length;
+    const version = buffer.readUInt8(offset);
+    if (version !== SNAPSHOT_VERSION) {
+      throw new Error(`Unsupported scheduler snapshot version ${version}`);
+    }
+    offset += 1;
+    const sequence = buffer.readDoubleLE(offset);
+    offset += 8;
+    const count = buffer.readUInt32LE(offset);
+    offset += 4;
+    const readString = (): string => {
+      const length = buffer.readUInt32LE(offset);
+      const value = buffer.toString('utf-8', offset + 4, offset + 4 + length);
+      offset += 4 + length;
+      return value;
+    };
+    for (let i = 0; i < count; i++) {
+      const task: PersistedTask = {
+        id: readString(),
+        name: readString(),
+        executeAt: buffer.readDoubleLE(offset),
+        priority: buffer.readDoubleLE(offset + 8)
+      };
+      offset += 16;
+      const flags = buffer.readUInt8(offset);
+      offset += 1;
+      if (flags & HAS_INTERVAL) {
+        task.interval = buffer.readDoubleLE(offset);
+        offset += 8;
+      }
+      if (flags & HAS_CRON) {
+        task.cron = readString();
+      }
+      if (flags & HAS_DEPENDENCIES) {
+        const length = buffer.readUInt32LE(offset);
+        offset += 4;
+        task.dependsOn = Array.from({ length }, readString);
+      }
+      if (flags & HAS_RETRY) {
+        const retry: RetryPolicy = { maxAttempts: buffer.readDoubleLE(offset), baseDelayMs: buffer.readDoubleLE(offset + 8) };
+        const maxDelayMs = buffer.readDoubleLE(offset + 16);
+        const jitter = buffer.readDoubleLE(offset + 24);
+        offset += 32;
+        if (!Number.isNaN(maxDelayMs)) {
+          retry.maxDelayMs = maxDelayMs;
+        }
+        if (!Number.isNaN(jitter)) {
+          retry.jitter = jitter;
+        }
+        task.retry = retry;
+      }
+      if (flags & HAS_TIMEOUT) {
+        task.timeoutMs = buffer.readDoubleLE(offset);
+        offset += 8;
+      }
+      if (flags & HAS_SLACK) {
+        task.slackMs = buffer.readDoubleLE(offset);
+        offset += 8;
+      }
+      this.live.set(task.id, task);
+    }
+    return sequence;
+  }
+}
@@ -0,0 +1,161 @@
+import { RecordableHistogram, createHistogram, performance } from 'perf_hooks';
+
+export interface HistogramSummary {
+  count: number;
+  min: number;
+  max: number;
+  mean: number;
+  p50: number;
+  p90: number;
+  p99: number;
+  p999: number;
+}
+
+/** How a handler run ended. */
+export type TaskOutcome = 'succeeded' | 'failed' | 'timedOut' | 'cancelled';
+
+export interface SchedulerStatsSnapshot {
+  pending: number;
+  inFlight: number;
+  /** Handler runs that finished, whatever their outcome. */
+  completed: number;
+  failed: number;
+  timedOut: number;
+  cancelled: number;
+  tasksPerSecond: number;
+  dispatchLag: HistogramSummary;
+  handlerDuration: HistogramSummary;
+}
+
+export interface SchedulerStatsOptions {
+  /** Emit a `performance.measure` entry per dispatch for PerformanceObserver consumers. */
+  perfHooks?: boolean;
+  /** Seconds of history used for `tasksPerSecond`. */
+  throughputWindow?: number;
+}
+
+/**
+ * Dispatch instrumentation shared by the schedulers. Latencies go into
+ * Node's native HDR histograms (microsecond resolution) and throughput into
+ * a ring of per-second counters, all allocated up front so recording a task
+ * allocates nothing.
+ */
+export class SchedulerStats {
+  private dispatchLag: RecordableHistogram = createHistogram();
+  private handlerDuration: RecordableHistogram = createHistogram();
+  private completed: number = 0;
+  private failed: number = 0;
+  private timedOut: number = 0;
+  private cancelled: number = 0;
+  private perSecond: Uint32Array;
+  private currentSecond: number;
+  private startedSecond: number;
+  private perfHooks: boolean;
+
+  constructor(options: SchedulerStatsOptions = {}) {
+    this.perSecond = new Uint32Array(options.throughputWindow ?? 10);
+    this.perfHooks = options.perfHooks ?? false;
+    this.currentSecond = Math.floor(Date.now() / 1000);
+    this.startedSecond = this.currentSecond;
+  }
+
+  recordDispatch(executeAt: number, now: number): void {
+    this.dispatchLag.record(toMicros(now - executeAt));
+  }
+
+  /**
+   * Records a finished handler that started at `startedAt` (a
+   * `performance.now()` timestamp).
+   */
+  recordCompletion(name: string, startedAt: number, outcome: TaskOutcome): void {
+    const finishedAt = performance.now();
+    this.handlerDuration.record(toMicros(finishedAt - startedAt));
+    this.completed++;
+    if (outcome === 'failed') {
+      this.failed++;
+    } else if (outcome === 'timedOut') {
+      this.timedOut++;
+    } else if (outcome === 'cancelled') {
+      this.cancelled++;
+    }
+    this.advanceTo(Math.floor(Date.now() / 1000));
+    this.perSecond[this.currentSecond % this.perSecond.length]++;
+    if (this.perfHooks) {
+      const entryName = `task:${name}`;
+      performance.measure(entryName, { start: startedAt, end: finishedAt });
+      performance.clearMeasures(entryName);
+    }
+  }
+
+  snapshot(pending: number, inFlight: number): SchedulerStatsSnapshot {
+    const second = Math.floor(Date.now() / 1000);
+    this.advanceTo(second);
+    let recent = 0;
+    for (let i = 0; i < this.perSecond.length; i++) {
+      recent += this.perSecond[i];
+    }
+    const elapsed = Math.min(this.perSecond.length, second - this.startedSecond + 1);
+    return {
+      pending,
+      inFlight,
+      completed: this.completed,
+      failed: this.failed,
+      timedOut: this.timedOut,
+      cancelled: this.cancelled,
+      tasksPerSecond: recent / elapsed,
+      dispatchLag: summarize(this.dispatchLag),
+      handlerDuration: summarize(this.handlerDuration)
+    };
+  }
+
+  reset(): void {
+    this.dispatchLag.reset();
+    this.handlerDuration.reset();
+    this.completed = 0;
+    this.failed = 0;
+    this.timedOut = 0;
+    this.cancelled = 0;
+    this.perSecond.fill(0);
+    this.currentSecond = Math.floor(Date.now() / 1000);
+    this.startedSecond = this.currentSecond;
+  }
+
+  /**
+   * Zeroes the per-second slots that have gone stale since the last update.
+   */
+  private advanceTo(second: number): void {
+    const stale = Math.min(second - this.currentSecond, this.perSecond.length);
+    for (let i = 1; i <= stale; i++) {
+      this.perSecond[(this.currentSecond + i) % this.perSecond.length] = 0;
+    }
+    if (second > this.currentSecond) {
+      this.currentSecond = second;
+    }
+  }
+}
+
+// HDR histograms only take positive integers, so values are stored in
+// microseconds and clamped to at least 1.
+function toMicros(ms: number): number {
+  return Math.max(1, Math.round(ms * 1000));
+}
+
+function fromMicros(value: number): number {
+  return value / 1000;
+}
+
+function summarize(histogram: RecordableHistogram): HistogramSummary {
+  if (histogram.count === 0) {
+    return { count: 0, min: 0, max: 0, mean: 0, p50: 0, p90: 0, p99: 0, p999: 0 };
+  }
+  return {
+    count: histogram.count,
+    min: fromMicros(histogram.min),
+    max: fromMicros(histogram.max),
+    mean: fromMicros(histogram.mean),
+    p50: fromMicros(histogram.percentile(50)),
+    p90: fromMicros(histogram.percentile(90)),
+    p99: fromMicros(histogram.percentile(99)),
+    p999: fromMicros(histogram.percentile(99.9))
+  };
+}
@@ -0,0 +1,302 @@
+import * as os from 'os';
+import * as path from 'path';
+import { Worker } from 'worker_threads';
+import { AsyncTaskSchedulerOptions } from './AsyncTaskScheduler';
+import { ConsistentHashRing } from './ConsistentHashRing';
+import { SchedulerStatsSnapshot } from './SchedulerStats';
+import { ScheduledTask } from './TaskScheduler';
+import { WorkerTaskSpec } from './WorkerPoolExecutor';
+
+/**
+ * The handler of a sharded task, named by module and export because
+ * functions cannot be sent to another thread. The export is called with
+ * `args` followed by the task's AbortSignal.
+ */
+export type ShardedHandlerSpec = Pick<WorkerTaskSpec, 'modulePath' | 'exportName' | 'args'>;
+
+export interface ShardedTask extends Omit<ScheduledTask, 'handler'> {
+  handler: ShardedHandlerSpec;
+}
+
+export interface ShardedSchedulerOptions {
+  /** Number of worker threads. Defaults to the number of available cores. */
+  shards?: number;
+  /** Points per shard on the hash ring. */
+  virtualNodes?: number;
+  /** Options for the AsyncTaskScheduler in every shard; must be structured-cloneable. */
+  scheduler?: AsyncTaskSchedulerOptions;
+}
+
+interface ShardRequest {
+  resolve: (result: any) => void;
+  reject: (error: Error) => void;
+}
+
+interface Shard {
+  worker: Worker;
+  requests: Map<number, ShardRequest>;
+}
+
+interface ShardWorkerData {
+  schedulerModule: string;
+  options: AsyncTaskSchedulerOptions;
+}
+
+interface ShardReply {
+  requestId: number;
+  ok: boolean;
+  result?: unknown;
+  error?: string;
+}
+
+// Runs inside each shard: an AsyncTaskScheduler driven by request messages.
+// Handler modules are imported once per shard and cached.
+const SHARD_SOURCE = `
+const { parentPort, workerData } = require('worker_threads');
+const { pathToFileURL } = require('url');
+const { AsyncTaskScheduler } = require(workerData.schedulerModule);
+const scheduler = new AsyncTaskScheduler(workerData.options);
+const modules = new Map();
+let running = null;
+const toTask = sharded => {
+  const spec = sharded.handler;
+  return {
+    ...sharded,
+    spec,
+    handler: async signal => {
+      let loaded = modules.get(spec.modulePath);
+      if (!loaded) {
+        loaded = import(pathToFileURL(spec.modulePath).href);
+        modules.set(spec.modulePath, loaded);
+      }
+      const mod = await loaded;
+      const fn = mod[spec.exportName] ?? (mod.default && mod.default[spec.exportName]);
+      if (typeof fn !== 'function') {
+        throw new Error(spec.exportName + ' is not a function exported by ' + spec.modulePath);
+      }
+      await fn(...(spec.args ?? []), signal);
+    }
+  };
+};
+const fromTask = ({ handler, spec, ...task }) => ({ ...task, handler: spec });
+const operations = {
+  schedule: ({ task }) => scheduler.schedule(toTask(task)),
+  scheduleMany: ({ tasks }) => scheduler.scheduleMany(tasks.map(toTask)),
+  cancel: ({ taskId }) => scheduler.cancelTask(taskId),
+  updatePriority: ({ taskId, priority }) => scheduler.updateTaskPriority(taskId, priority),
+  pending: () => scheduler.getPendingTasks().map(fromTask),
+  count: () => scheduler.pendingCount(),
+  stats: () => scheduler.getStats(),
+  start: () => {
+    running = running ?? scheduler.start();
+  },
+  stop: async () => {
+    scheduler.stop();
+    await running;
+    running = null;
+  }
+};
+parentPort.on('message', async message => {
+  try {
+    const result = await operations[message.op](message);
+    parentPort.postMessage({ requestId: message.requestId, ok: true, result });
+  } catch (error) {
+    parentPort.postMessage({ requestId: message.requestId, ok: false, error: error instanceof Error ? error.message : String(error) });
+  }
+});
+`;
+
+/**
+ * Front-end that spreads tasks over several AsyncTaskScheduler instances,
+ * each on its own worker thread, so dispatch is not limited to one event
+ * loop. Task ids are placed on shards by consistent hashing and every
+ * per-task call is routed to the owning shard; counts and pending lists are
+ * gathered from all of them. `dependsOn` may only name tasks placed on the
+ * same shard; a task with a dependency on another shard is rejected, since
+ * shards cannot see each other's tasks.
+ *
+ * A shard whose worker dies is replaced by an empty one, started if the
+ * scheduler is running; requests in flight on it are rejected and the tasks
+ * it held are lost. Shards keep the process alive until close() is called,
+ * after which every request is rejected.
+ */
+export class ShardedScheduler {
+  private shards: Shard[] = [];
+  private ring: ConsistentHashRing;
+  private nextRequestId: number = 0;
+  private stopped: Promise<void> | null = null;
+  private resolveStopped: (() => void) | null = null;
+  private workerData: ShardWorkerData;
+  private closed: boolean = false;
+
+  constructor(options: ShardedSchedulerOptions = {}) {
+    const count = options.shards ?? os.availableParallelism();
+    if (count < 1) {
+      throw new Error('A sharded scheduler needs at least one shard');
+    }
+    this.ring = new ConsistentHashRing(count, options.virtualNodes);
+    this.workerData = {
+      schedulerModule: path.join(__dirname, 'AsyncTaskScheduler'),
+      options: options.scheduler ?? {}
+    };
+    for (let i = 0; i < count; i++) {
+      this.shards.push(this.spawn());
+    }
+  }
+
+  shardFor(taskId: string): number {
+    return this.ring.nodeFor(taskId);
+  }
+
+  shardCount(): number {
+    return this.shards.length;
+  }
+
+  async schedule(task: ShardedTask): Promise<void> {
+    this.assertSameShard(task);
+    await this.request(this.shardFor(task.id), 'schedule', { task });
+  }
+
+  /**
+   * Splits the batch by shard and sends each shard its part in one message.
+   * Nothing is sent if any task depends on a task of another shard.
+   */
+  async scheduleMany(tasks: ShardedTask[]): Promise<void> {
+    tasks.forEach(task => this.assertSameShard(task));
+    const batches: ShardedTask[][] = this.shards.map(() => []);
+    for (const task of tasks) {
+      batches[this.shardFor(task.id)].push(task);
+    }
+    await Promise.all(batches.map((batch, shard) => batch.length > 0 ? this.request(shard, 'scheduleMany', { tasks: batch }) : undefined));
+  }
+
+  cancelTask(taskId: string): Promise<boolean> {
+    return this.request(this.shardFor(taskId), 'cancel', { taskId });
+  }
+
+  updateTaskPriority(taskId: string, priority: number): Promise<boolean> {
+    return this.request(this.shardFor(taskId), 'updatePriority', { taskId, priority });
+  }
+
+  /**
+   * Starts every shard and resolves once stop() has drained them all.
+   */
+  async start(): Promise<void> {
+    if (this.stopped) {
+      return this.stopped;
+    }
+    this.stopped = new Promise(resolve => {
+      this.resolveStopped = resolve;
+    });
+    await this.broadcast('start');
+    return this.stopped;
+  }
+
+  async stop(): Promise<void> {
+    await this.broadcast('stop');
+    this.resolveStopped?.();
+    this.stopped = null;
+    this.resolveStopped = null;
+  }
+
+  /**
+   * Pending tasks of every shard, merged by `executeAt` then priority.
+   */
+  async getPendingTasks(): Promise<ShardedTask[]> {
+    const perShard: ShardedTask[][] = await this.broadcast('pending');
+    return perShard
+      .flat()
+      .sort((a, b) => a.executeAt.getTime() - b.executeAt.getTime() || b.priority - a.priority);
+  }
+
+  async pendingCount(): Promise<number> {
+    const counts: number[] = await this.broadcast('count');
+    return counts.reduce((total, count) => total + count, 0);
+  }
+
+  getShardStats(): Promise<SchedulerStatsSnapshot[]> {
+    return this.broadcast('stats');
+  }
+
+  async close(): Promise<void> {
+    this.closed = true;
+    this.resolveStopped?.();
+    await Promise.all(this.shards.map(shard => {
+      this.failRequests(shard, new Error('Sharded scheduler is closed'));
+      return shard.worker.terminate();
+    }));
+  }
+
+  private assertSameShard(task: ShardedTask): void {
+    const shard = this.shardFor(task.id);
+    for (const dependency of task.dependsOn ?? []) {
+      if (this.shardFor(dependency) !== shard) {
+        throw new Error(`Task ${task.id} depends on ${dependency}, which is placed on another shard`);
+      }
+    }
+  }
+
+  private spawn(): Shard {
+    const shard: Shard = { worker: new Worker(SHARD_SOURCE, { eval: true, workerData: this.workerData }), requests: new Map() };
+    shard.worker.on('message', (reply: ShardReply) => {
+      const request = shard.requests.get(reply.requestId);
+      if (!request) {
+        return;
+      }
+      shard.requests.delete(reply.requestId);
+      if (reply.ok) {
+        request.resolve(reply.result);
+      } else {
+        request.reject(new Error(reply.error));
+      }
+    });
+    shard.worker.on('error', error => this.replace(shard, error));
+    shard.worker.on('exit', code => {
+      if (!this.closed) {
+        this.replace(shard, new Error(`Shard exited with code ${code}`));
+      }
+    });
+    return shard;
+  }
+
+  /**
+   * Swaps a dead shard for a fresh worker at the same ring position, so
+   * later requests for its tasks are served instead of hanging.
+   */
+  private replace(shard: Shard, error: Error): void {
+    const index = this.shards.indexOf(shard);
+    if (index === -1 || this.closed) {
+      return;
+    }
+    this.failRequests(shard, error);
+    shard.worker.removeAllListeners();
+    void shard.worker.terminate();
+    this.shards[index] = this.spawn();
+    if (this.stopped) {
+      this.request(index, 'start').catch(() => undefined);
+    }
+  }
+
+  private request<R>(index: number, op: string, payload: Record<string, unknown> = {}): Promise<R> {
+    if (this.closed) {
+      return Promise.reject(new Error('Sharded scheduler is closed'));
+    }
+    const shard = this.shards[index];
+    const requestId = this.nextRequestId++;
+    return new Promise<R>((resolve, reject) => {
+      shard.requests.set(requestId, { resolve, reject });
+      shard.worker.postMessage({ ...payload, op, requestId });
+    });
+  }
+
+  private broadcast<R>(op: string): Promise<R[]> {
+    return Promise.all(this.shards.map((shard, index) => this.request<R>(index, op)));
+  }
+
+  private failRequests(shard: Shard, error: Error): void {
+    for (const request of shard.requests.values()) {
+      request.reject(error);
+    }
+    shard.requests.clear();
+  }
+}
@@ -0,0 +1,169 @@
+import type { TaskOutcome } from './SchedulerStats';
+import type { ScheduledTask } from './TaskScheduler';
+
+interface BlockedTask {
+  task: ScheduledTask;
+  /** In-degree: dependencies that have not finished yet. */
+  waitingOn: number;
+}
+
+/**
+ * Tasks held back by `dependsOn`, shared by the schedulers. Every blocked
+ * task keeps a count of unfinished dependencies and every dependency keeps
+ * the ids of the tasks waiting on it, so finishing a task releases its
+ * dependents in O(out-degree) without rescanning the blocked set.
+ */
+export class TaskDependencies {
+  private blocked: Map<string, BlockedTask> = new Map();
+  private dependents: Map<string, string[]> = new Map();
+
+  /**
+   * Holds `task` back until every dependency for which `isPending` is true
+   * has finished. Dependencies that are not pending count as finished.
+   * Returns false, without holding the task, if there is nothing to wait for.
+   */
+  block(task: ScheduledTask, isPending: (taskId: string) => boolean): boolean {
+    let waitingOn = 0;
+    for (const dependency of new Set(task.dependsOn ?? [])) {
+      if (!isPending(dependency)) {
+        continue;
+      }
+      let waiting = this.dependents.get(dependency);
+      if (!waiting) {
+        waiting = [];
+        this.dependents.set(dependency, waiting);
+      }
+      waiting.push(task.id);
+      waitingOn++;
+    }
+    if (waitingOn === 0) {
+      return false;
+    }
+    this.blocked.set(task.id, { task, waitingOn });
+    return true;
+  }
+
+  /**
+   * block() for every task of a batch, where tasks may also wait on others
+   * in the batch. Returns the tasks that are not held back, in order.
+   */
+  blockMany(tasks: ScheduledTask[], isPending: (taskId: string) => boolean): ScheduledTask[] {
+    const ids = new Set(tasks.map(task => task.id));
+    return tasks.filter(task => !this.block(task, taskId => ids.has(taskId) || isPending(taskId)));
+  }
+
+  has(taskId: string): boolean {
+    return this.blocked.has(taskId);
+  }
+
+  get(taskId: string): ScheduledTask | undefined {
+    return this.blocked.get(taskId)?.task;
+  }
+
+  size(): number {
+    return this.blocked.size;
+  }
+
+  values(): ScheduledTask[] {
+    return Array.from(this.blocked.values(), entry => entry.task);
+  }
+
+  /**
+   * Drops a blocked task and its edges, so a task later scheduled under the
+   * same id starts from a clean count.
+   */
+  remove(taskId: string): boolean {
+    const entry = this.blocked.get(taskId);
+    if (!entry) {
+      return false;
+    }
+    this.blocked.delete(taskId);
+    for (const dependency of new Set(entry.task.dependsOn ?? [])) {
+      const waiting = this.dependents.get(dependency);
+      const index = waiting ? waiting.indexOf(taskId) : -1;
+      if (index !== -1) {
+        waiting!.splice(index, 1);
+      }
+    }
+    return true;
+  }
+
+  /**
+   * Called when `taskId` has run successfully. Returns the dependents that
+   * no longer wait on anything, in the order they were blocked.
+   */
+  release(taskId: string): ScheduledTask[] {
+    const ready: ScheduledTask[] = [];
+    for (const dependent of this.detach(taskId)) {
+      const entry = this.blocked.get(dependent);
+      if (entry && --entry.waitingOn === 0) {
+        this.blocked.delete(dependent);
+        ready.push(entry.task);
+      }
+    }
+    return ready;
+  }
+
+  /**
+   * Called when `taskId` is done for good: its final attempt ended with
+   * `outcome`, or it was cancelled. Dependents it released go to `enqueue`
+   * if it succeeded; otherwise every dependent goes to `cancel`.
+   */
+  settle(taskId: string, outcome: TaskOutcome, enqueue: (task: ScheduledTask) => void, cancel: (taskId: string) => void): void {
+    if (outcome === 'succeeded') {
+      for (const task of this.release(taskId)) {
+        enqueue(task);
+      }
+    } else {
+      for (const dependent of this.detach(taskId)) {
+        cancel(dependent);
+      }
+    }
+  }
+
+  /**
+   * Forgets which tasks wait on `taskId` and returns their ids, so the
+   * caller can cancel them when `taskId` fails or is cancelled.
+   */
+  detach(taskId: string): string[] {
+    const waiting = this.dependents.get(taskId) ?? [];
+    this.dependents.delete(taskId);
+    return waiting;
+  }
+}
+
+/**
+ * Throws if tasks scheduled together depend on each other in a cycle, which
+ * would leave all of them blocked forever.
+ */
+export function assertAcyclic(tasks: ScheduledTask[]): void {
+  const batch = new Map(tasks.map(task => [task.id, task]));
+  const inDegree: Map<string, number> = new Map();
+  const dependents: Map<string, string[]> = new Map();
+  for (const task of tasks) {
+    const dependencies = new Set((task.dependsOn ?? []).filter(id => batch.has(id)));
+    inDegree.set(task.id, dependencies.size);
+    for (const dependency of dependencies) {
+      const waiting = dependents.get(dependency) ?? [];
+      waiting.push(task.id);
+      dependents.set(dependency, waiting);
+    }
+  }
+  const ready = tasks.filter(task => inDegree.get(task.id) === 0).map(task => task.id);
+  let visited = 0;
+  while (ready.length > 0) {
+    const taskId = ready.pop()!;
+    visited++;
+    for (const dependent of dependents.get(taskId) ?? []) {
+      const remaining = inDegree.get(dependent)! - 1;
+      inDegree.set(dependent, remaining);
+      if (remaining === 0) {
+        ready.push(dependent);
+      }
+    }
+  }
+  if (visited < tasks.length) {
+    const cycle = tasks.filter(task => inDegree.get(task.id)! > 0).map(task => task.id);
+    throw new Error(`Tasks ${cycle.join(', ')} form a dependency cycle`);
+  }
+}
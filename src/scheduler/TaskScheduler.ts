@@ -1,37 +1,916 @@
+import { performance } from 'perf_hooks';
+import { CronExpression } from './CronExpression';
+import { IndexedPriorityQueue } from './IndexedPriorityQueue';
+import { LeaseKey, LeaseResult, LeaseStore } from './LeaseStore';
+import { PendingTaskSource, PendingTasksQuery, listSource, queueSource, walkPendingTasks } from './PendingTasks';
+import { PriorityItem } from './PriorityQueue';
+import { OverflowPolicy, SchedulerCapacity } from './SchedulerCapacity';
+import { PersistedTask, SchedulerJournal } from './SchedulerJournal';
+import { SchedulerStats, SchedulerStatsSnapshot, TaskOutcome } from './SchedulerStats';
+import { TaskDependencies, assertAcyclic } from './TaskDependencies';
+import { TimingWheel } from './TimingWheel';
+
+export type { PendingTasksQuery };
+
 export interface ScheduledTask {
   id: string;
   name: string;
   executeAt: Date;
   priority: number;
-  handler: () => Promise<void>;
+  /** Receives a signal that fires when the task times out or is cancelled while running. */
+  handler: (signal: AbortSignal) => Promise<void>;
+  /** Abort the handler if it has not settled after this many ms. */
+  timeoutMs?: number;
+  /** How late the task may start so its wake-up can be shared with other tasks. Overrides the scheduler's `slackMs`. */
+  slackMs?: number;
+  /** Re-run every `interval` ms after `executeAt`. */
+  interval?: number;
+  /** Re-run on this five-field cron expression after the first run at `executeAt`. */
+  cron?: string;
+  /** Re-run the task with exponential backoff when the handler fails or times out. */
+  retry?: RetryPolicy;
+  /**
+   * Ids of pending tasks that must run successfully before this one is
+   * released. If one of them fails or is cancelled, this task is cancelled.
+   */
+  dependsOn?: string[];
+}
+
+export interface RetryPolicy {
+  /** Total number of runs, the first one included. */
+  maxAttempts: number;
+  /** Delay before the first retry; each further retry doubles it. */
+  baseDelayMs: number;
+  maxDelayMs?: number;
+  /** Fraction of each delay that is randomized, from 0 (none) to 1 (full jitter). */
+  jitter?: number;
+}
+
+/**
+ * Failed runs of a task that is being retried, and the `executeAt` it had
+ * before the first retry moved it.
+ */
+export interface RetryState {
+  attempts: number;
+  executeAt: Date;
+}
+
+/**
+ * Dispatch order shared by the schedulers: earliest `executeAt` first, then
+ * higher priority, then insertion order.
+ */
+export function compareScheduledTasks(a: PriorityItem<ScheduledTask>, b: PriorityItem<ScheduledTask>): number {
+  return a.value.executeAt.getTime() - b.value.executeAt.getTime() || b.priority - a.priority;
+}
+
+/**
+ * Rejects malformed recurrence and timeout settings up front so a bad task
+ * fails in schedule() rather than after its first run.
+ */
+export function validateTask(task: ScheduledTask): void {
+  if (task.timeoutMs !== undefined && !(task.timeoutMs > 0)) {
+    throw new Error(`Task ${task.id} timeoutMs must be positive`);
+  }
+  if (task.slackMs !== undefined && !(task.slackMs >= 0)) {
+    throw new Error(`Task ${task.id} slackMs must not be negative`);
+  }
+  if (task.retry !== undefined) {
+    const { maxAttempts, baseDelayMs, jitter = 0 } = task.retry;
+    if (!Number.isInteger(maxAttempts) || maxAttempts < 1 || !(baseDelayMs >= 0) || !(jitter >= 0 && jitter <= 1)) {
+      throw new Error(`Task ${task.id} has an invalid retry policy`);
+    }
+  }
+  if (task.interval !== undefined && task.cron !== undefined) {
+    throw new Error(`Task ${task.id} cannot have both an interval and a cron expression`);
+  }
+  if (task.interval !== undefined && !(task.interval > 0)) {
+    throw new Error(`Task ${task.id} interval must be positive`);
+  }
+  if (task.cron !== undefined) {
+    CronExpression.parse(task.cron);
+  }
+  if (task.dependsOn?.includes(task.id)) {
+    throw new Error(`Task ${task.id} cannot depend on itself`);
+  }
+}
+
+/**
+ * validateTask() for a batch passed to scheduleMany(), which also rejects
+ * ids that repeat or are already pending and dependency cycles within the
+ * batch, all before anything is enqueued.
+ */
+export function validateBatch(tasks: ScheduledTask[], isPending: (taskId: string) => boolean): void {
+  const ids = new Set<string>();
+  for (const task of tasks) {
+    if (ids.has(task.id) || isPending(task.id)) {
+      throw new Error(`Task ${task.id} is already scheduled`);
+    }
+    ids.add(task.id);
+    validateTask(task);
+  }
+  assertAcyclic(tasks);
+}
+
+/**
+ * Runs a task's handler with a signal that fires when `controller` is
+ * aborted or `task.timeoutMs` elapses. Settles as soon as the signal fires,
+ * so a handler that ignores it no longer holds its slot.
+ */
+export async function runHandler(task: ScheduledTask, controller: AbortController): Promise<TaskOutcome> {
+  let timedOut = false;
+  const timer = task.timeoutMs === undefined ? null : setTimeout(() => {
+    timedOut = true;
+    controller.abort(new Error(`Task ${task.id} timed out after ${task.timeoutMs}ms`));
+  }, task.timeoutMs);
+  let onAbort: () => void = () => {};
+  const aborted = new Promise<never>((resolve, reject) => {
+    onAbort = () => reject(controller.signal.reason);
+    controller.signal.addEventListener('abort', onAbort, { once: true });
+  });
+  try {
+    await Promise.race([task.handler(controller.signal), aborted]);
+    return 'succeeded';
+  } catch (error) {
+    if (timedOut) {
+      console.error(`Task ${task.id} timed out after ${task.timeoutMs}ms`);
+      return 'timedOut';
+    }
+    if (controller.signal.aborted) {
+      return 'cancelled';
+    }
+    console.error(`Task ${task.id} failed:`, error);
+    return 'failed';
+  } finally {
+    if (timer) {
+      clearTimeout(timer);
+    }
+    controller.signal.removeEventListener('abort', onAbort);
+  }
+}
+
+/**
+ * Delay before retry number `attempt` (1 for the first retry).
+ */
+export function retryDelay(policy: RetryPolicy, attempt: number, random: () => number = Math.random): number {
+  const delay = Math.min(policy.maxDelayMs ?? Infinity, policy.baseDelayMs * 2 ** (attempt - 1));
+  return delay - delay * (policy.jitter ?? 0) * random();
+}
+
+/**
+ * Decides whether a finished run is retried and returns the retry time, or
+ * null. Once a task succeeds or runs out of attempts its original
+ * `executeAt` is put back, so a recurring task keeps its schedule.
+ */
+export function planRetry(task: ScheduledTask, outcome: TaskOutcome, retries: Map<string, RetryState>, now: number): number | null {
+  const state = retries.get(task.id);
+  if (task.retry && (outcome === 'failed' || outcome === 'timedOut')) {
+    const attempts = (state?.attempts ?? 0) + 1;
+    if (attempts < task.retry.maxAttempts) {
+      retries.set(task.id, { attempts, executeAt: state?.executeAt ?? task.executeAt });
+      return now + retryDelay(task.retry, attempts);
+    }
+  }
+  if (state) {
+    task.executeAt = state.executeAt;
+    retries.delete(task.id);
+  }
+  return null;
+}
+
+export function isRecurring(task: ScheduledTask): boolean {
+  return task.interval !== undefined || task.cron !== undefined;
+}
+
+/**
+ * Returns the next run of a recurring task after `now`, or null for one-off
+ * tasks. Interval tasks keep their original phase and skip missed runs.
+ */
+export function nextExecutionTime(task: ScheduledTask, now: number): number | null {
+  if (task.cron !== undefined) {
+    return CronExpression.parse(task.cron).next(now);
+  }
+  if (task.interval !== undefined) {
+    const previous = task.executeAt.getTime();
+    const missed = Math.max(0, Math.floor((now - previous) / task.interval));
+    return previous + (missed + 1) * task.interval;
+  }
+  return null;
+}
+
+/**
+ * How the scheduler finds due tasks. `heap` keeps future tasks in a binary
+ * heap ordered by `executeAt`; `wheel` parks them in a hierarchical timing
+ * wheel instead. Either way a task moves into its lane's ready heap once due.
+ */
+export type TimeIndexMode = 'heap' | 'wheel';
+
+/**
+ * A share of dispatches for tasks whose priority is at least `minPriority`
+ * (and below the next lane up). Lanes with due work are served in
+ * proportion to their `weight`.
+ */
+export interface WeightedLane {
+  name: string;
+  minPriority: number;
+  weight: number;
+}
+
+export interface TaskSchedulerOptions {
+  timeIndex?: TimeIndexMode;
+  pollInterval?: number;
+  /** Persists scheduler state; pending tasks are restored from it on construction. */
+  journal?: SchedulerJournal;
+  /** Re-binds a handler to a task restored from the journal. Required with `journal`. */
+  resolveHandler?: (task: PersistedTask) => () => Promise<void>;
+  /** Emit a `performance.measure` entry for every dispatched task. */
+  perfHooks?: boolean;
+  /** Fraction of cancelled entries the task queue tolerates before compacting. */
+  compactionThreshold?: number;
+  /** Priority lanes served by weighted fair queueing. Defaults to a single lane. */
+  lanes?: WeightedLane[];
+  /** Aging: a lane whose next task has been due for longer than this many ms is served first. */
+  maxWait?: number;
+  /** Maximum number of pending tasks, running ones included. Unbounded by default. */
+  capacity?: number;
+  /** What schedule() does once `capacity` is reached. Defaults to `reject`. */
+  overflow?: OverflowPolicy;
+  /**
+   * Shares the task set with other scheduler processes: a due task only runs
+   * in the process that claims its lease from this store.
+   */
+  leases?: LeaseStore;
 }
 
+interface LaneState {
+  lane: WeightedLane;
+  ready: IndexedPriorityQueue<ScheduledTask>;
+  pass: number;
+}
+
+interface DeferredRun {
+  /** The run's lease key. */
+  runAt: number;
+  /** The task's own executeAt, put back once the run is claimed. */
+  executeAt: Date;
+}
+
+interface WaitingTask {
+  task: ScheduledTask;
+  /** Position in the timing wheel, which breaks ties like a stable sort. */
+  ordinal: number;
+}
+
+function compareWaitingTasks(a: ScheduledTask, aOrdinal: number, b: ScheduledTask, bOrdinal: number): number {
+  return a.executeAt.getTime() - b.executeAt.getTime() || b.priority - a.priority || aOrdinal - bOrdinal;
+}
+
+interface UnsettledLease {
+  key: LeaseKey;
+  /** The retry time the lease is held until, or null to complete the run. */
+  retryAt: number | null;
+}
+
+/**
+ * Polls for due tasks and runs them one at a time. Future tasks wait in a
+ * time-ordered delay heap (or the timing wheel); once due they move into
+ * their lane's ready heap, which is ordered by priority, so every dispatch
+ * is an O(log n) pop of the most important due task. When several lanes
+ * have ready work the next one is picked by stride scheduling: each
+ * dispatch advances the lane's pass by 1 / weight and the lane with the
+ * lowest pass goes next, so a busy high-priority lane cannot starve the
+ * others.
+ *
+ * With a lease store, several processes can schedule the same tasks and
+ * each run happens once. Due tasks are claimed in one batch per poll and
+ * their leases are renewed while they wait and run. A task leased by
+ * another process waits until that lease expires and then claims it again,
+ * so the runs of a crashed process are taken over; a run another process
+ * has finished is skipped. A failed attempt that will be retried keeps its
+ * lease through the backoff, so a run is only marked finished once its
+ * final attempt ends. A failed store call is logged and retried on the
+ * next poll. Cancelling a task only affects this process.
+ */
 export class TaskScheduler {
-  private tasks: ScheduledTask[] = [];
+  private tasks: IndexedPriorityQueue<ScheduledTask>;
+  private lanes: LaneState[];
+  private virtualTime: number = 0;
+  private maxWait: number;
+  private timingWheel: TimingWheel<ScheduledTask> | null;
+  private runningTasks: Map<string, ScheduledTask> = new Map();
+  private cancelledWhileRunning: Set<string> = new Set();
+  private abortControllers: Map<string, AbortController> = new Map();
+  private retries: Map<string, RetryState> = new Map();
+  private dependencies: TaskDependencies = new TaskDependencies();
   private isRunning: boolean = false;
+  private pollInterval: number;
+  private journal: SchedulerJournal | null;
+  private stats: SchedulerStats;
+  private capacity: SchedulerCapacity;
+  private leases: LeaseStore | null;
+  /** Runs this process holds a lease on, by task id. */
+  private claimed: Map<string, number> = new Map();
+  /**
+   * Tasks whose executeAt has moved off their run, by task id: runs leased
+   * by another process, waiting for that lease to expire, and runs this
+   * process holds, waiting for a retry.
+   */
+  private deferred: Map<string, DeferredRun> = new Map();
+  /** Tasks promoted to a ready heap since the last claim. */
+  private unclaimed: ScheduledTask[] = [];
+  /** Leases of finished attempts the store failed to settle, retried every poll. */
+  private unsettled: UnsettledLease[] = [];
+
+  constructor(options: TaskSchedulerOptions = {}) {
+    this.stats = new SchedulerStats({ perfHooks: options.perfHooks });
+    this.capacity = new SchedulerCapacity({ capacity: options.capacity, overflow: options.overflow });
+    const lanes = options.lanes ?? [{ name: 'default', minPriority: -Infinity, weight: 1 }];
+    for (const lane of lanes) {
+      if (!(lane.weight > 0)) {
+        throw new Error(`Lane ${lane.name} weight must be positive`);
+      }
+    }
+    this.tasks = new IndexedPriorityQueue(compareScheduledTasks, { compactionThreshold: options.compactionThreshold });
+    this.lanes = lanes
+      .slice()
+      .sort((a, b) => b.minPriority - a.minPriority)
+      .map(lane => ({
+        lane,
+        ready: new IndexedPriorityQueue<ScheduledTask>(undefined, { compactionThreshold: options.compactionThreshold }),
+        pass: 0
+      }));
+    this.maxWait = options.maxWait ?? Infinity;
+    this.timingWheel = options.timeIndex === 'wheel' ? new TimingWheel() : null;
+    this.pollInterval = options.pollInterval ?? 100;
+    this.leases = options.leases ?? null;
+    this.journal = options.journal ?? null;
+    if (this.journal) {
+      if (!options.resolveHandler) {
+        throw new Error('resolveHandler is required to restore journaled tasks');
+      }
+      this.restore(this.journal, options.resolveHandler);
+    }
+  }
 
   schedule(task: ScheduledTask): void {
-    throw new Error('Schedule failed');
+    if (this.isPending(task.id)) {
+      throw new Error(`Task ${task.id} is already scheduled`);
+    }
+    validateTask(task);
+    const victim = this.capacity.admit(task, this.pendingCount());
+    if (victim) {
+      this.cancelTask(victim.id);
+    }
+    if (!this.dependencies.block(task, taskId => this.isPending(taskId))) {
+      this.enqueue(task);
+    }
+    this.journal?.recordSchedule(task);
+  }
+
+  /**
+   * Like schedule(), but waits for room when the scheduler is full.
+   */
+  async scheduleAsync(task: ScheduledTask): Promise<void> {
+    await this.capacity.waitToSchedule(task, () => this.pendingCount(), taskId => this.isPending(taskId));
+    this.schedule(task);
+  }
+
+  /**
+   * Schedules a batch of tasks. The whole batch is validated before anything
+   * is enqueued, and the heap is built or merged in linear time rather than
+   * sifting each task in. Tasks with the same time and priority keep their
+   * order in `tasks`. Tasks in the batch may depend on each other in any
+   * order, as long as they do not form a cycle.
+   */
+  scheduleMany(tasks: ScheduledTask[]): void {
+    validateBatch(tasks, taskId => this.isPending(taskId));
+    this.capacity.admitMany(tasks.length, this.pendingCount());
+    this.enqueueMany(this.dependencies.blockMany(tasks, taskId => this.isPending(taskId)));
+    if (this.journal) {
+      for (const task of tasks) {
+        this.journal.recordSchedule(task);
+      }
+    }
   }
 
   async start(): Promise<void> {
-    throw new Error('Start failed');
+    if (this.isRunning) {
+      return;
+    }
+    this.isRunning = true;
+    const renewal = this.leases ? setInterval(() => void this.renewLeases(), this.leases.leaseMs / 3) : null;
+    renewal?.unref();
+    try {
+      while (this.isRunning) {
+        await this.runDueTasks(Date.now());
+        await this.sleep(this.pollInterval);
+      }
+    } finally {
+      this.isRunning = false;
+      if (renewal) {
+        clearInterval(renewal);
+        await this.releaseLeases();
+      }
+    }
   }
 
   stop(): void {
-    throw new Error('Stop failed');
+    this.isRunning = false;
+    this.journal?.flush();
   }
 
   getPendingTasks(): ScheduledTask[] {
-    throw new Error('Get pending tasks failed');
+    const ready = this.lanes.flatMap(state => state.ready.toArray());
+    ready.sort((a, b) => b.priority - a.priority);
+    return [...this.runningTasks.values(), ...ready, ...this.tasks.toArray(), ...this.waitingTasks(), ...this.dependencies.values()];
+  }
+
+  /**
+   * Yields pending tasks in the same order as getPendingTasks() without
+   * copying the queue. `after` resumes behind the task with that id; once
+   * that task has left the scheduler the view starts from the front again.
+   */
+  pendingTasks(query: PendingTasksQuery = {}): IterableIterator<ScheduledTask> {
+    return walkPendingTasks(this.pendingSources(), query);
+  }
+
+  pendingCount(): number {
+    return this.runningTasks.size + this.queuedCount();
   }
 
+  getStats(): SchedulerStatsSnapshot {
+    return this.stats.snapshot(this.queuedCount(), this.runningTasks.size);
+  }
+
+  /**
+   * Cancels a task together with every task that depends on it.
+   */
   cancelTask(taskId: string): boolean {
-    throw new Error('Cancel task failed');
+    const cancelled = this.removeTask(taskId);
+    if (cancelled) {
+      this.journal?.recordCancel(taskId);
+      this.capacity.untrack(taskId);
+      this.retries.delete(taskId);
+      const runAt = this.runningTasks.has(taskId) ? undefined : this.claimed.get(taskId) ?? this.deferred.get(taskId)?.runAt;
+      this.deferred.delete(taskId);
+      if (runAt !== undefined) {
+        this.claimed.delete(taskId);
+        this.leases!.release([{ taskId, runAt }]).catch(error => console.error(`Releasing the lease on ${taskId} failed:`, error));
+      }
+      this.settleDependents(taskId, 'cancelled');
+      this.capacity.release(this.pendingCount());
+    }
+    return cancelled;
+  }
+
+  updateTaskPriority(taskId: string, priority: number): boolean {
+    const waiting = this.timingWheel?.get(taskId) ?? this.dependencies.get(taskId);
+    const delayed = waiting ? undefined : this.tasks.get(taskId);
+    const state = waiting || delayed ? undefined : this.readyLaneOf(taskId);
+    if (waiting) {
+      waiting.priority = priority;
+    } else if (delayed) {
+      this.tasks.updatePriority(delayed, priority);
+      delayed.value.priority = priority;
+    } else if (state) {
+      const handle = state.ready.get(taskId)!;
+      const task = handle.value;
+      task.priority = priority;
+      if (this.laneFor(priority) === state) {
+        state.ready.updatePriority(handle, priority);
+      } else {
+        state.ready.remove(handle);
+        this.laneFor(priority).ready.enqueue(task.id, task, priority);
+      }
+    } else {
+      return false;
+    }
+    this.capacity.reprioritize(taskId, priority);
+    this.journal?.recordPriority(taskId, priority);
+    return true;
+  }
+
+  /**
+   * Lanes are ordered by descending minPriority and every ready task sits in
+   * the lane covering its priority, so walking the lanes in order already
+   * gives ready tasks by priority. Only as many tasks as the page still
+   * needs are taken from the timing wheel.
+   */
+  private pendingSources(): PendingTaskSource[] {
+    const wheel = this.timingWheel;
+    const sources = [listSource(this.runningTasks), ...this.lanes.map(state => queueSource(state.ready)), queueSource(this.tasks)];
+    if (wheel) {
+      sources.push({
+        has: taskId => wheel.has(taskId),
+        values: (after, limit) => this.waitingTasks(limit, after === undefined ? undefined : wheel.get(after))
+      });
+    }
+    sources.push(listSource(this.dependencies));
+    return sources;
+  }
+
+  /**
+   * The first `limit` tasks parked in the timing wheel in dispatch order,
+   * starting behind `after`. Tasks due at the same time with the same
+   * priority keep their order in the wheel. A page is picked with a heap
+   * bounded to `limit` that holds the latest task on top, so it costs
+   * O(n log limit) instead of sorting the whole wheel.
+   */
+  private waitingTasks(limit: number = Infinity, after?: ScheduledTask): ScheduledTask[] {
+    if (!this.timingWheel || limit <= 0) {
+      return [];
+    }
+    const selected = new IndexedPriorityQueue<WaitingTask>((a, b) => compareWaitingTasks(b.value.task, b.value.ordinal, a.value.task, a.value.ordinal));
+    // Until `after` itself is reached, tasks tied with it come before it.
+    let afterOrdinal = Infinity;
+    let ordinal = -1;
+    for (const task of this.timingWheel.values()) {
+      ordinal++;
+      if (task === after) {
+        afterOrdinal = ordinal;
+        continue;
+      }
+      if (after && compareWaitingTasks(task, ordinal, after, afterOrdinal) < 0) {
+        continue;
+      }
+      if (selected.size() < limit) {
+        selected.enqueue(task.id, { task, ordinal }, task.priority);
+        continue;
+      }
+      const latest = selected.peek()!;
+      if (compareWaitingTasks(task, ordinal, latest.task, latest.ordinal) < 0) {
+        selected.dequeue();
+        selected.enqueue(task.id, { task, ordinal }, task.priority);
+      }
+    }
+    const page: ScheduledTask[] = [];
+    for (let entry = selected.dequeue(); entry; entry = selected.dequeue()) {
+      page.push(entry.task);
+    }
+    return page.reverse();
+  }
+
+  private removeTask(taskId: string): boolean {
+    if (this.timingWheel?.remove(taskId) || this.dependencies.remove(taskId)) {
+      return true;
+    }
+    if (this.runningTasks.has(taskId)) {
+      this.cancelledWhileRunning.add(taskId);
+      this.abortControllers.get(taskId)!.abort(new Error(`Task ${taskId} was cancelled`));
+      return true;
+    }
+    const handle = this.tasks.get(taskId);
+    if (handle) {
+      return this.tasks.remove(handle);
+    }
+    const state = this.readyLaneOf(taskId);
+    return state !== undefined && state.ready.remove(state.ready.get(taskId)!);
+  }
+
+  private isPending(taskId: string): boolean {
+    if (this.runningTasks.has(taskId) || this.tasks.has(taskId) || this.dependencies.has(taskId) || this.timingWheel?.has(taskId) === true) {
+      return true;
+    }
+    return this.readyLaneOf(taskId) !== undefined;
+  }
+
+  private queuedCount(): number {
+    const ready = this.lanes.reduce((total, state) => total + state.ready.size(), 0);
+    return ready + this.tasks.size() + this.dependencies.size() + (this.timingWheel?.size() ?? 0);
+  }
+
+  private laneFor(priority: number): LaneState {
+    for (const state of this.lanes) {
+      if (priority >= state.lane.minPriority) {
+        return state;
+      }
+    }
+    return this.lanes[this.lanes.length - 1];
+  }
+
+  private readyLaneOf(taskId: string): LaneState | undefined {
+    return this.lanes.find(state => state.ready.has(taskId));
+  }
+
+  /**
+   * Rebuilds the pending set from the journal, heapifying it in one pass
+   * instead of inserting tasks one at a time.
+   */
+  private restore(journal: SchedulerJournal, resolveHandler: (task: PersistedTask) => () => Promise<void>): void {
+    const restored = journal.load().map(record => {
+      const task: ScheduledTask = {
+        id: record.id,
+        name: record.name,
+        executeAt: new Date(record.executeAt),
+        priority: record.priority,
+        handler: resolveHandler(record)
+      };
+      if (record.interval !== undefined) {
+        task.interval = record.interval;
+      }
+      if (record.cron !== undefined) {
+        task.cron = record.cron;
+      }
+      if (record.dependsOn !== undefined) {
+        task.dependsOn = record.dependsOn;
+      }
+      if (record.retry !== undefined) {
+        task.retry = record.retry;
+      }
+      if (record.timeoutMs !== undefined) {
+        task.timeoutMs = record.timeoutMs;
+      }
+      if (record.slackMs !== undefined) {
+        task.slackMs = record.slackMs;
+      }
+      return task;
+    });
+    this.enqueueMany(this.dependencies.blockMany(restored, () => false));
+  }
+
+  private enqueue(task: ScheduledTask): void {
+    this.capacity.track(task);
+    this.park(task);
+  }
+
+  /**
+   * Puts a task into the time index without touching capacity tracking.
+   */
+  private park(task: ScheduledTask): void {
+    if (this.timingWheel) {
+      this.timingWheel.add(task.id, task, task.executeAt.getTime());
+    } else {
+      this.tasks.enqueue(task.id, task, task.priority);
+    }
+  }
+
+  private enqueueMany(tasks: ScheduledTask[]): void {
+    for (const task of tasks) {
+      this.capacity.track(task);
+    }
+    if (this.timingWheel) {
+      for (const task of tasks) {
+        this.timingWheel.add(task.id, task, task.executeAt.getTime());
+      }
+      return;
+    }
+    this.tasks.enqueueMany(tasks.map(task => ({ id: task.id, value: task, priority: task.priority })));
+  }
+
+  /**
+   * Moves every task due by `now` out of the time index into the ready heap
+   * of its lane. With leases they are claimed before the next dispatch.
+   */
+  private promoteDueTasks(now: number): void {
+    let due: ScheduledTask[];
+    if (this.timingWheel) {
+      due = this.timingWheel.advance(now);
+    } else {
+      due = [];
+      let task = this.tasks.peek();
+      while (task && task.executeAt.getTime() <= now) {
+        due.push(this.tasks.dequeue()!);
+        task = this.tasks.peek();
+      }
+    }
+    for (const task of due) {
+      this.laneFor(task.priority).ready.enqueue(task.id, task, task.priority);
+    }
+    if (this.leases) {
+      this.unclaimed.push(...due);
+    }
+  }
+
+  /**
+   * Claims the newly promoted tasks in one store round trip. They stay in
+   * their ready heaps meanwhile, so they can still be cancelled or
+   * reprioritized. Tasks leased elsewhere go back into the time index until
+   * the lease expires; runs finished elsewhere are completed here without
+   * running the handler. Returns false if the store failed, in which case
+   * the tasks stay unclaimed and the next poll tries again.
+   */
+  private async claimDueTasks(now: number): Promise<boolean> {
+    const due = this.unclaimed;
+    this.unclaimed = [];
+    const keys: LeaseKey[] = due.map(task => ({ taskId: task.id, runAt: this.deferred.get(task.id)?.runAt ?? task.executeAt.getTime() }));
+    let results: LeaseResult[];
+    try {
+      results = await this.leases!.claim(keys, now);
+    } catch (error) {
+      console.error('Claiming leases failed:', error);
+      this.unclaimed = due;
+      return false;
+    }
+    due.forEach((task, i) => {
+      const result = results[i];
+      const state = this.readyLaneOf(task.id);
+      const handle = state?.ready.get(task.id);
+      if (handle?.value !== task) {
+        if (result.status === 'granted') {
+          this.leases!.release([keys[i]]).catch(error => console.error(`Releasing the lease on ${task.id} failed:`, error));
+        }
+        return;
+      }
+      const deferred = this.deferred.get(task.id);
+      if (result.status !== 'granted') {
+        state!.ready.remove(handle);
+      }
+      if (result.status === 'leased') {
+        if (!deferred) {
+          this.deferred.set(task.id, { runAt: keys[i].runAt, executeAt: task.executeAt });
+        }
+        task.executeAt = new Date(result.expiresAt);
+        this.park(task);
+        return;
+      }
+      this.deferred.delete(task.id);
+      if (result.status === 'granted') {
+        if (deferred) {
+          task.executeAt = deferred.executeAt;
+        }
+        this.claimed.set(task.id, keys[i].runAt);
+      } else {
+        task.executeAt = new Date(keys[i].runAt);
+        this.capacity.untrack(task.id);
+        this.reschedule(task, 'succeeded');
+        this.capacity.release(this.pendingCount());
+      }
+    });
+    return true;
+  }
+
+  private async renewLeases(): Promise<void> {
+    const keys: LeaseKey[] = Array.from(this.claimed, ([taskId, runAt]) => ({ taskId, runAt }));
+    keys.push(...this.unsettled.map(entry => entry.key));
+    if (keys.length > 0) {
+      try {
+        await this.leases!.renew(keys);
+      } catch (error) {
+        console.error('Renewing leases failed:', error);
+      }
+    }
+  }
+
+  /**
+   * Hands back the leases on claimed tasks that have not started and returns
+   * those tasks to the time index, so they are claimed again on restart.
+   */
+  private async releaseLeases(): Promise<void> {
+    this.unclaimed = [];
+    const keys: LeaseKey[] = [];
+    for (const state of this.lanes) {
+      let task = state.ready.dequeue();
+      while (task) {
+        const runAt = this.claimed.get(task.id);
+        if (runAt !== undefined) {
+          keys.push({ taskId: task.id, runAt });
+          this.claimed.delete(task.id);
+        }
+        this.park(task);
+        task = state.ready.dequeue();
+      }
+    }
+    if (keys.length > 0) {
+      try {
+        await this.leases!.release(keys);
+      } catch (error) {
+        console.error('Releasing leases failed:', error);
+      }
+    }
+  }
+
+  private async runDueTasks(now: number): Promise<void> {
+    if (this.unsettled.length > 0) {
+      await this.settleLeases();
+    }
+    while (this.isRunning) {
+      this.promoteDueTasks(now);
+      if (this.unclaimed.length > 0) {
+        if (!await this.claimDueTasks(now) || !this.isRunning) {
+          return;
+        }
+      }
+      const state = this.nextLane();
+      if (!state) {
+        return;
+      }
+      await this.execute(state.ready.dequeue()!);
+    }
+  }
+
+  /**
+   * Picks the lane to serve among those with a ready task and charges it
+   * for the dispatch. A lane whose head has waited past `maxWait` goes first;
+   * otherwise the lowest pass wins. Passes are clamped to the current
+   * virtual time so a lane that sat idle cannot bank credit and then burst.
+   */
+  private nextLane(): LaneState | undefined {
+    let fairest: LaneState | undefined;
+    let fairestPass = Infinity;
+    let oldest: LaneState | undefined;
+    let oldestDue = Date.now() - this.maxWait;
+    for (const state of this.lanes) {
+      const head = state.ready.peek();
+      if (!head) {
+        continue;
+      }
+      if (head.executeAt.getTime() < oldestDue) {
+        oldest = state;
+        oldestDue = head.executeAt.getTime();
+      }
+      const pass = Math.max(state.pass, this.virtualTime);
+      if (pass < fairestPass) {
+        fairest = state;
+        fairestPass = pass;
+      }
+    }
+    const chosen = oldest ?? fairest;
+    if (chosen) {
+      this.virtualTime = Math.max(chosen.pass, this.virtualTime);
+      chosen.pass = this.virtualTime + 1 / chosen.lane.weight;
+    }
+    return chosen;
+  }
+
+  private async execute(task: ScheduledTask): Promise<void> {
+    const controller = new AbortController();
+    this.capacity.untrack(task.id);
+    this.runningTasks.set(task.id, task);
+    this.abortControllers.set(task.id, controller);
+    this.stats.recordDispatch(task.executeAt.getTime(), Date.now());
+    const startedAt = performance.now();
+    const outcome = await runHandler(task, controller);
+    this.stats.recordCompletion(task.name, startedAt, outcome);
+    this.runningTasks.delete(task.id);
+    this.abortControllers.delete(task.id);
+    const retryAt = this.reschedule(task, outcome);
+    const runAt = this.claimed.get(task.id);
+    if (runAt !== undefined) {
+      this.claimed.delete(task.id);
+      await this.settleLease({ taskId: task.id, runAt }, retryAt);
+    }
+    this.capacity.release(this.pendingCount());
+  }
+
+  /**
+   * Marks a claimed run finished once its final attempt has ended. A run
+   * that will be retried stays leased through the backoff instead, so no
+   * other process takes the failed attempt for a finished run or starts
+   * the run again before the retry is due. If the store fails, the lease
+   * is kept renewed and settled again on the next poll.
+   */
+  private async settleLease(key: LeaseKey, retryAt: number | null): Promise<void> {
+    if (retryAt !== null) {
+      this.deferred.set(key.taskId, { runAt: key.runAt, executeAt: new Date(retryAt) });
+    }
+    try {
+      if (retryAt === null) {
+        await this.leases!.complete([key]);
+      } else {
+        await this.leases!.hold([key], retryAt);
+      }
+    } catch (error) {
+      console.error(`Settling the lease on ${key.taskId} failed:`, error);
+      this.unsettled.push({ key, retryAt });
+    }
+  }
+
+  private async settleLeases(): Promise<void> {
+    const unsettled = this.unsettled;
+    this.unsettled = [];
+    for (const { key, retryAt } of unsettled) {
+      await this.settleLease(key, retryAt);
+    }
+  }
+
+  /**
+   * Puts a task that is being retried, or a recurring one, back into the
+   * time index under its next run time, reusing the same task object.
+   * Returns the retry time, or null if the attempt was the last one.
+   */
+  private reschedule(task: ScheduledTask, outcome: TaskOutcome): number | null {
+    if (this.cancelledWhileRunning.delete(task.id)) {
+      this.retries.delete(task.id);
+      return null;
+    }
+    const now = Date.now();
+    const retryAt = planRetry(task, outcome, this.retries, now);
+    const next = retryAt ?? nextExecutionTime(task, now);
+    this.journal?.recordComplete(task.id, next);
+    if (next !== null) {
+      task.executeAt = new Date(next);
+      this.enqueue(task);
+    }
+    if (retryAt === null) {
+      this.settleDependents(task.id, outcome);
+    }
+    return retryAt;
+  }
+
+  private settleDependents(taskId: string, outcome: TaskOutcome): void {
+    this.dependencies.settle(taskId, outcome, task => this.enqueue(task), dependent => this.cancelTask(dependent));
   }
 
   private sleep(ms: number): Promise<void> {
     return new Promise(resolve => setTimeout(resolve, ms));
   }
 }
-
@@ -0,0 +1,215 @@
+export interface TimingWheelLevel {
+  tickMs: number;
+  slots: number;
+}
+
+/**
+ * Millisecond, second, minute and hour wheels. Deadlines further out than a
+ * day wait in an overflow set that is re-examined once per hour.
+ */
+export const DEFAULT_TIMING_WHEEL_LEVELS: TimingWheelLevel[] = [
+  { tickMs: 1, slots: 1000 },
+  { tickMs: 1000, slots: 60 },
+  { tickMs: 60 * 1000, slots: 60 },
+  { tickMs: 60 * 60 * 1000, slots: 24 }
+];
+
+interface TimerEntry<T> {
+  id: string;
+  value: T;
+  deadline: number;
+  bucket: Set<TimerEntry<T>>;
+  level: number;
+}
+
+/**
+ * Hierarchical timing wheel. Inserting and removing a timer is O(1); each
+ * timer is cascaded at most once per level on its way down to the
+ * millisecond wheel, so expiry is O(1) amortized per timer.
+ */
+export class TimingWheel<T> {
+  private levels: TimingWheelLevel[];
+  private wheels: Set<TimerEntry<T>>[][];
+  private counts: number[];
+  private overflow: Set<TimerEntry<T>> = new Set();
+  private expired: Set<TimerEntry<T>> = new Set();
+  private entries: Map<string, TimerEntry<T>> = new Map();
+  private currentTime: number;
+
+  constructor(startTime: number = Date.now(), levels: TimingWheelLevel[] = DEFAULT_TIMING_WHEEL_LEVELS) {
+    if (levels.length === 0) {
+      throw new Error('Timing wheel needs at least one level');
+    }
+    for (let i = 1; i < levels.length; i++) {
+      if (levels[i].tickMs !== levels[i - 1].tickMs * levels[i - 1].slots) {
+        throw new Error(`Timing wheel level ${i} must tick once per revolution of level ${i - 1}`);
+      }
+    }
+    this.levels = levels;
+    this.wheels = levels.map(level => Array.from({ length: level.slots }, () => new Set<TimerEntry<T>>()));
+    this.counts = levels.map(() => 0);
+    this.currentTime = Math.floor(startTime);
+  }
+
+  add(id: string, value: T, deadline: number): void {
+    if (this.entries.has(id)) {
+      throw new Error(`Duplicate timer id: ${id}`);
+    }
+    const entry: TimerEntry<T> = {
+      id,
+      value,
+      deadline: Math.floor(deadline),
+      bucket: this.expired,
+      level: -1
+    };
+    this.entries.set(id, entry);
+    this.place(entry);
+  }
+
+  remove(id: string): boolean {
+    const entry = this.entries.get(id);
+    if (!entry) {
+      return false;
+    }
+    this.detach(entry);
+    this.entries.delete(id);
+    return true;
+  }
+
+  has(id: string): boolean {
+    return this.entries.has(id);
+  }
+
+  get(id: string): T | undefined {
+    return this.entries.get(id)?.value;
+  }
+
+  size(): number {
+    return this.entries.size;
+  }
+
+  /**
+   * Yields every value in insertion order without copying the wheel.
+   */
+  *values(): IterableIterator<T> {
+    for (const entry of this.entries.values()) {
+      yield entry.value;
+    }
+  }
+
+  /**
+   * Moves the wheel forward to `now` and returns every value whose deadline
+   * has passed, earliest deadline first.
+   */
+  advance(now: number): T[] {
+    const due: T[] = [];
+    this.drainExpired(due);
+    const target = Math.floor(now);
+    while (this.currentTime < target) {
+      this.currentTime = this.nextTick(target);
+      this.cascade();
+      this.drainExpired(due);
+      this.expireSlot(due);
+    }
+    return due;
+  }
+
+  private nextTick(target: number): number {
+    let level = 0;
+    while (level < this.levels.length && this.counts[level] === 0) {
+      level++;
+    }
+    if (level === 0) {
+      return this.currentTime + 1;
+    }
+    if (level === this.levels.length && this.overflow.size === 0) {
+      return target;
+    }
+    const tickMs = this.levels[Math.min(level, this.levels.length - 1)].tickMs;
+    const boundary = (Math.floor(this.currentTime / tickMs) + 1) * tickMs;
+    return Math.min(boundary, target);
+  }
+
+  private cascade(): void {
+    const top = this.levels.length - 1;
+    if (top > 0 && this.currentTime % this.levels[1].tickMs !== 0) {
+      return;
+    }
+    if (this.currentTime % this.levels[top].tickMs === 0 && this.overflow.size > 0) {
+      this.rehome(this.overflow);
+    }
+    for (let level = top; level > 0; level--) {
+      const { tickMs, slots } = this.levels[level];
+      if (this.currentTime % tickMs === 0) {
+        const bucket = this.wheels[level][Math.floor(this.currentTime / tickMs) % slots];
+        this.counts[level] -= bucket.size;
+        this.rehome(bucket);
+      }
+    }
+  }
+
+  private rehome(bucket: Set<TimerEntry<T>>): void {
+    const entries = Array.from(bucket);
+    bucket.clear();
+    for (const entry of entries) {
+      this.place(entry);
+    }
+  }
+
+  private expireSlot(due: T[]): void {
+    const bucket = this.wheels[0][this.currentTime % this.levels[0].slots];
+    if (bucket.size === 0) {
+      return;
+    }
+    this.counts[0] -= bucket.size;
+    for (const entry of bucket) {
+      this.entries.delete(entry.id);
+      due.push(entry.value);
+    }
+    bucket.clear();
+  }
+
+  private drainExpired(due: T[]): void {
+    if (this.expired.size === 0) {
+      return;
+    }
+    const entries = Array.from(this.expired).sort((a, b) => a.deadline - b.deadline);
+    this.expired.clear();
+    for (const entry of entries) {
+      this.entries.delete(entry.id);
+      due.push(entry.value);
+    }
+  }
+
+  private place(entry: TimerEntry<T>): void {
+    if (entry.deadline <= this.currentTime) {
+      this.attach(entry, this.expired, -1);
+      return;
+    }
+    for (let level = 0; level < this.levels.length; level++) {
+      const { tickMs, slots } = this.levels[level];
+      const slot = Math.floor(entry.deadline / tickMs);
+      if (slot - Math.floor(this.currentTime / tickMs) < slots) {
+        this.attach(entry, this.wheels[level][slot % slots], level);
+        return;
+      }
+    }
+    this.attach(entry, this.overflow, -1);
+  }
+
+  private attach(entry: TimerEntry<T>, bucket: Set<TimerEntry<T>>, level: number): void {
+    entry.bucket = bucket;
+    entry.level = level;
+    bucket.add(entry);
+    if (level >= 0) {
+      this.counts[level]++;
+    }
+  }
+
+  private detach(entry: TimerEntry<T>): void {
+    entry.bucket.delete(entry);
+    if (entry.level >= 0) {
+      this.counts[entry.level]--;
+    }
+  }
+}
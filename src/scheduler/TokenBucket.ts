@@ -0,0 +1,46 @@
+export interface RateLimit {
+  /** Tokens added per second. */
+  ratePerSecond: number;
+  /** Bucket capacity, i.e. how many calls may go out back to back. Defaults to one second's worth. */
+  burst?: number;
+}
+
+/**
+ * Token bucket with lazy refill: the whole state is the token balance and
+ * the time it was last refilled. When the bucket is empty a caller can
+ * still reserve a token, which drives the balance negative and returns how
+ * long the caller has to wait for it, so a backlog of callers is spread
+ * over evenly spaced slots instead of all retrying at the next refill.
+ */
+export class TokenBucket {
+  private ratePerMs: number;
+  private capacity: number;
+  private tokens: number;
+  private updatedAt: number;
+
+  constructor(limit: RateLimit, now: number = Date.now()) {
+    if (!(limit.ratePerSecond > 0)) {
+      throw new Error('ratePerSecond must be positive');
+    }
+    this.capacity = limit.burst ?? Math.max(1, limit.ratePerSecond);
+    if (!(this.capacity >= 1)) {
+      throw new Error('burst must be at least 1');
+    }
+    this.ratePerMs = limit.ratePerSecond / 1000;
+    this.tokens = this.capacity;
+    this.updatedAt = now;
+  }
+
+  /**
+   * Takes a token and returns 0, or reserves the next free one and returns
+   * the number of milliseconds until it becomes available.
+   */
+  reserve(now: number): number {
+    if (now > this.updatedAt) {
+      this.tokens = Math.min(this.capacity, this.tokens + (now - this.updatedAt) * this.ratePerMs);
+      this.updatedAt = now;
+    }
+    this.tokens -= 1;
+    return this.tokens >= 0 ? 0 : Math.ceil(-this.tokens / this.ratePerMs);
+  }
+}
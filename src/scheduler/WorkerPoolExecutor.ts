@@ -0,0 +1,221 @@
+import * as os from 'os';
+import * as path from 'path';
+import { TransferListItem, Worker } from 'worker_threads';
+
+/**
+ * A CPU-bound job identified by the module that exports it. The export is
+ * called with `args` inside a worker thread; anything in `transferList` is
+ * moved to the worker instead of copied.
+ */
+export interface WorkerTaskSpec {
+  modulePath: string;
+  exportName: string;
+  args?: unknown[];
+  transferList?: TransferListItem[];
+}
+
+export interface WorkerPoolOptions {
+  size?: number;
+}
+
+interface WorkerJob {
+  spec: WorkerTaskSpec;
+  resolve: (result: any) => void;
+  reject: (error: Error) => void;
+}
+
+interface PoolWorker {
+  worker: Worker;
+  job: WorkerJob | null;
+}
+
+interface WorkerReply {
+  ok: boolean;
+  result?: unknown;
+  error?: string;
+}
+
+// Runs inside each worker. Modules are imported once per worker and cached;
+// typed array and ArrayBuffer results are transferred back without copying.
+const WORKER_SOURCE = `
+const { parentPort } = require('worker_threads');
+const { pathToFileURL } = require('url');
+const modules = new Map();
+parentPort.on('message', async ({ modulePath, exportName, args }) => {
+  try {
+    let loaded = modules.get(modulePath);
+    if (!loaded) {
+      loaded = import(pathToFileURL(modulePath).href);
+      modules.set(modulePath, loaded);
+    }
+    const mod = await loaded;
+    const fn = mod[exportName] ?? (mod.default && mod.default[exportName]);
+    if (typeof fn !== 'function') {
+      throw new Error(exportName + ' is not a function exported by ' + modulePath);
+    }
+    const result = await fn(...args);
+    const transfer = result instanceof ArrayBuffer ? [result] : ArrayBuffer.isView(result) ? [result.buffer] : [];
+    parentPort.postMessage({ ok: true, result }, transfer);
+  } catch (error) {
+    parentPort.postMessage({ ok: false, error: error instanceof Error ? error.message : String(error) });
+  }
+});
+`;
+
+/**
+ * Fixed-size pool of worker threads for CPU-bound task handlers. Jobs are
+ * queued FIFO and handed to the next idle worker. Idle workers are unref'd so
+ * the pool never keeps the process alive on its own.
+ */
+export class WorkerPoolExecutor {
+  private workers: PoolWorker[] = [];
+  private queue: WorkerJob[] = [];
+  private closed: boolean = false;
+
+  constructor(options: WorkerPoolOptions = {}) {
+    const size = options.size ?? Math.max(1, os.availableParallelism() - 1);
+    if (size < 1) {
+      throw new Error('Worker pool size must be at least 1');
+    }
+    for (let i = 0; i < size; i++) {
+      this.workers.push(this.spawn());
+    }
+  }
+
+  /**
+   * Runs `spec` on the next idle worker. Aborting `signal` drops the job if
+   * it is still queued; a job that has started is stopped by terminating
+   * its worker, which is replaced by a fresh one.
+   */
+  run<R = unknown>(spec: WorkerTaskSpec, signal?: AbortSignal): Promise<R> {
+    if (this.closed) {
+      return Promise.reject(new Error('Worker pool is closed'));
+    }
+    if (signal?.aborted) {
+      return Promise.reject(abortError(signal));
+    }
+    return new Promise<R>((resolve, reject) => {
+      const onAbort = () => this.abort(job, abortError(signal!));
+      const job: WorkerJob = {
+        spec: { ...spec, modulePath: path.resolve(spec.modulePath) },
+        resolve: result => {
+          signal?.removeEventListener('abort', onAbort);
+          resolve(result);
+        },
+        reject: error => {
+          signal?.removeEventListener('abort', onAbort);
+          reject(error);
+        }
+      };
+      signal?.addEventListener('abort', onAbort, { once: true });
+      const idle = this.workers.find(poolWorker => poolWorker.job === null);
+      if (idle) {
+        this.assign(idle, job);
+      } else {
+        this.queue.push(job);
+      }
+    });
+  }
+
+  /**
+   * Builds a `ScheduledTask.handler` that runs `spec` on the pool and passes
+   * the worker's return value to `onResult`. A timeout or cancellation of
+   * the task aborts the job.
+   */
+  handler<R = unknown>(spec: WorkerTaskSpec, onResult?: (result: R) => void): (signal: AbortSignal) => Promise<void> {
+    return async signal => {
+      const result = await this.run<R>(spec, signal);
+      onResult?.(result);
+    };
+  }
+
+  size(): number {
+    return this.workers.length;
+  }
+
+  async close(): Promise<void> {
+    this.closed = true;
+    for (const job of this.queue.splice(0)) {
+      job.reject(new Error('Worker pool is closed'));
+    }
+    await Promise.all(this.workers.map(poolWorker => {
+      poolWorker.job?.reject(new Error('Worker pool is closed'));
+      poolWorker.job = null;
+      return poolWorker.worker.terminate();
+    }));
+  }
+
+  private spawn(): PoolWorker {
+    const poolWorker: PoolWorker = { worker: new Worker(WORKER_SOURCE, { eval: true }), job: null };
+    poolWorker.worker.unref();
+    poolWorker.worker.on('message', (reply: WorkerReply) => {
+      const job = poolWorker.job;
+      this.release(poolWorker);
+      if (!job) {
+        return;
+      }
+      if (reply.ok) {
+        job.resolve(reply.result);
+      } else {
+        job.reject(new Error(reply.error));
+      }
+    });
+    poolWorker.worker.on('error', error => this.replace(poolWorker, error));
+    poolWorker.worker.on('exit', code => {
+      if (!this.closed) {
+        this.replace(poolWorker, new Error(`Worker exited with code ${code}`));
+      }
+    });
+    return poolWorker;
+  }
+
+  private assign(poolWorker: PoolWorker, job: WorkerJob): void {
+    poolWorker.job = job;
+    poolWorker.worker.ref();
+    const { modulePath, exportName, args = [], transferList = [] } = job.spec;
+    poolWorker.worker.postMessage({ modulePath, exportName, args }, transferList);
+  }
+
+  private release(poolWorker: PoolWorker): void {
+    poolWorker.job = null;
+    const next = this.queue.shift();
+    if (next) {
+      this.assign(poolWorker, next);
+    } else {
+      poolWorker.worker.unref();
+    }
+  }
+
+  private abort(job: WorkerJob, error: Error): void {
+    const queued = this.queue.indexOf(job);
+    if (queued !== -1) {
+      this.queue.splice(queued, 1);
+      job.reject(error);
+      return;
+    }
+    const busy = this.workers.find(poolWorker => poolWorker.job === job);
+    if (busy) {
+      this.replace(busy, error);
+    }
+  }
+
+  private replace(poolWorker: PoolWorker, error: Error): void {
+    const index = this.workers.indexOf(poolWorker);
+    if (index === -1 || this.closed) {
+      return;
+    }
+    poolWorker.job?.reject(error);
+    poolWorker.worker.removeAllListeners();
+    void poolWorker.worker.terminate();
+    const replacement = this.spawn();
+    this.workers[index] = replacement;
+    const next = this.queue.shift();
+    if (next) {
+      this.assign(replacement, next);
+    }
+  }
+}
+
+function abortError(signal: AbortSignal): Error {
+  return signal.reason instanceof Error ? signal.reason : new Error('Worker job was aborted');
+}
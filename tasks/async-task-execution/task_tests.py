@@ -528,3 +528,1336 @@ def test_scheduler_polling_frequency():
         assert data['taskExecuted'] == True, "Task must be executed"
         assert data['pollingFrequent'] == True, f"Scheduler must check frequently. Task executed with delay of {data['delay']}ms, but should be <= {data['maxAcceptableDelay']}ms. This indicates the sleep interval is too long."
         assert data['delay'] is not None, "Execution time must be recorded"
+
+def test_event_driven_wakeup_rearms_on_new_head():
+    """
+    Test that the scheduler wakes up for a task scheduled while it is idle,
+    re-arms when the head of the queue is cancelled and runs tasks with low lag.
+    """
+    script = """
+    const { AsyncTaskScheduler } = require('./dist/scheduler/AsyncTaskScheduler');
+    
+    const scheduler = new AsyncTaskScheduler();
+    const lags = {};
+    const record = (id, executeAt) => async () => { lags[id] = Date.now() - executeAt; };
+    
+    const farAt = Date.now() + 60 * 60 * 1000;
+    scheduler.schedule({ id: 'far', name: 'Far', executeAt: new Date(farAt), priority: 1, handler: record('far', farAt) });
+    
+    (async () => {
+        const startPromise = scheduler.start();
+        await new Promise(resolve => setTimeout(resolve, 50));
+        
+        const soonAt = Date.now() + 100;
+        scheduler.schedule({ id: 'soon', name: 'Soon', executeAt: new Date(soonAt), priority: 1, handler: record('soon', soonAt) });
+        const headAt = Date.now() + 30;
+        scheduler.schedule({ id: 'head', name: 'Head', executeAt: new Date(headAt), priority: 1, handler: record('head', headAt) });
+        const cancelled = scheduler.cancelTask('head');
+        
+        await new Promise(resolve => setTimeout(resolve, 250));
+        scheduler.stop();
+        await startPromise;
+        
+        console.log(JSON.stringify({
+            cancelled: cancelled,
+            lags: lags,
+            pending: scheduler.getPendingTasks().map(task => task.id)
+        }));
+    })();
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['cancelled'] == True
+        assert 'head' not in data['lags']
+        assert 'soon' in data['lags'], "Task scheduled after start must be picked up"
+        assert data['lags']['soon'] <= 30, f"Dispatch lag should be close to timer resolution, got {data['lags']['soon']}ms"
+        assert data['pending'] == ['far']
+
+def test_bounded_concurrency_pool_with_lanes():
+    """
+    Test that maxConcurrency bounds the number of in-flight handlers, that ready
+    tasks start in priority order and that a critical lane is not blocked by
+    saturated bulk work.
+    """
+    script = """
+    const { AsyncTaskScheduler } = require('./dist/scheduler/AsyncTaskScheduler');
+    
+    const scheduler = new AsyncTaskScheduler({
+        maxConcurrency: 3,
+        lanes: [
+            { name: 'bulk', minPriority: 0, maxConcurrency: 2 },
+            { name: 'critical', minPriority: 100, maxConcurrency: 1 }
+        ]
+    });
+    let active = 0;
+    let maxActive = 0;
+    const startOrder = [];
+    const startedAt = {};
+    const begin = Date.now();
+    const handler = (id, ms) => async () => {
+        startOrder.push(id);
+        startedAt[id] = Date.now() - begin;
+        active++;
+        maxActive = Math.max(maxActive, active);
+        await new Promise(resolve => setTimeout(resolve, ms));
+        active--;
+    };
+    
+    const now = new Date();
+    for (let i = 0; i < 6; i++) {
+        scheduler.schedule({ id: `bulk_${i}`, name: 'Bulk', executeAt: now, priority: i, handler: handler(`bulk_${i}`, 150) });
+    }
+    
+    (async () => {
+        const startPromise = scheduler.start();
+        await new Promise(resolve => setTimeout(resolve, 30));
+        scheduler.schedule({ id: 'critical', name: 'Critical', executeAt: new Date(), priority: 100, handler: handler('critical', 10) });
+        await new Promise(resolve => setTimeout(resolve, 600));
+        scheduler.stop();
+        await startPromise;
+        
+        console.log(JSON.stringify({
+            maxActive: maxActive,
+            firstTwo: startOrder.slice(0, 2),
+            criticalStartedAt: startedAt['critical'],
+            executed: startOrder.length
+        }));
+    })();
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['maxActive'] == 3
+        assert data['firstTwo'] == ['bulk_5', 'bulk_4']
+        assert data['criticalStartedAt'] < 100, "Critical lane must not wait behind bulk work"
+        assert data['executed'] == 7
+
+def test_worker_pool_executor_runs_cpu_tasks(tmp_path):
+    """
+    Test that handlers built by the worker pool executor run the exported
+    function on worker threads, transfer typed arrays and report results.
+    """
+    module_path = tmp_path / 'cpu_job.js'
+    module_path.write_text("""
+    const { threadId } = require('worker_threads');
+    exports.sumSquares = (values) => {
+        let total = 0;
+        for (const value of values) {
+            total += value * value;
+        }
+        return { total, threadId };
+    };
+    exports.double = (values) => values.map(value => value * 2);
+    exports.fail = () => { throw new Error('boom'); };
+    """)
+    
+    script = """
+    const { AsyncTaskScheduler } = require('./dist/scheduler/AsyncTaskScheduler');
+    const { WorkerPoolExecutor } = require('./dist/scheduler/WorkerPoolExecutor');
+    
+    const modulePath = %s;
+    const pool = new WorkerPoolExecutor({ size: 2 });
+    const scheduler = new AsyncTaskScheduler({ maxConcurrency: 4 });
+    const results = [];
+    const now = new Date();
+    for (let i = 0; i < 4; i++) {
+        const values = new Float64Array([1, 2, 3, i]);
+        scheduler.schedule({
+            id: `cpu_${i}`,
+            name: 'CPU',
+            executeAt: now,
+            priority: 1,
+            handler: pool.handler(
+                { modulePath, exportName: 'sumSquares', args: [values], transferList: [values.buffer] },
+                result => results.push(result)
+            )
+        });
+    }
+    
+    (async () => {
+        const startPromise = scheduler.start();
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        scheduler.stop();
+        await startPromise;
+        
+        const doubled = await pool.run({ modulePath, exportName: 'double', args: [new Float64Array([1.5, 2])] });
+        let failure = null;
+        try {
+            await pool.run({ modulePath, exportName: 'fail' });
+        } catch (error) {
+            failure = error.message;
+        }
+        await pool.close();
+        
+        console.log(JSON.stringify({
+            totals: results.map(result => result.total).sort((a, b) => a - b),
+            offMainThread: results.every(result => result.threadId !== 0),
+            doubled: Array.from(doubled),
+            doubledIsTypedArray: doubled instanceof Float64Array,
+            failure: failure
+        }));
+    })();
+    """ % json.dumps(str(module_path))
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=10,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0, f"Script failed: {result.stderr}"
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['totals'] == [14, 15, 18, 23]
+        assert data['offMainThread'] == True
+        assert data['doubled'] == [3, 4]
+        assert data['doubledIsTypedArray'] == True
+        assert data['failure'] == 'boom'
+
+def test_worker_pool_aborts_timed_out_and_queued_jobs(tmp_path):
+    """
+    Test that a task timeout stops the job on its worker, so jobs queued
+    behind it run soon after, and that aborting a queued job drops it before
+    it starts.
+    """
+    module_path = tmp_path / 'spin_job.js'
+    module_path.write_text("""
+    exports.spin = (ms) => {
+        const end = Date.now() + ms;
+        while (Date.now() < end) {}
+        return 'spun';
+    };
+    exports.quick = (id) => id;
+    """)
+    
+    script = """
+    const { AsyncTaskScheduler } = require('./dist/scheduler/AsyncTaskScheduler');
+    const { WorkerPoolExecutor } = require('./dist/scheduler/WorkerPoolExecutor');
+    
+    const modulePath = %s;
+    const pool = new WorkerPoolExecutor({ size: 1 });
+    const scheduler = new AsyncTaskScheduler({ maxConcurrency: 2 });
+    const now = Date.now();
+    const finished = [];
+    scheduler.schedule({ id: 'hung', name: 'hung', executeAt: new Date(now), priority: 2, timeoutMs: 100,
+        handler: pool.handler({ modulePath, exportName: 'spin', args: [3000] }, () => finished.push(['hung', Date.now() - now])) });
+    scheduler.schedule({ id: 'next', name: 'next', executeAt: new Date(now), priority: 1,
+        handler: pool.handler({ modulePath, exportName: 'quick', args: ['next'] }, () => finished.push(['next', Date.now() - now])) });
+    
+    (async () => {
+        const startPromise = scheduler.start();
+        while (scheduler.pendingCount() > 0) {
+            await new Promise(resolve => setTimeout(resolve, 10));
+        }
+        scheduler.stop();
+        await startPromise;
+        
+        const controller = new AbortController();
+        const busy = pool.run({ modulePath, exportName: 'spin', args: [200] });
+        const queued = pool.run({ modulePath, exportName: 'spin', args: [2000] }, controller.signal);
+        controller.abort(new Error('not needed'));
+        const queuedError = await queued.then(() => null, error => error.message);
+        const busyResult = await busy;
+        const afterStart = Date.now();
+        const after = await pool.run({ modulePath, exportName: 'quick', args: ['after'] });
+        await pool.close();
+        
+        console.log(JSON.stringify({ finished, queuedError, busyResult, after, afterMs: Date.now() - afterStart }));
+    })();
+    """ % json.dumps(str(module_path))
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=10,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0, f"Script failed: {result.stderr}"
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert [task for task, _ in data['finished']] == ['next']
+        assert data['finished'][0][1] < 1500
+        assert data['queuedError'] == 'not needed'
+        assert data['busyResult'] == 'spun'
+        assert data['after'] == 'after'
+        assert data['afterMs'] < 1000
+
+def test_recurring_task_cancelled_while_running():
+    """
+    Test that a recurring task keeps running on its interval and that
+    cancelling it mid-run stops further runs.
+    """
+    script = """
+    const { AsyncTaskScheduler } = require('./dist/scheduler/AsyncTaskScheduler');
+    
+    const scheduler = new AsyncTaskScheduler();
+    let runs = 0;
+    let cancelled = null;
+    scheduler.schedule({
+        id: 'heartbeat',
+        name: 'Heartbeat',
+        executeAt: new Date(Date.now() + 20),
+        priority: 1,
+        interval: 50,
+        handler: async () => {
+            runs++;
+            if (runs === 3) {
+                cancelled = scheduler.cancelTask('heartbeat');
+                await new Promise(resolve => setTimeout(resolve, 10));
+            }
+        }
+    });
+    
+    (async () => {
+        const startPromise = scheduler.start();
+        await new Promise(resolve => setTimeout(resolve, 400));
+        scheduler.stop();
+        await startPromise;
+        
+        console.log(JSON.stringify({
+            runs: runs,
+            cancelled: cancelled,
+            pending: scheduler.getPendingTasks().length
+        }));
+    })();
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['runs'] == 3
+        assert data['cancelled'] == True
+        assert data['pending'] == 0
+
+def test_scheduler_stats_and_perf_hooks():
+    """
+    Test that getStats reports dispatch lag, handler duration, counts and
+    throughput and that perfHooks emits a measure entry per dispatch.
+    """
+    script = """
+    const { PerformanceObserver } = require('perf_hooks');
+    const { AsyncTaskScheduler } = require('./dist/scheduler/AsyncTaskScheduler');
+    
+    const measured = [];
+    const observer = new PerformanceObserver(list => {
+        for (const entry of list.getEntries()) {
+            measured.push(entry.name);
+        }
+    });
+    observer.observe({ entryTypes: ['measure'] });
+    
+    const scheduler = new AsyncTaskScheduler({ maxConcurrency: 2, perfHooks: true });
+    const now = Date.now();
+    for (let i = 0; i < 4; i++) {
+        scheduler.schedule({
+            id: `task_${i}`,
+            name: 'work',
+            executeAt: new Date(now + 20),
+            priority: 1,
+            handler: async () => {
+                await new Promise(resolve => setTimeout(resolve, 30));
+                if (i === 3) {
+                    throw new Error('expected failure');
+                }
+            }
+        });
+    }
+    scheduler.schedule({ id: 'later', name: 'later', executeAt: new Date(now + 60000), priority: 1, handler: async () => {} });
+    
+    (async () => {
+        const startPromise = scheduler.start();
+        await new Promise(resolve => setTimeout(resolve, 40));
+        const during = scheduler.getStats();
+        await new Promise(resolve => setTimeout(resolve, 200));
+        scheduler.stop();
+        await startPromise;
+        const stats = scheduler.getStats();
+        observer.disconnect();
+        
+        console.log(JSON.stringify({
+            inFlightDuring: during.inFlight,
+            completed: stats.completed,
+            failed: stats.failed,
+            pending: stats.pending,
+            inFlight: stats.inFlight,
+            lagCount: stats.dispatchLag.count,
+            lagP99: stats.dispatchLag.p99,
+            durationP50: stats.handlerDuration.p50,
+            tasksPerSecond: stats.tasksPerSecond,
+            measured: measured.length,
+            measureName: measured[0]
+        }));
+    })();
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['inFlightDuring'] == 2
+        assert data['completed'] == 4
+        assert data['failed'] == 1
+        assert data['pending'] == 1
+        assert data['inFlight'] == 0
+        assert data['lagCount'] == 4
+        assert data['lagP99'] < 100
+        assert data['durationP50'] >= 25
+        assert data['tasksPerSecond'] > 0
+        assert data['measured'] == 4
+        assert data['measureName'] == 'task:work'
+
+def test_rate_limited_tasks_do_not_hold_slots():
+    """
+    Test that per-name token buckets space out throttled tasks while other
+    tasks keep using the free execution slots.
+    """
+    script = """
+    const { AsyncTaskScheduler } = require('./dist/scheduler/AsyncTaskScheduler');
+    
+    const scheduler = new AsyncTaskScheduler({
+        maxConcurrency: 2,
+        rateLimits: { api: { ratePerSecond: 20, burst: 2 } }
+    });
+    const now = Date.now();
+    const apiStarts = [];
+    const otherStarts = [];
+    for (let i = 0; i < 8; i++) {
+        scheduler.schedule({
+            id: `api_${i}`,
+            name: 'api',
+            executeAt: new Date(now),
+            priority: 10,
+            handler: async () => { apiStarts.push(Date.now() - now); }
+        });
+    }
+    for (let i = 0; i < 4; i++) {
+        scheduler.schedule({
+            id: `other_${i}`,
+            name: 'other',
+            executeAt: new Date(now),
+            priority: 1,
+            handler: async () => {
+                otherStarts.push(Date.now() - now);
+                await new Promise(resolve => setTimeout(resolve, 10));
+            }
+        });
+    }
+    scheduler.cancelTask('api_7');
+    
+    (async () => {
+        const startPromise = scheduler.start();
+        await new Promise(resolve => setTimeout(resolve, 600));
+        scheduler.stop();
+        await startPromise;
+        console.log(JSON.stringify({ apiStarts, otherStarts, pending: scheduler.getPendingTasks().length }));
+    })();
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        api = data['apiStarts']
+        assert len(api) == 7
+        assert api[1] < 40
+        for i in range(2, 7):
+            assert api[i] >= (i - 1) * 50 - 5
+        assert api[6] < 450
+        assert len(data['otherStarts']) == 4
+        assert max(data['otherStarts']) < 100
+        assert data['pending'] == 0
+
+def test_rate_limit_keeps_interval_phase_and_dispatch_lag():
+    """
+    Test that a task deferred for a rate-limit token keeps its own
+    executeAt: its next interval run stays in phase and its dispatch lag
+    counts the wait.
+    """
+    script = """
+    const { AsyncTaskScheduler } = require('./dist/scheduler/AsyncTaskScheduler');
+    
+    const scheduler = new AsyncTaskScheduler({ rateLimits: { tick: { ratePerSecond: 5, burst: 1 } } });
+    const now = Date.now();
+    const starts = {};
+    for (const id of ['first', 'second']) {
+        scheduler.schedule({ id, name: 'tick', executeAt: new Date(now), priority: 1, interval: 1000, handler: async () => {
+            starts[id] = Date.now() - now;
+        } });
+    }
+    
+    (async () => {
+        const startPromise = scheduler.start();
+        await new Promise(resolve => setTimeout(resolve, 400));
+        scheduler.stop();
+        await startPromise;
+        console.log(JSON.stringify({
+            starts,
+            next: scheduler.getPendingTasks().map(task => [task.id, task.executeAt.getTime() - now]).sort(),
+            maxLagMs: scheduler.getStats().dispatchLag.max
+        }));
+    })();
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['starts']['second'] >= 195
+        assert data['next'] == [['first', 1000], ['second', 1000]]
+        assert data['maxLagMs'] >= 190
+
+def test_cancelled_deferred_task_does_not_leak_its_token():
+    """
+    Test that cancelling a rate-limited task that was deferred and is
+    waiting in a saturated lane drops its reservation, so a task scheduled
+    again under the same id still waits for a token of its own.
+    """
+    script = """
+    const { AsyncTaskScheduler } = require('./dist/scheduler/AsyncTaskScheduler');
+    
+    const scheduler = new AsyncTaskScheduler({ maxConcurrency: 1, rateLimits: { api: { ratePerSecond: 2, burst: 1 } } });
+    const now = Date.now();
+    const starts = [];
+    const api = id => ({ id, name: 'api', executeAt: new Date(), priority: 1, handler: async () => {
+        starts.push([id, Date.now() - now]);
+    } });
+    scheduler.schedule(api('api_0'));
+    scheduler.schedule(api('api_1'));
+    
+    (async () => {
+        const startPromise = scheduler.start();
+        await new Promise(resolve => setTimeout(resolve, 400));
+        scheduler.schedule({ id: 'busy', name: 'busy', executeAt: new Date(), priority: 1, handler: async () => {
+            await new Promise(resolve => setTimeout(resolve, 400));
+        } });
+        await new Promise(resolve => setTimeout(resolve, 200));
+        const cancelled = scheduler.cancelTask('api_1');
+        scheduler.schedule(api('api_1'));
+        await new Promise(resolve => setTimeout(resolve, 600));
+        scheduler.stop();
+        await startPromise;
+        console.log(JSON.stringify({ cancelled, starts }));
+    })();
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['cancelled'] is True
+        assert [task for task, _ in data['starts']] == ['api_0', 'api_1']
+        assert data['starts'][1][1] >= 950
+
+def test_handler_timeout_and_in_flight_cancellation():
+    """
+    Test that timeoutMs and cancelTask abort a running handler through its
+    AbortSignal, free the slot right away and are counted in the stats.
+    """
+    script = """
+    const { AsyncTaskScheduler } = require('./dist/scheduler/AsyncTaskScheduler');
+    const { TaskScheduler } = require('./dist/scheduler/TaskScheduler');
+    
+    const hang = () => new Promise(() => {});
+    
+    const exercise = async scheduler => {
+        const now = Date.now();
+        const events = {};
+        scheduler.schedule({
+            id: 'hung',
+            name: 'hung',
+            executeAt: new Date(now),
+            priority: 10,
+            timeoutMs: 50,
+            handler: signal => {
+                signal.addEventListener('abort', () => { events.timeoutReason = signal.reason.message; });
+                return hang();
+            }
+        });
+        scheduler.schedule({
+            id: 'stuck',
+            name: 'stuck',
+            executeAt: new Date(now),
+            priority: 5,
+            handler: signal => {
+                signal.addEventListener('abort', () => { events.cancelSeen = Date.now() - now; });
+                return hang();
+            }
+        });
+        scheduler.schedule({
+            id: 'after',
+            name: 'after',
+            executeAt: new Date(now),
+            priority: 1,
+            handler: async () => { events.afterStarted = Date.now() - now; }
+        });
+        const startPromise = scheduler.start();
+        await new Promise(resolve => setTimeout(resolve, 120));
+        events.cancelled = scheduler.cancelTask('stuck');
+        await new Promise(resolve => setTimeout(resolve, 120));
+        scheduler.stop();
+        await startPromise;
+        const stats = scheduler.getStats();
+        return {
+            ...events,
+            timedOut: stats.timedOut,
+            cancelledCount: stats.cancelled,
+            failed: stats.failed,
+            completed: stats.completed,
+            pending: scheduler.pendingCount()
+        };
+    };
+    
+    (async () => {
+        let rejected = false;
+        try {
+            new TaskScheduler().schedule({ id: 'bad', name: 'bad', executeAt: new Date(), priority: 1, timeoutMs: 0, handler: async () => {} });
+        } catch (error) {
+            rejected = true;
+        }
+        const asyncResult = await exercise(new AsyncTaskScheduler({ maxConcurrency: 1 }));
+        const syncResult = await exercise(new TaskScheduler({ pollInterval: 10 }));
+        console.log(JSON.stringify({ rejected, async: asyncResult, sync: syncResult }));
+    })();
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['rejected'] is True
+        for label in ('async', 'sync'):
+            run = data[label]
+            assert run['timeoutReason'] == 'Task hung timed out after 50ms'
+            assert run['cancelled'] is True
+            assert run['cancelSeen'] >= 100
+            assert run['afterStarted'] >= run['cancelSeen']
+            assert run['afterStarted'] < 200
+            assert run['timedOut'] == 1
+            assert run['cancelledCount'] == 1
+            assert run['failed'] == 0
+            assert run['completed'] == 3
+            assert run['pending'] == 0
+
+def test_sharded_scheduler_routes_by_task_id(tmp_path):
+    """
+    Test that the sharded scheduler spreads tasks over worker threads by
+    consistent hashing, routes cancellation to the owning shard and
+    aggregates pending tasks and counts.
+    """
+    module_path = tmp_path / 'sharded_job.js'
+    log_path = tmp_path / 'runs.log'
+    module_path.write_text("""
+    const fs = require('fs');
+    const { threadId } = require('worker_threads');
+    exports.record = (logPath, id) => {
+        fs.appendFileSync(logPath, id + ' ' + threadId + '\\n');
+    };
+    """)
+    
+    script = """
+    const { ShardedScheduler } = require('./dist/scheduler/ShardedScheduler');
+    const { ConsistentHashRing } = require('./dist/scheduler/ConsistentHashRing');
+    
+    const modulePath = process.argv[1];
+    const logPath = process.argv[2];
+    const scheduler = new ShardedScheduler({ shards: 4, scheduler: { maxConcurrency: 8 } });
+    const now = Date.now();
+    const task = (id, offset) => ({
+        id,
+        name: 'record',
+        executeAt: new Date(now + offset),
+        priority: 1,
+        handler: { modulePath, exportName: 'record', args: [logPath, id] }
+    });
+    
+    (async () => {
+        const perShard = [0, 0, 0, 0];
+        const due = [];
+        for (let i = 0; i < 400; i++) {
+            due.push(task(`due_${i}`, 50));
+            perShard[scheduler.shardFor(`due_${i}`)]++;
+        }
+        await scheduler.scheduleMany(due);
+        await scheduler.schedule(task('future', 60000));
+        await scheduler.schedule(task('doomed', 60000));
+        let duplicate = false;
+        try {
+            await scheduler.schedule(task('future', 60000));
+        } catch (error) {
+            duplicate = true;
+        }
+        const countBefore = await scheduler.pendingCount();
+        const cancelled = await scheduler.cancelTask('doomed');
+        const cancelledMissing = await scheduler.cancelTask('missing');
+        
+        const startPromise = scheduler.start();
+        await new Promise(resolve => setTimeout(resolve, 500));
+        const pending = await scheduler.getPendingTasks();
+        const stats = await scheduler.getShardStats();
+        await scheduler.stop();
+        await startPromise;
+        await scheduler.close();
+        
+        const lines = require('fs').readFileSync(logPath, 'utf-8').trim().split('\\n');
+        const threads = new Set(lines.map(line => line.split(' ')[1]));
+        const ring = new ConsistentHashRing(4);
+        const grown = new ConsistentHashRing(5);
+        let moved = 0;
+        for (let i = 0; i < 10000; i++) {
+            if (ring.nodeFor(`key_${i}`) !== grown.nodeFor(`key_${i}`)) {
+                moved++;
+            }
+        }
+        console.log(JSON.stringify({
+            duplicate,
+            countBefore,
+            cancelled,
+            cancelledMissing,
+            runs: lines.length,
+            uniqueRuns: new Set(lines.map(line => line.split(' ')[0])).size,
+            threads: threads.size,
+            minShare: Math.min(...perShard),
+            pendingIds: pending.map(task => task.id),
+            pendingHandler: pending[0].handler.exportName,
+            completed: stats.reduce((total, shard) => total + shard.completed, 0),
+            moved
+        }));
+    })();
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script, str(module_path), str(log_path)],
+        capture_output=True,
+        text=True,
+        timeout=10,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['duplicate'] is True
+        assert data['countBefore'] == 402
+        assert data['cancelled'] is True
+        assert data['cancelledMissing'] is False
+        assert data['runs'] == 400
+        assert data['uniqueRuns'] == 400
+        assert data['threads'] == 4
+        assert data['minShare'] >= 50
+        assert data['pendingIds'] == ['future']
+        assert data['pendingHandler'] == 'record'
+        assert data['completed'] == 400
+        assert data['moved'] < 3500
+
+def test_sharded_scheduler_rejects_cross_shard_dependencies(tmp_path):
+    """
+    Test that a task whose dependency is placed on another shard is
+    rejected, alone or in a batch, while same-shard dependencies still hold
+    the dependent back until the dependency has run.
+    """
+    module_path = tmp_path / 'sharded_order.js'
+    log_path = tmp_path / 'runs.log'
+    module_path.write_text("""
+    const fs = require('fs');
+    exports.record = (logPath, id) => {
+        fs.appendFileSync(logPath, id + '\\n');
+    };
+    """)
+    
+    script = """
+    const { ShardedScheduler } = require('./dist/scheduler/ShardedScheduler');
+    
+    const modulePath = process.argv[1];
+    const logPath = process.argv[2];
+    const scheduler = new ShardedScheduler({ shards: 4 });
+    const task = (id, offset, dependsOn) => ({
+        id,
+        name: id,
+        executeAt: new Date(Date.now() + offset),
+        priority: 1,
+        dependsOn,
+        handler: { modulePath, exportName: 'record', args: [logPath, id] }
+    });
+    const idOn = (shard, prefix) => {
+        let i = 0;
+        while (scheduler.shardFor(`${prefix}_${i}`) !== shard) {
+            i++;
+        }
+        return `${prefix}_${i}`;
+    };
+    
+    (async () => {
+        const parent = idOn(0, 'parent');
+        const sibling = idOn(0, 'child');
+        const stranger = idOn(1, 'child');
+        const errors = [];
+        for (const attempt of [
+            () => scheduler.schedule(task(stranger, 0, [parent])),
+            () => scheduler.scheduleMany([task(parent, 100), task(stranger, 0, [parent])])
+        ]) {
+            try {
+                await attempt();
+            } catch (error) {
+                errors.push(error.message);
+            }
+        }
+        const countAfterRejects = await scheduler.pendingCount();
+        await scheduler.scheduleMany([task(sibling, 0, [parent]), task(parent, 100)]);
+        const startPromise = scheduler.start();
+        await new Promise(resolve => setTimeout(resolve, 400));
+        await scheduler.stop();
+        await startPromise;
+        await scheduler.close();
+        console.log(JSON.stringify({
+            errors,
+            expected: `Task ${stranger} depends on ${parent}, which is placed on another shard`,
+            countAfterRejects,
+            order: require('fs').readFileSync(logPath, 'utf-8').trim().split('\\n'),
+            parent,
+            sibling
+        }));
+    })();
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script, str(module_path), str(log_path)],
+        capture_output=True,
+        text=True,
+        timeout=10,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['errors'] == [data['expected'], data['expected']]
+        assert data['countAfterRejects'] == 0
+        assert data['order'] == [data['parent'], data['sibling']]
+
+def test_sharded_scheduler_replaces_dead_shards(tmp_path):
+    """
+    Test that a shard whose worker exits is replaced by a running one that
+    takes new tasks, and that requests after close() are rejected at once.
+    """
+    module_path = tmp_path / 'sharded_crash.js'
+    log_path = tmp_path / 'runs.log'
+    module_path.write_text("""
+    const fs = require('fs');
+    exports.crash = () => process.exit(3);
+    exports.record = (logPath, id) => {
+        fs.appendFileSync(logPath, id + '\\n');
+    };
+    """)
+    
+    script = """
+    const { ShardedScheduler } = require('./dist/scheduler/ShardedScheduler');
+    
+    const modulePath = process.argv[1];
+    const logPath = process.argv[2];
+    const scheduler = new ShardedScheduler({ shards: 2 });
+    const task = (id, exportName, args) => ({ id, name: id, executeAt: new Date(), priority: 1, handler: { modulePath, exportName, args } });
+    
+    (async () => {
+        const shard = scheduler.shardFor('crash');
+        let probe = 0;
+        while (scheduler.shardFor(`probe_${probe}`) !== shard) {
+            probe++;
+        }
+        const startPromise = scheduler.start();
+        await scheduler.schedule(task('crash', 'crash'));
+        await new Promise(resolve => setTimeout(resolve, 200));
+        await scheduler.schedule(task(`probe_${probe}`, 'record', [logPath, 'probe']));
+        await new Promise(resolve => setTimeout(resolve, 200));
+        const count = await scheduler.pendingCount();
+        await scheduler.stop();
+        await startPromise;
+        await scheduler.close();
+        let afterClose;
+        try {
+            await scheduler.pendingCount();
+        } catch (error) {
+            afterClose = error.message;
+        }
+        console.log(JSON.stringify({
+            runs: require('fs').readFileSync(logPath, 'utf-8').trim().split('\\n'),
+            count,
+            afterClose
+        }));
+    })();
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script, str(module_path), str(log_path)],
+        capture_output=True,
+        text=True,
+        timeout=10,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['runs'] == ['probe']
+        assert data['count'] == 0
+        assert data['afterClose'] == 'Sharded scheduler is closed'
+
+def test_bounded_capacity_policies_and_schedule_async():
+    """
+    Test that capacity is enforced with the reject and drop-lowest-priority
+    policies and that scheduleAsync waits for room instead of overflowing.
+    """
+    script = """
+    const { AsyncTaskScheduler } = require('./dist/scheduler/AsyncTaskScheduler');
+    const { TaskScheduler } = require('./dist/scheduler/TaskScheduler');
+    
+    const future = new Date(Date.now() + 60000);
+    const task = (id, priority, executeAt = future, handler = async () => {}) => ({ id, name: id, executeAt, priority, handler });
+    const attempt = fn => {
+        try {
+            fn();
+            return 'ok';
+        } catch (error) {
+            return error.message;
+        }
+    };
+    
+    const policies = {};
+    for (const [label, Scheduler] of [['async', AsyncTaskScheduler], ['sync', TaskScheduler]]) {
+        const rejecting = new Scheduler({ capacity: 2 });
+        rejecting.schedule(task('a', 1));
+        rejecting.schedule(task('b', 1));
+        const dropping = new Scheduler({ capacity: 3, overflow: 'dropLowestPriority' });
+        dropping.schedule(task('low', 1));
+        dropping.schedule(task('mid', 5));
+        dropping.schedule(task('other', 3));
+        dropping.updateTaskPriority('other', 0);
+        policies[label] = {
+            rejected: attempt(() => rejecting.schedule(task('c', 9))),
+            batchRejected: attempt(() => new Scheduler({ capacity: 2 }).scheduleMany([task('x', 1), task('y', 1), task('z', 1)])),
+            evicting: attempt(() => dropping.schedule(task('high', 4))),
+            refused: attempt(() => dropping.schedule(task('lowest', 0))),
+            remaining: dropping.getPendingTasks().map(t => t.id).sort(),
+            count: dropping.pendingCount()
+        };
+    }
+    
+    (async () => {
+        const scheduler = new AsyncTaskScheduler({ capacity: 2, maxConcurrency: 1 });
+        let maxPending = 0;
+        const ran = [];
+        const startPromise = scheduler.start();
+        for (let i = 0; i < 10; i++) {
+            await scheduler.scheduleAsync(task(`q_${i}`, 1, new Date(), async () => {
+                ran.push(i);
+                await new Promise(resolve => setTimeout(resolve, 10));
+            }));
+            maxPending = Math.max(maxPending, scheduler.pendingCount());
+        }
+        while (scheduler.pendingCount() > 0) {
+            await new Promise(resolve => setTimeout(resolve, 5));
+        }
+        scheduler.stop();
+        await startPromise;
+        console.log(JSON.stringify({ policies, maxPending, ran }));
+    })();
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        for label in ('async', 'sync'):
+            policy = data['policies'][label]
+            assert policy['rejected'] == 'Scheduler is at capacity (2 tasks)'
+            assert policy['batchRejected'] == 'Scheduler is at capacity (2 tasks)'
+            assert policy['evicting'] == 'ok'
+            assert policy['refused'] == 'Scheduler is at capacity (3 tasks)'
+            assert policy['remaining'] == ['high', 'low', 'mid']
+            assert policy['count'] == 3
+        assert data['maxPending'] <= 2
+        assert data['ran'] == list(range(10))
+
+def test_failed_tasks_retry_with_backoff():
+    """
+    Test that a failing task with a retry policy is re-run after exponentially
+    growing delays without holding a concurrency slot, that retries stop on
+    success or after maxAttempts and that invalid policies are rejected.
+    """
+    script = """
+    const { AsyncTaskScheduler } = require('./dist/scheduler/AsyncTaskScheduler');
+    const { TaskScheduler } = require('./dist/scheduler/TaskScheduler');
+    
+    const retry = { maxAttempts: 4, baseDelayMs: 40 };
+    
+    (async () => {
+        const scheduler = new AsyncTaskScheduler({ maxConcurrency: 1 });
+        const runs = { flaky: [], doomed: [], other: [] };
+        const now = Date.now();
+        scheduler.schedule({ id: 'flaky', name: 'flaky', executeAt: new Date(now), priority: 1, retry, handler: async () => {
+            runs.flaky.push(Date.now());
+            if (runs.flaky.length < 3) {
+                throw new Error('flaky');
+            }
+        } });
+        scheduler.schedule({ id: 'doomed', name: 'doomed', executeAt: new Date(now), priority: 0, retry: { maxAttempts: 2, baseDelayMs: 10 }, handler: async () => {
+            runs.doomed.push(Date.now());
+            throw new Error('doomed');
+        } });
+        scheduler.schedule({ id: 'other', name: 'other', executeAt: new Date(now + 20), priority: 0, handler: async () => {
+            runs.other.push(Date.now());
+        } });
+        const startPromise = scheduler.start();
+        await new Promise(resolve => setTimeout(resolve, 400));
+        scheduler.stop();
+        await startPromise;
+        
+        const sync = new TaskScheduler({ pollInterval: 5 });
+        let syncRuns = 0;
+        sync.schedule({ id: 'sync', name: 'sync', executeAt: new Date(), priority: 1, retry: { maxAttempts: 3, baseDelayMs: 10 }, handler: async () => {
+            syncRuns++;
+            throw new Error('sync');
+        } });
+        const syncPromise = sync.start();
+        await new Promise(resolve => setTimeout(resolve, 200));
+        sync.stop();
+        await syncPromise;
+        
+        const invalid = [{ maxAttempts: 0, baseDelayMs: 10 }, { maxAttempts: 2, baseDelayMs: -1 }, { maxAttempts: 2, baseDelayMs: 10, jitter: 2 }].map(policy => {
+            try {
+                new AsyncTaskScheduler().schedule({ id: 'bad', name: 'bad', executeAt: new Date(), priority: 1, retry: policy, handler: async () => {} });
+                return 'ok';
+            } catch (error) {
+                return error.message;
+            }
+        });
+        
+        const stats = scheduler.getStats();
+        console.log(JSON.stringify({
+            flaky: runs.flaky.map(t => t - runs.flaky[0]),
+            doomed: runs.doomed.length,
+            otherAt: runs.other[0] - runs.flaky[0],
+            pending: scheduler.pendingCount(),
+            failed: stats.failed,
+            completed: stats.completed,
+            syncRuns,
+            syncPending: sync.pendingCount(),
+            invalid
+        }));
+    })();
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert len(data['flaky']) == 3
+        first_gap = data['flaky'][1] - data['flaky'][0]
+        second_gap = data['flaky'][2] - data['flaky'][1]
+        assert first_gap >= 35
+        assert second_gap >= 75
+        assert data['otherAt'] < data['flaky'][1]
+        assert data['doomed'] == 2
+        assert data['pending'] == 0
+        assert data['failed'] == 4
+        assert data['completed'] == 6
+        assert data['syncRuns'] == 3
+        assert data['syncPending'] == 0
+        assert all(message == 'Task bad has an invalid retry policy' for message in data['invalid'])
+
+def test_dependency_graph_releases_dependents():
+    """
+    Test that tasks with dependsOn wait for their dependencies, that
+    independent branches run concurrently under the pool limit, that a failed
+    dependency cancels everything downstream and that cycles are rejected.
+    """
+    script = """
+    const { AsyncTaskScheduler } = require('./dist/scheduler/AsyncTaskScheduler');
+    
+    const scheduler = new AsyncTaskScheduler({ maxConcurrency: 2 });
+    const events = [];
+    let active = 0;
+    let maxActive = 0;
+    const step = (id, dependsOn, fail = false) => ({
+        id, name: id, executeAt: new Date(), priority: 1, dependsOn,
+        handler: async () => {
+            active++;
+            maxActive = Math.max(maxActive, active);
+            events.push(`start:${id}`);
+            await new Promise(resolve => setTimeout(resolve, 30));
+            events.push(`end:${id}`);
+            active--;
+            if (fail) {
+                throw new Error(`${id} failed`);
+            }
+        }
+    });
+    
+    scheduler.scheduleMany([step('join', ['left', 'right']), step('left', ['root']), step('right', ['root']), step('root')]);
+    scheduler.schedule(step('broken', undefined, true));
+    scheduler.schedule(step('child', ['broken']));
+    scheduler.schedule(step('grandchild', ['child', 'root']));
+    const blockedBeforeStart = scheduler.getPendingTasks().map(task => task.id);
+    const attempt = fn => {
+        try {
+            fn();
+            return 'ok';
+        } catch (error) {
+            return error.message;
+        }
+    };
+    const cycle = attempt(() => scheduler.scheduleMany([step('x', ['y']), step('y', ['x'])]));
+    const self = attempt(() => scheduler.schedule(step('z', ['z'])));
+    
+    (async () => {
+        const startPromise = scheduler.start();
+        while (scheduler.pendingCount() > 0) {
+            await new Promise(resolve => setTimeout(resolve, 5));
+        }
+        scheduler.stop();
+        await startPromise;
+        console.log(JSON.stringify({ events, maxActive, blockedBeforeStart, cycle, self }));
+    })();
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        events = data['events']
+        assert data['blockedBeforeStart'] == ['root', 'broken', 'join', 'left', 'right', 'child', 'grandchild']
+        assert events.index('start:left') > events.index('end:root')
+        assert events.index('start:right') > events.index('end:root')
+        assert events.index('start:left') < events.index('end:right')
+        assert events.index('start:right') < events.index('end:left')
+        assert events.index('start:join') > max(events.index('end:left'), events.index('end:right'))
+        assert 'start:child' not in events
+        assert 'start:grandchild' not in events
+        assert data['maxActive'] == 2
+        assert data['cycle'] == 'Tasks x, y form a dependency cycle'
+        assert data['self'] == 'Task z cannot depend on itself'
+
+def test_slack_window_coalesces_wakeups():
+    """
+    Test that a slack window lets one timer firing dispatch every task due
+    within it, that no task starts early or later than its slack allows and
+    that a task with a tighter per-task slack pulls the shared wake-up earlier.
+    """
+    script = """
+    const { AsyncTaskScheduler } = require('./dist/scheduler/AsyncTaskScheduler');
+    
+    let firings = 0;
+    const originalSetTimeout = global.setTimeout;
+    global.setTimeout = (callback, ...rest) => originalSetTimeout(() => { firings++; callback(); }, ...rest);
+    
+    const run = async (slackMs, tasks) => {
+        const scheduler = new AsyncTaskScheduler({ maxConcurrency: 1000, slackMs });
+        const started = {};
+        const start = Date.now() + 20;
+        for (const [id, offset, taskSlack] of tasks) {
+            const executeAt = start + offset;
+            scheduler.schedule({ id, name: id, executeAt: new Date(executeAt), priority: 1, slackMs: taskSlack ?? undefined, handler: async () => {
+                started[id] = Date.now() - executeAt;
+            } });
+        }
+        firings = 0;
+        const startPromise = scheduler.start();
+        while (scheduler.pendingCount() > 0) {
+            await new Promise(resolve => originalSetTimeout(resolve, 5));
+        }
+        const wakeUps = firings;
+        scheduler.stop();
+        await startPromise;
+        return { wakeUps, started };
+    };
+    
+    (async () => {
+        const dense = Array.from({ length: 200 }, (_, i) => [`task_${i}`, i]);
+        const exact = await run(0, dense);
+        const coalesced = await run(50, dense);
+        const mixed = await run(100, [['lazy', 0], ['strict', 20, 0], ['late', 200]]);
+        let invalid;
+        try {
+            new AsyncTaskScheduler({ slackMs: -1 });
+        } catch (error) {
+            invalid = error.message;
+        }
+        const lags = Object.values(coalesced.started);
+        console.log(JSON.stringify({
+            exactWakeUps: exact.wakeUps,
+            coalescedWakeUps: coalesced.wakeUps,
+            minLag: Math.min(...lags),
+            maxLag: Math.max(...lags),
+            mixed: mixed.started,
+            invalid
+        }));
+    })();
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['coalescedWakeUps'] <= 8
+        assert data['exactWakeUps'] > 3 * data['coalescedWakeUps']
+        assert data['minLag'] >= 0
+        assert data['maxLag'] <= 50 + 30
+        assert 20 <= data['mixed']['lazy'] < 60
+        assert 0 <= data['mixed']['strict'] < 40
+        assert data['mixed']['late'] >= 0
+        assert data['invalid'] == 'slackMs must not be negative'
+
+
+def test_task_scheduled_after_start_pulls_wakeup_earlier():
+    """
+    Test that a task scheduled while the scheduler sleeps re-arms the timer
+    when its slack ends before the armed wake-up, even if it is not the
+    earliest task.
+    """
+    script = """
+    const { AsyncTaskScheduler } = require('./dist/scheduler/AsyncTaskScheduler');
+    
+    (async () => {
+        const scheduler = new AsyncTaskScheduler({ slackMs: 500 });
+        const start = Date.now();
+        const started = {};
+        const handler = id => async () => {
+            started[id] = Date.now() - start;
+        };
+        scheduler.schedule({ id: 'lazy', name: 'lazy', executeAt: new Date(start + 20), priority: 1, handler: handler('lazy') });
+        const startPromise = scheduler.start();
+        await new Promise(resolve => setTimeout(resolve, 5));
+        scheduler.schedule({ id: 'strict', name: 'strict', executeAt: new Date(start + 40), priority: 1, slackMs: 0, handler: handler('strict') });
+        while (scheduler.pendingCount() > 0) {
+            await new Promise(resolve => setTimeout(resolve, 5));
+        }
+        scheduler.stop();
+        await startPromise;
+        console.log(JSON.stringify(started));
+    })();
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert 40 <= data['strict'] < 100
+        assert 20 <= data['lazy'] < 100
@@ -267,3 +267,377 @@ def test_priority_queue_interleaved_operations():
         assert data['second'] == 'item3'
         assert data['third'] == 'item4'
 
+
+def test_priority_queue_fifo_for_equal_priorities():
+    """
+    Test that items with equal priority are dequeued in insertion order and that
+    a large shuffled workload comes out in priority order.
+    """
+    script = """
+    const { PriorityQueue } = require('./dist/scheduler/PriorityQueue');
+    
+    const queue = new PriorityQueue();
+    queue.enqueue('a', 5);
+    queue.enqueue('b', 1);
+    queue.enqueue('c', 5);
+    queue.enqueue('d', 9);
+    queue.enqueue('e', 5);
+    const ties = [];
+    while (!queue.isEmpty()) {
+        ties.push(queue.dequeue());
+    }
+    
+    const large = new PriorityQueue();
+    for (let i = 0; i < 10000; i++) {
+        large.enqueue(i, (i * 7919) % 100);
+    }
+    let ordered = true;
+    let previous = null;
+    while (!large.isEmpty()) {
+        const value = large.dequeue();
+        const priority = (value * 7919) % 100;
+        if (previous !== null) {
+            const previousPriority = (previous * 7919) % 100;
+            if (priority > previousPriority || (priority === previousPriority && value < previous)) {
+                ordered = false;
+            }
+        }
+        previous = value;
+    }
+    
+    console.log(JSON.stringify({
+        ties: ties,
+        ordered: ordered,
+        sizeAfter: large.size()
+    }));
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['ties'] == ['d', 'a', 'c', 'e', 'b']
+        assert data['ordered'] == True
+        assert data['sizeAfter'] == 0
+
+def test_priority_queue_bucket_mode():
+    """
+    Test that the bucket-queue mode dequeues in the same order as the heap,
+    keeps FIFO order within a priority and rejects priorities outside its range.
+    """
+    script = """
+    const { PriorityQueue } = require('./dist/scheduler/PriorityQueue');
+    
+    const ties = new PriorityQueue({ mode: 'bucket' });
+    for (const [value, priority] of [['a', 5], ['b', 1], ['c', 5], ['d', 255], ['e', 5], ['f', 0], ['g', 32], ['h', 31]]) {
+        ties.enqueue(value, priority);
+    }
+    const tieOrder = [];
+    while (!ties.isEmpty()) {
+        tieOrder.push(ties.dequeue());
+    }
+    
+    const bucket = new PriorityQueue({ mode: 'bucket' });
+    const heap = new PriorityQueue();
+    let matches = true;
+    for (let i = 0; i < 50000; i++) {
+        const priority = (i * 7919) % 256;
+        bucket.enqueue(i, priority % 7 === 0 ? 3 : priority);
+        heap.enqueue(i, priority % 7 === 0 ? 3 : priority);
+        if (i % 2 === 0) {
+            if (bucket.peek() !== heap.peek() || bucket.dequeue() !== heap.dequeue()) {
+                matches = false;
+            }
+        }
+    }
+    const sizesMatch = bucket.size() === heap.size();
+    while (!heap.isEmpty()) {
+        if (bucket.dequeue() !== heap.dequeue()) {
+            matches = false;
+        }
+    }
+    
+    const small = new PriorityQueue({ mode: 'bucket', maxPriority: 3 });
+    const attempt = fn => {
+        try {
+            fn();
+            return 'ok';
+        } catch (error) {
+            return error.message;
+        }
+    };
+    
+    console.log(JSON.stringify({
+        tieOrder,
+        matches,
+        sizesMatch,
+        empty: [bucket.dequeue(), bucket.peek(), bucket.size()],
+        tooHigh: attempt(() => small.enqueue('x', 4)),
+        negative: attempt(() => small.enqueue('x', -1)),
+        fractional: attempt(() => small.enqueue('x', 1.5)),
+        inRange: attempt(() => small.enqueue('x', 3))
+    }));
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['tieOrder'] == ['d', 'g', 'h', 'a', 'c', 'e', 'b', 'f']
+        assert data['matches'] == True
+        assert data['sizesMatch'] == True
+        assert data['empty'] == [None, None, 0]
+        assert data['tooHigh'] == 'Priority 4 is outside the bucket range 0-3'
+        assert data['negative'] == 'Priority -1 is outside the bucket range 0-3'
+        assert data['fractional'] == 'Priority 1.5 is outside the bucket range 0-3'
+        assert data['inRange'] == 'ok'
+
+def test_numeric_priority_queue_matches_priority_queue():
+    """
+    Test that the typed-array queue dequeues in the same order as
+    PriorityQueue, grows past its initial capacity and validates int32 values.
+    """
+    script = """
+    const { PriorityQueue } = require('./dist/scheduler/PriorityQueue');
+    const { NumericPriorityQueue } = require('./dist/scheduler/NumericPriorityQueue');
+    
+    const ties = new NumericPriorityQueue({ initialCapacity: 1 });
+    for (const [value, priority] of [[1, 5], [2, 1], [3, 5], [4, 9], [5, 5]]) {
+        ties.enqueue(value, priority);
+    }
+    const tieOrder = [];
+    while (!ties.isEmpty()) {
+        tieOrder.push(ties.dequeue());
+    }
+    
+    const numeric = new NumericPriorityQueue({ initialCapacity: 3 });
+    const reference = new PriorityQueue();
+    let matches = true;
+    for (let i = 0; i < 20000; i++) {
+        const priority = (i * 7919) % 97 - 48;
+        numeric.enqueue(i, priority);
+        reference.enqueue(i, priority);
+        if (i % 3 === 0 && numeric.dequeue() !== reference.dequeue()) {
+            matches = false;
+        }
+    }
+    const peekMatches = numeric.peek() === reference.peek();
+    while (!reference.isEmpty()) {
+        if (numeric.dequeue() !== reference.dequeue()) {
+            matches = false;
+        }
+    }
+    
+    const floats = new NumericPriorityQueue({ payload: 'float64' });
+    floats.enqueue(0.5, 1);
+    floats.enqueue(2 ** 40, 3);
+    const attempt = fn => {
+        try {
+            fn();
+            return 'ok';
+        } catch (error) {
+            return error.message;
+        }
+    };
+    
+    console.log(JSON.stringify({
+        tieOrder,
+        matches,
+        peekMatches,
+        capacity: numeric.capacity(),
+        emptyDequeue: numeric.dequeue(),
+        emptyPeek: numeric.peek(),
+        floats: [floats.peekPriority(), floats.dequeue(), floats.dequeue()],
+        rejected: attempt(() => new NumericPriorityQueue().enqueue(1.5, 1)),
+        overflow: attempt(() => new NumericPriorityQueue().enqueue(2 ** 31, 1)),
+        badCapacity: attempt(() => new NumericPriorityQueue({ initialCapacity: 0 }))
+    }));
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['tieOrder'] == [4, 1, 3, 5, 2]
+        assert data['matches'] == True
+        assert data['peekMatches'] == True
+        assert data['capacity'] == 3 * 2 ** 13
+        assert data['emptyDequeue'] is None
+        assert data['emptyPeek'] is None
+        assert data['floats'] == [3, 2 ** 40, 0.5]
+        assert data['rejected'] == '1.5 is not a 32-bit integer'
+        assert data['overflow'] == '2147483648 is not a 32-bit integer'
+        assert data['badCapacity'] == 'initialCapacity must be a positive integer'
+
+def test_indexed_priority_queue_remove_and_update():
+    """
+    Test that the indexed priority queue supports removal and priority updates
+    through the handle returned by enqueue.
+    """
+    script = """
+    const { IndexedPriorityQueue } = require('./dist/scheduler/IndexedPriorityQueue');
+    
+    const queue = new IndexedPriorityQueue();
+    const a = queue.enqueue('a', 'A', 1);
+    const b = queue.enqueue('b', 'B', 2);
+    const c = queue.enqueue('c', 'C', 3);
+    queue.enqueue('d', 'D', 4);
+    
+    const removed = queue.remove(c);
+    const removedTwice = queue.remove(c);
+    const updated = queue.updatePriority(a, 10);
+    const hasC = queue.has('c');
+    const hasA = queue.has('a');
+    
+    const order = [];
+    while (!queue.isEmpty()) {
+        order.push(queue.dequeue());
+    }
+    
+    console.log(JSON.stringify({
+        removed: removed,
+        removedTwice: removedTwice,
+        updated: updated,
+        hasC: hasC,
+        hasA: hasA,
+        order: order,
+        staleUpdate: queue.updatePriority(b, 5)
+    }));
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['removed'] == True
+        assert data['removedTwice'] == False
+        assert data['updated'] == True
+        assert data['hasC'] == False
+        assert data['hasA'] == True
+        assert data['order'] == ['A', 'D', 'B']
+        assert data['staleUpdate'] == False
+
+def test_indexed_priority_queue_lazy_removal_matches_model():
+    """
+    Test that tombstoned removals keep size, peek, toArray and dequeue order
+    identical to an eagerly maintained model across compactions.
+    """
+    script = """
+    const { IndexedPriorityQueue } = require('./dist/scheduler/IndexedPriorityQueue');
+    
+    let seed = 12345;
+    const random = () => {
+        seed = (seed * 1103515245 + 12345) % 2147483648;
+        return seed / 2147483648;
+    };
+    
+    const queue = new IndexedPriorityQueue(undefined, { compactionThreshold: 0.3 });
+    const model = [];
+    let sequence = 0;
+    let nextId = 0;
+    let mismatches = 0;
+    const modelSorted = () => model.slice().sort((a, b) => b.priority - a.priority || a.sequence - b.sequence);
+    
+    for (let step = 0; step < 20000; step++) {
+        const op = random();
+        if (op < 0.45 || model.length === 0) {
+            const id = `id_${nextId++}`;
+            const priority = Math.floor(random() * 20);
+            queue.enqueue(id, id, priority);
+            model.push({ id, priority, sequence: sequence++ });
+        } else if (op < 0.75) {
+            const victim = model.splice(Math.floor(random() * model.length), 1)[0];
+            if (!queue.remove(queue.get(victim.id))) {
+                mismatches++;
+            }
+        } else if (op < 0.85) {
+            const target = model[Math.floor(random() * model.length)];
+            const handle = queue.get(target.id);
+            target.priority = Math.floor(random() * 20);
+            queue.updatePriority(handle, target.priority);
+        } else {
+            const expected = modelSorted()[0];
+            model.splice(model.indexOf(expected), 1);
+            if (queue.dequeue() !== expected.id) {
+                mismatches++;
+            }
+        }
+        if (queue.size() !== model.length) {
+            mismatches++;
+        }
+        if (step % 500 === 0) {
+            const expected = modelSorted().map(entry => entry.id);
+            if (JSON.stringify(queue.toArray()) !== JSON.stringify(expected)) {
+                mismatches++;
+            }
+            if (queue.peek() !== (expected[0] ?? null)) {
+                mismatches++;
+            }
+        }
+    }
+    
+    const bulk = new IndexedPriorityQueue();
+    for (let i = 0; i < 200000; i++) {
+        bulk.enqueue(`b_${i}`, i, i % 100);
+    }
+    const started = Date.now();
+    for (let i = 0; i < 200000; i += 2) {
+        bulk.remove(bulk.get(`b_${i}`));
+    }
+    const cancelMs = Date.now() - started;
+    let drained = 0;
+    while (bulk.dequeue() !== null) {
+        drained++;
+    }
+    
+    console.log(JSON.stringify({ mismatches, cancelMs, drained, reAdd: bulk.enqueue('b_0', 0, 1).id }));
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=10,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['mismatches'] == 0
+        assert data['drained'] == 100000
+        assert data['cancelMs'] < 1000
+        assert data['reAdd'] == 'b_0'
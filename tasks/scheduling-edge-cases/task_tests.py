@@ -3,6 +3,7 @@ import sys
 import os
 import subprocess
 import json
+import time
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
 
@@ -322,3 +323,1017 @@ def test_task_scheduling_order_preservation():
         assert len(data['executionOrder']) == 2, f"Expected 2 tasks to execute, got {len(data['executionOrder'])}"
         assert data['executionOrder'][0] == 1, f"Expected task1 to execute first, got {data['executionOrder'][0]}"
         assert data['executionOrder'][1] == 2, f"Expected task2 to execute second, got {data['executionOrder'][1]}"
+
+def test_task_cancellation_at_scale_and_priority_update():
+    """
+    Test that cancelling a large number of tasks is fast and that a task's
+    priority can be changed while it is queued.
+    """
+    script = """
+    const { TaskScheduler } = require('./dist/scheduler/TaskScheduler');
+    
+    const scheduler = new TaskScheduler();
+    const executeAt = new Date(Date.now() + 60000);
+    const noop = async () => {};
+    for (let i = 0; i < 100000; i++) {
+        scheduler.schedule({ id: `bulk_${i}`, name: 'Bulk', executeAt, priority: 1, handler: noop });
+    }
+    const started = Date.now();
+    let cancelled = 0;
+    for (let i = 0; i < 100000; i++) {
+        if (scheduler.cancelTask(`bulk_${i}`)) {
+            cancelled++;
+        }
+    }
+    const cancelMs = Date.now() - started;
+    
+    const executionOrder = [];
+    const sameTime = new Date(Date.now() + 100);
+    scheduler.schedule({ id: 'first', name: 'First', executeAt: sameTime, priority: 5, handler: async () => { executionOrder.push('first'); } });
+    scheduler.schedule({ id: 'second', name: 'Second', executeAt: sameTime, priority: 1, handler: async () => { executionOrder.push('second'); } });
+    const updated = scheduler.updateTaskPriority('second', 10);
+    
+    (async () => {
+        const startPromise = scheduler.start();
+        await new Promise(resolve => setTimeout(resolve, 300));
+        scheduler.stop();
+        await startPromise;
+        
+        console.log(JSON.stringify({
+            cancelled: cancelled,
+            cancelMs: cancelMs,
+            updated: updated,
+            executionOrder: executionOrder,
+            pending: scheduler.getPendingTasks().length
+        }));
+    })();
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=10,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['cancelled'] == 100000
+        assert data['cancelMs'] < 2000, f"Cancelling 100k tasks took {data['cancelMs']}ms"
+        assert data['updated'] == True
+        assert data['executionOrder'] == ['second', 'first']
+        assert data['pending'] == 0
+
+def test_timing_wheel_mode_dispatch():
+    """
+    Test that the timing wheel time index runs due tasks in time order, honours
+    cancellation and leaves future tasks pending.
+    """
+    script = """
+    const { TaskScheduler } = require('./dist/scheduler/TaskScheduler');
+    
+    const scheduler = new TaskScheduler({ timeIndex: 'wheel' });
+    const executionOrder = [];
+    const now = Date.now();
+    const record = (label) => async () => { executionOrder.push(label); };
+    
+    scheduler.schedule({ id: 'late', name: 'Late', executeAt: new Date(now + 200), priority: 1, handler: record('late') });
+    scheduler.schedule({ id: 'past', name: 'Past', executeAt: new Date(now - 1000), priority: 1, handler: record('past') });
+    scheduler.schedule({ id: 'early', name: 'Early', executeAt: new Date(now + 50), priority: 1, handler: record('early') });
+    scheduler.schedule({ id: 'cancelled', name: 'Cancelled', executeAt: new Date(now + 100), priority: 1, handler: record('cancelled') });
+    scheduler.schedule({ id: 'future', name: 'Future', executeAt: new Date(now + 60 * 60 * 1000), priority: 1, handler: record('future') });
+    const cancelled = scheduler.cancelTask('cancelled');
+    
+    (async () => {
+        const startPromise = scheduler.start();
+        await new Promise(resolve => setTimeout(resolve, 500));
+        scheduler.stop();
+        await startPromise;
+        
+        console.log(JSON.stringify({
+            cancelled: cancelled,
+            executionOrder: executionOrder,
+            pending: scheduler.getPendingTasks().map(task => task.id)
+        }));
+    })();
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['cancelled'] == True
+        assert data['executionOrder'] == ['past', 'early', 'late']
+        assert data['pending'] == ['future']
+
+def test_recurring_interval_and_cron_tasks():
+    """
+    Test that interval tasks re-run on their own without being rescheduled by
+    the handler and that cron expressions compute the expected next fire time.
+    """
+    script = """
+    const { TaskScheduler } = require('./dist/scheduler/TaskScheduler');
+    const { CronExpression } = require('./dist/scheduler/CronExpression');
+    
+    const scheduler = new TaskScheduler({ pollInterval: 20 });
+    let runs = 0;
+    const task = {
+        id: 'recurring',
+        name: 'Recurring',
+        executeAt: new Date(Date.now() + 50),
+        priority: 1,
+        interval: 100,
+        handler: async () => { runs++; }
+    };
+    scheduler.schedule(task);
+    
+    const next = (expression, date) => {
+        const fire = new Date(CronExpression.parse(expression).next(date.getTime()));
+        return [fire.getFullYear(), fire.getMonth() + 1, fire.getDate(), fire.getHours(), fire.getMinutes()];
+    };
+    let invalid = null;
+    try {
+        scheduler.schedule({ id: 'bad', name: 'Bad', executeAt: new Date(), priority: 1, cron: '61 * * * *', handler: async () => {} });
+    } catch (error) {
+        invalid = error.message;
+    }
+    
+    (async () => {
+        const startPromise = scheduler.start();
+        await new Promise(resolve => setTimeout(resolve, 480));
+        scheduler.stop();
+        await startPromise;
+        
+        console.log(JSON.stringify({
+            runs: runs,
+            samePendingObject: scheduler.getPendingTasks()[0] === task,
+            stillPending: scheduler.getPendingTasks().length,
+            quarterHour: next('*/15 * * * *', new Date(2026, 0, 5, 10, 7, 30)),
+            weekday: next('0 9 * * MON-FRI', new Date(2026, 0, 9, 10, 0)),
+            leapDay: next('0 0 29 2 *', new Date(2026, 0, 9, 10, 0)),
+            invalid: invalid
+        }));
+    })();
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert 4 <= data['runs'] <= 5, f"Expected the interval task to run 4 or 5 times, got {data['runs']}"
+        assert data['samePendingObject'] == True
+        assert data['stillPending'] == 1
+        assert data['quarterHour'] == [2026, 1, 5, 10, 15]
+        assert data['weekday'] == [2026, 1, 12, 9, 0]
+        assert data['leapDay'] == [2028, 2, 29, 0, 0]
+        assert 'bad minute field' in data['invalid']
+
+def test_journal_restores_pending_tasks(tmp_path):
+    """
+    Test that a journaled scheduler restores its pending tasks after a restart
+    from the latest snapshot plus the journal tail.
+    """
+    script = """
+    const { TaskScheduler } = require('./dist/scheduler/TaskScheduler');
+    const { SchedulerJournal } = require('./dist/scheduler/SchedulerJournal');
+    
+    const directory = %s;
+    const executed = [];
+    const resolveHandler = (task) => async () => { executed.push(task.id); };
+    const first = new TaskScheduler({
+        pollInterval: 20,
+        journal: new SchedulerJournal({ directory, snapshotEvery: 4 }),
+        resolveHandler
+    });
+    const later = new Date(Date.now() + 60000);
+    for (let i = 0; i < 5; i++) {
+        first.schedule({ id: `task_${i}`, name: 'Job', executeAt: later, priority: i, handler: resolveHandler({ id: `task_${i}` }) });
+    }
+    first.schedule({ id: 'due', name: 'Due', executeAt: new Date(), priority: 1, handler: resolveHandler({ id: 'due' }) });
+    first.schedule({ id: 'tick', name: 'Tick', executeAt: new Date(), priority: 1, interval: 1000, handler: resolveHandler({ id: 'tick' }) });
+    first.cancelTask('task_2');
+    first.updateTaskPriority('task_0', 50);
+    
+    (async () => {
+        const startPromise = first.start();
+        await new Promise(resolve => setTimeout(resolve, 100));
+        first.stop();
+        await startPromise;
+        
+        const restored = new TaskScheduler({
+            journal: new SchedulerJournal({ directory }),
+            resolveHandler
+        });
+        const pending = restored.getPendingTasks();
+        
+        console.log(JSON.stringify({
+            executed: executed,
+            pendingIds: pending.map(task => task.id),
+            topPriority: pending.find(task => task.id === 'task_0').priority,
+            tickRescheduled: pending.find(task => task.id === 'tick').executeAt.getTime() > Date.now(),
+            tickInterval: pending.find(task => task.id === 'tick').interval
+        }));
+    })();
+    """ % json.dumps(str(tmp_path / 'journal'))
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0, f"Script failed: {result.stderr}"
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert sorted(data['executed']) == ['due', 'tick']
+        assert data['pendingIds'] == ['tick', 'task_0', 'task_4', 'task_3', 'task_1']
+        assert data['topPriority'] == 50
+        assert data['tickRescheduled'] == True
+        assert data['tickInterval'] == 1000
+
+def test_schedule_many_bulk_load():
+    """
+    Test that scheduleMany loads a large batch in dispatch order, keeps
+    insertion order for ties and rejects a bad batch without enqueuing any of it.
+    """
+    script = """
+    const { TaskScheduler } = require('./dist/scheduler/TaskScheduler');
+    const { AsyncTaskScheduler } = require('./dist/scheduler/AsyncTaskScheduler');
+    
+    const base = Date.now() + 60000;
+    const batch = [];
+    for (let i = 0; i < 50000; i++) {
+        batch.push({
+            id: `task_${i}`,
+            name: `Task ${i}`,
+            executeAt: new Date(base + (i % 7) * 1000),
+            priority: i % 3,
+            handler: async () => {}
+        });
+    }
+    const expected = batch
+        .map((task, index) => ({ task, index }))
+        .sort((a, b) => a.task.executeAt - b.task.executeAt || b.task.priority - a.task.priority || a.index - b.index)
+        .map(entry => entry.task.id);
+    
+    const results = {};
+    for (const [label, scheduler] of [['sync', new TaskScheduler()], ['async', new AsyncTaskScheduler()]]) {
+        scheduler.schedule({ id: 'existing', name: 'Existing', executeAt: new Date(base + 500000), priority: 0, handler: async () => {} });
+        scheduler.scheduleMany(batch);
+        const pending = scheduler.getPendingTasks().map(task => task.id);
+        let rejected = false;
+        try {
+            scheduler.scheduleMany([
+                { id: 'fresh', name: 'Fresh', executeAt: new Date(base), priority: 0, handler: async () => {} },
+                { id: 'task_1', name: 'Dup', executeAt: new Date(base), priority: 0, handler: async () => {} }
+            ]);
+        } catch (error) {
+            rejected = true;
+        }
+        results[label] = {
+            ordered: JSON.stringify(pending.slice(0, -1)) === JSON.stringify(expected),
+            last: pending[pending.length - 1],
+            rejected,
+            count: scheduler.getPendingTasks().length
+        };
+    }
+    console.log(JSON.stringify(results));
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=10,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        for label in ('sync', 'async'):
+            assert data[label]['ordered'] is True
+            assert data[label]['last'] == 'existing'
+            assert data[label]['rejected'] is True
+            assert data[label]['count'] == 50001
+
+def test_paginated_pending_tasks_view():
+    """
+    Test that pendingTasks pages through every pending task in the same
+    order as getPendingTasks and that pendingCount matches it.
+    """
+    script = """
+    const { TaskScheduler } = require('./dist/scheduler/TaskScheduler');
+    const { AsyncTaskScheduler } = require('./dist/scheduler/AsyncTaskScheduler');
+    
+    let seed = 99;
+    const random = () => {
+        seed = (seed * 1103515245 + 12345) % 2147483648;
+        return seed / 2147483648;
+    };
+    
+    const pageThrough = (scheduler, limit) => {
+        const ids = [];
+        let after;
+        while (true) {
+            const page = Array.from(scheduler.pendingTasks({ limit, after }));
+            if (page.length === 0) {
+                return ids;
+            }
+            ids.push(...page.map(task => task.id));
+            after = page[page.length - 1].id;
+        }
+    };
+    
+    const check = scheduler => {
+        const expected = scheduler.getPendingTasks().map(task => task.id);
+        const paged = pageThrough(scheduler, 997);
+        return {
+            matches: JSON.stringify(paged) === JSON.stringify(expected),
+            count: scheduler.pendingCount(),
+            length: expected.length
+        };
+    };
+    
+    const now = Date.now();
+    const results = {};
+    for (const timeIndex of ['heap', 'wheel']) {
+        const scheduler = new TaskScheduler({ timeIndex });
+        for (let i = 0; i < 20000; i++) {
+            scheduler.schedule({
+                id: `t_${i}`,
+                name: 'task',
+                executeAt: new Date(now + 1000 + Math.floor(random() * 100000)),
+                priority: Math.floor(random() * 5),
+                handler: async () => {}
+            });
+        }
+        for (let i = 0; i < 20000; i += 3) {
+            scheduler.cancelTask(`t_${i}`);
+        }
+        results[timeIndex] = check(scheduler);
+    }
+    
+    (async () => {
+        let release;
+        const blocked = new Promise(resolve => { release = resolve; });
+        const scheduler = new AsyncTaskScheduler({
+            lanes: [
+                { name: 'high', minPriority: 5, maxConcurrency: 1 },
+                { name: 'low', minPriority: -Infinity, maxConcurrency: 1 }
+            ]
+        });
+        for (let i = 0; i < 5000; i++) {
+            scheduler.schedule({
+                id: `a_${i}`,
+                name: 'task',
+                executeAt: new Date(i % 2 === 0 ? now : now + 60000 + i),
+                priority: Math.floor(random() * 10),
+                handler: () => blocked
+            });
+        }
+        const startPromise = scheduler.start();
+        await new Promise(resolve => setTimeout(resolve, 20));
+        results.async = check(scheduler);
+        results.firstPage = Array.from(scheduler.pendingTasks({ limit: 3 })).length;
+        scheduler.stop();
+        release();
+        await startPromise;
+        console.log(JSON.stringify(results));
+    })();
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=20,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        for label in ('heap', 'wheel', 'async'):
+            assert data[label]['matches'] is True
+            assert data[label]['count'] == data[label]['length']
+        assert data['heap']['length'] == 13333
+        assert data['async']['length'] == 5000
+        assert data['firstPage'] == 3
+
+def test_weighted_fair_lanes_and_aging():
+    """
+    Test that due tasks are shared between lanes in proportion to their
+    weights and that aging serves a lane whose task has waited too long.
+    """
+    script = """
+    const { TaskScheduler } = require('./dist/scheduler/TaskScheduler');
+    
+    const run = async (options, count, handlerMs, lowHeadStart = 0) => {
+        const scheduler = new TaskScheduler({ pollInterval: 5, ...options });
+        const order = [];
+        const now = Date.now();
+        for (let i = 0; i < count; i++) {
+            for (const [prefix, priority] of [['high', 10], ['low', 0]]) {
+                scheduler.schedule({
+                    id: `${prefix}_${i}`,
+                    name: prefix,
+                    executeAt: new Date(priority > 0 ? now : now - lowHeadStart),
+                    priority,
+                    handler: async () => {
+                        order.push(prefix);
+                        if (handlerMs > 0) {
+                            await new Promise(resolve => setTimeout(resolve, handlerMs));
+                        }
+                    }
+                });
+            }
+        }
+        const startPromise = scheduler.start();
+        while (scheduler.pendingCount() > 0) {
+            await new Promise(resolve => setTimeout(resolve, 5));
+        }
+        scheduler.stop();
+        await startPromise;
+        return order;
+    };
+    
+    (async () => {
+        const lanes = [
+            { name: 'high', minPriority: 5, weight: 3 },
+            { name: 'low', minPriority: -Infinity, weight: 1 }
+        ];
+        const weighted = await run({ lanes }, 40, 0);
+        const firstForty = weighted.slice(0, 40);
+        const single = await run({}, 40, 0);
+        const skewed = [
+            { name: 'high', minPriority: 5, weight: 1000 },
+            { name: 'low', minPriority: -Infinity, weight: 1 }
+        ];
+        const starved = await run({ lanes: skewed }, 30, 5, 100);
+        const aged = await run({ lanes: skewed, maxWait: 150 }, 30, 5, 100);
+        console.log(JSON.stringify({
+            highInFirstForty: firstForty.filter(name => name === 'high').length,
+            total: weighted.length,
+            singleFirstLow: single.indexOf('low'),
+            starvedLowBy: starved.slice(0, 25).filter(name => name === 'low').length,
+            agedLowBy: aged.slice(0, 25).filter(name => name === 'low').length
+        }));
+    })();
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=15,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['total'] == 80
+        assert 29 <= data['highInFirstForty'] <= 31
+        assert data['singleFirstLow'] == 40
+        assert data['starvedLowBy'] <= 1
+        assert data['agedLowBy'] >= 5
+
+def test_due_tasks_run_in_priority_order():
+    """
+    Test that once tasks are due they are dispatched by priority rather than
+    by how overdue they are (equal priorities keep due-time order), with both
+    time indexes, while future tasks stay in the delay queue until due.
+    """
+    script = """
+    const { TaskScheduler } = require('./dist/scheduler/TaskScheduler');
+    
+    const run = async (timeIndex) => {
+        const scheduler = new TaskScheduler({ timeIndex, pollInterval: 10 });
+        const executionOrder = [];
+        const now = Date.now();
+        const record = (label) => async () => { executionOrder.push(label); };
+        scheduler.schedule({ id: 'oldest', name: 'Oldest', executeAt: new Date(now - 3000), priority: 1, handler: record('oldest') });
+        scheduler.schedule({ id: 'urgent', name: 'Urgent', executeAt: new Date(now - 10), priority: 9, handler: record('urgent') });
+        scheduler.schedule({ id: 'middle', name: 'Middle', executeAt: new Date(now - 2000), priority: 5, handler: record('middle') });
+        scheduler.schedule({ id: 'tie_a', name: 'Tie A', executeAt: new Date(now - 500), priority: 3, handler: record('tie_a') });
+        scheduler.schedule({ id: 'tie_b', name: 'Tie B', executeAt: new Date(now - 1500), priority: 3, handler: record('tie_b') });
+        scheduler.schedule({ id: 'later', name: 'Later', executeAt: new Date(now + 80), priority: 10, handler: record('later') });
+        scheduler.schedule({ id: 'future', name: 'Future', executeAt: new Date(now + 60 * 60 * 1000), priority: 10, handler: record('future') });
+        scheduler.updateTaskPriority('oldest', 4);
+        const startPromise = scheduler.start();
+        await new Promise(resolve => setTimeout(resolve, 200));
+        scheduler.stop();
+        await startPromise;
+        return { executionOrder, pending: scheduler.getPendingTasks().map(task => task.id) };
+    };
+    
+    (async () => {
+        console.log(JSON.stringify({ heap: await run('heap'), wheel: await run('wheel') }));
+    })();
+    """
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        for mode in ('heap', 'wheel'):
+            assert data[mode]['executionOrder'] == ['urgent', 'middle', 'oldest', 'tie_b', 'tie_a', 'later']
+            assert data[mode]['pending'] == ['future']
+
+def test_dependencies_survive_journal_restore(tmp_path):
+    """
+    Test that TaskScheduler holds dependent tasks back until their
+    dependencies succeed and that the dependency edges are restored from the
+    journal snapshot after a restart.
+    """
+    script = """
+    const { TaskScheduler } = require('./dist/scheduler/TaskScheduler');
+    const { SchedulerJournal } = require('./dist/scheduler/SchedulerJournal');
+    
+    const directory = %s;
+    const executed = [];
+    const resolveHandler = (task) => async () => { executed.push(task.id); };
+    const first = new TaskScheduler({
+        pollInterval: 10,
+        journal: new SchedulerJournal({ directory, snapshotEvery: 3 }),
+        resolveHandler
+    });
+    const task = (id, executeAt, dependsOn) => ({ id, name: id, executeAt, priority: 1, dependsOn, handler: resolveHandler({ id }) });
+    const soon = new Date(Date.now() + 250);
+    first.scheduleMany([task('transform', new Date(), ['extract']), task('extract', soon)]);
+    first.schedule(task('load', new Date(), ['extract', 'transform', 'missing']));
+    first.schedule(task('notify', new Date(), ['load']));
+    first.schedule(task('done', new Date()));
+    first.schedule(task('after_done', new Date(), ['done']));
+    
+    (async () => {
+        const startPromise = first.start();
+        await new Promise(resolve => setTimeout(resolve, 100));
+        first.stop();
+        await startPromise;
+        const firstRun = executed.splice(0);
+        
+        const restored = new TaskScheduler({
+            pollInterval: 10,
+            journal: new SchedulerJournal({ directory }),
+            resolveHandler
+        });
+        const pendingIds = restored.getPendingTasks().map(task => task.id);
+        const restartPromise = restored.start();
+        await new Promise(resolve => setTimeout(resolve, 400));
+        restored.stop();
+        await restartPromise;
+        
+        console.log(JSON.stringify({ firstRun, pendingIds, secondRun: executed, left: restored.pendingCount() }));
+    })();
+    """ % json.dumps(str(tmp_path / 'journal'))
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0, f"Script failed: {result.stderr}"
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['firstRun'] == ['done', 'after_done']
+        assert data['pendingIds'] == ['extract', 'transform', 'load', 'notify']
+        assert data['secondRun'] == ['extract', 'transform', 'load', 'notify']
+        assert data['left'] == 0
+
+def test_lease_store_shares_tasks_between_processes(tmp_path):
+    """
+    Test that several processes scheduling the same tasks over one lease
+    store run every task exactly once, that a run leased by a crashed owner is
+    taken over once its lease expires, keeping a recurring task's phase, and
+    that a finished run is skipped.
+    """
+    worker = """
+    const fs = require('fs');
+    const { TaskScheduler } = require('./dist/scheduler/TaskScheduler');
+    const { LeaseStore } = require('./dist/scheduler/LeaseStore');
+    
+    const { LEASE_DIR, LOG_FILE, RUN_AT } = process.env;
+    const scheduler = new TaskScheduler({ pollInterval: 5, leases: new LeaseStore({ directory: LEASE_DIR, leaseMs: 2000 }) });
+    for (let i = 0; i < 40; i++) {
+        scheduler.schedule({ id: `job_${i}`, name: 'Job', executeAt: new Date(Number(RUN_AT)), priority: i %% 3, handler: async () => {
+            fs.appendFileSync(LOG_FILE, `job_${i} ${process.pid}\\n`);
+            await new Promise(resolve => setTimeout(resolve, 2));
+        } });
+    }
+    (async () => {
+        const startPromise = scheduler.start();
+        while (scheduler.pendingCount() > 0) {
+            await new Promise(resolve => setTimeout(resolve, 5));
+        }
+        scheduler.stop();
+        await startPromise;
+    })();
+    """.replace('%%', '%')
+    
+    takeover = """
+    const { TaskScheduler } = require('./dist/scheduler/TaskScheduler');
+    const { LeaseStore } = require('./dist/scheduler/LeaseStore');
+    
+    const directory = %s;
+    const runAt = Date.now();
+    const crashed = new LeaseStore({ directory, leaseMs: 150, owner: 'crashed' });
+    
+    const executed = [];
+    const scheduler = new TaskScheduler({ pollInterval: 5, leases: new LeaseStore({ directory, owner: 'survivor' }) });
+    scheduler.schedule({ id: 'orphan', name: 'Orphan', executeAt: new Date(runAt), priority: 1, handler: async () => { executed.push(['orphan', Date.now() - runAt]); } });
+    scheduler.schedule({ id: 'ticker', name: 'Ticker', executeAt: new Date(runAt), priority: 1, interval: 1000, handler: async () => { executed.push(['ticker', Date.now() - runAt]); } });
+    scheduler.schedule({ id: 'finished', name: 'Finished', executeAt: new Date(runAt), priority: 1, interval: 60000, handler: async () => { executed.push(['finished', Date.now() - runAt]); } });
+    
+    (async () => {
+        await crashed.claim([{ taskId: 'orphan', runAt }, { taskId: 'ticker', runAt }, { taskId: 'finished', runAt }]);
+        await crashed.complete([{ taskId: 'finished', runAt }]);
+        const startPromise = scheduler.start();
+        await new Promise(resolve => setTimeout(resolve, 300));
+        scheduler.stop();
+        await startPromise;
+        console.log(JSON.stringify({
+            executed,
+            pending: scheduler.getPendingTasks().map(task => [task.id, task.executeAt.getTime() - runAt]).sort()
+        }));
+    })();
+    """ % json.dumps(str(tmp_path / 'takeover'))
+    
+    cwd = os.path.join(os.path.dirname(__file__), '../..')
+    log_file = tmp_path / 'runs.log'
+    env = dict(os.environ, LEASE_DIR=str(tmp_path / 'leases'), LOG_FILE=str(log_file), RUN_AT=str(int(time.time() * 1000)))
+    workers = [subprocess.Popen(['node', '-e', worker], cwd=cwd, env=env) for _ in range(3)]
+    for process in workers:
+        assert process.wait(timeout=10) == 0
+    runs = [line.split() for line in log_file.read_text().splitlines()]
+    assert sorted(job for job, _ in runs) == sorted(f'job_{i}' for i in range(40))
+    
+    result = subprocess.run(
+        ['node', '-e', takeover],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=cwd
+    )
+    
+    assert result.returncode == 0, f"Script failed: {result.stderr}"
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert sorted(task for task, _ in data['executed']) == ['orphan', 'ticker']
+        assert all(elapsed >= 150 for _, elapsed in data['executed'])
+        assert data['pending'] == [['finished', 60000], ['ticker', 1000]]
+
+
+def test_lease_is_held_through_retry_backoff(tmp_path):
+    """
+    Test that a failed attempt that will be retried does not mark its run
+    finished: a peer neither skips the run nor releases its dependents, and
+    takes the run over only once the retry's lease runs out.
+    """
+    script = """
+    const { TaskScheduler } = require('./dist/scheduler/TaskScheduler');
+    const { LeaseStore } = require('./dist/scheduler/LeaseStore');
+    
+    const directory = %s;
+    const runAt = Date.now();
+    const events = [];
+    const build = (owner, handler) => {
+        const scheduler = new TaskScheduler({ pollInterval: 5, leases: new LeaseStore({ directory, leaseMs: 100, owner }) });
+        scheduler.schedule({ id: 'job', name: 'Job', executeAt: new Date(runAt), priority: 1, retry: { maxAttempts: 3, baseDelayMs: 200 }, handler });
+        scheduler.schedule({ id: 'after', name: 'After', executeAt: new Date(runAt), priority: 1, dependsOn: ['job'], handler: async () => {
+            events.push([owner, 'after', Date.now() - runAt]);
+        } });
+        return scheduler;
+    };
+    const first = build('first', async () => {
+        events.push(['first', 'job', Date.now() - runAt]);
+        throw new Error('boom');
+    });
+    const second = build('second', async () => {
+        events.push(['second', 'job', Date.now() - runAt]);
+    });
+    
+    (async () => {
+        const firstPromise = first.start();
+        await new Promise(resolve => setTimeout(resolve, 30));
+        first.stop();
+        await firstPromise;
+        const secondPromise = second.start();
+        await new Promise(resolve => setTimeout(resolve, 500));
+        second.stop();
+        await secondPromise;
+        console.log(JSON.stringify({ events }));
+    })();
+    """ % json.dumps(str(tmp_path / 'leases'))
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0, f"Script failed: {result.stderr}"
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert [(owner, task) for owner, task, _ in data['events']] == [('first', 'job'), ('second', 'job'), ('second', 'after')]
+        assert data['events'][1][2] >= 300
+
+
+def test_lease_store_lock_waits_without_blocking(tmp_path):
+    """
+    Test that a store operation waits for a live lock holder without
+    blocking the event loop and breaks a lock left by an exited process.
+    """
+    script = """
+    const fs = require('fs');
+    const os = require('os');
+    const path = require('path');
+    const { spawnSync } = require('child_process');
+    const { LeaseStore } = require('./dist/scheduler/LeaseStore');
+    
+    const directory = %s;
+    const lockFile = path.join(directory, 'leases.lock');
+    const store = new LeaseStore({ directory });
+    const exited = spawnSync(process.execPath, ['-e', '0']).pid;
+    
+    (async () => {
+        fs.writeFileSync(lockFile, `${os.hostname()}:${exited}:stale`);
+        const [stale] = await store.claim([{ taskId: 'a', runAt: 1 }]);
+        
+        fs.writeFileSync(lockFile, `${os.hostname()}:${process.pid}:live`);
+        let ticks = 0;
+        const ticker = setInterval(() => ticks++, 5);
+        let settled = false;
+        const waiting = store.claim([{ taskId: 'b', runAt: 1 }]).then(results => {
+            settled = true;
+            return results;
+        });
+        await new Promise(resolve => setTimeout(resolve, 100));
+        const settledWhileHeld = settled;
+        fs.rmSync(lockFile);
+        const [live] = await waiting;
+        clearInterval(ticker);
+        
+        console.log(JSON.stringify({ stale: stale.status, live: live.status, settledWhileHeld, ticks, lockLeft: fs.existsSync(lockFile) }));
+    })();
+    """ % json.dumps(str(tmp_path / 'leases'))
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0, f"Script failed: {result.stderr}"
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['stale'] == 'granted'
+        assert data['live'] == 'granted'
+        assert data['settledWhileHeld'] is False
+        assert data['ticks'] >= 10
+        assert data['lockLeft'] is False
+
+
+def test_task_options_survive_journal_restore(tmp_path):
+    """
+    Test that per-task options are restored from both the journal snapshot
+    and the journal tail after a restart.
+    """
+    script = """
+    const { TaskScheduler } = require('./dist/scheduler/TaskScheduler');
+    const { SchedulerJournal } = require('./dist/scheduler/SchedulerJournal');
+    
+    const directory = %s;
+    const resolveHandler = () => async () => {};
+    const first = new TaskScheduler({ journal: new SchedulerJournal({ directory, snapshotEvery: 2 }), resolveHandler });
+    const later = new Date(Date.now() + 60000);
+    first.schedule({ id: 'full', name: 'full', executeAt: later, priority: 1, handler: resolveHandler(), retry: { maxAttempts: 4, baseDelayMs: 50, maxDelayMs: 400, jitter: 0.5 }, timeoutMs: 250, slackMs: 20 });
+    first.schedule({ id: 'plain', name: 'plain', executeAt: later, priority: 1, handler: resolveHandler() });
+    first.schedule({ id: 'tail', name: 'tail', executeAt: later, priority: 1, handler: resolveHandler(), retry: { maxAttempts: 2, baseDelayMs: 10 }, timeoutMs: 75, slackMs: 0 });
+    first.stop();
+    
+    const restored = new TaskScheduler({ journal: new SchedulerJournal({ directory }), resolveHandler });
+    const options = {};
+    for (const task of restored.getPendingTasks()) {
+        options[task.id] = { retry: task.retry ?? null, timeoutMs: task.timeoutMs ?? null, slackMs: task.slackMs ?? null };
+    }
+    console.log(JSON.stringify(options));
+    """ % json.dumps(str(tmp_path / 'journal'))
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0, f"Script failed: {result.stderr}"
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['full'] == {'retry': {'maxAttempts': 4, 'baseDelayMs': 50, 'maxDelayMs': 400, 'jitter': 0.5}, 'timeoutMs': 250, 'slackMs': 20}
+        assert data['plain'] == {'retry': None, 'timeoutMs': None, 'slackMs': None}
+        assert data['tail'] == {'retry': {'maxAttempts': 2, 'baseDelayMs': 10}, 'timeoutMs': 75, 'slackMs': 0}
+
+
+def test_lease_store_failures_are_retried(tmp_path):
+    """
+    Test that claim and complete failures in the lease store do not stop the
+    scheduler: the run is claimed and settled again on a later poll and the
+    scheduler can be stopped and restarted afterwards.
+    """
+    script = """
+    const fs = require('fs');
+    const path = require('path');
+    const { TaskScheduler } = require('./dist/scheduler/TaskScheduler');
+    const { LeaseStore } = require('./dist/scheduler/LeaseStore');
+    
+    const directory = %s;
+    const store = new LeaseStore({ directory });
+    const failures = { claim: 2, complete: 2 };
+    for (const op of Object.keys(failures)) {
+        const original = store[op].bind(store);
+        store[op] = (...args) => failures[op]-- > 0 ? Promise.reject(new Error(`${op} failed`)) : original(...args);
+    }
+    const runs = [];
+    const scheduler = new TaskScheduler({ pollInterval: 5, leases: store });
+    const task = id => ({ id, name: id, executeAt: new Date(), priority: 1, handler: async () => { runs.push(id); } });
+    scheduler.schedule(task('first'));
+    
+    (async () => {
+        let startPromise = scheduler.start();
+        await new Promise(resolve => setTimeout(resolve, 150));
+        scheduler.stop();
+        const firstStart = await startPromise.then(() => 'resolved', error => error.message);
+        const records = JSON.parse(fs.readFileSync(path.join(directory, 'leases.json'), 'utf-8'));
+        
+        scheduler.schedule(task('second'));
+        startPromise = scheduler.start();
+        await new Promise(resolve => setTimeout(resolve, 100));
+        scheduler.stop();
+        await startPromise;
+        console.log(JSON.stringify({ runs, firstStart, firstDone: records.first.done, pending: scheduler.pendingCount() }));
+    })();
+    """ % json.dumps(str(tmp_path / 'leases'))
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0, f"Script failed: {result.stderr}"
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['runs'] == ['first', 'second']
+        assert data['firstStart'] == 'resolved'
+        assert data['firstDone'] is True
+        assert data['pending'] == 0
+
+
+def test_journal_syncs_before_truncating(tmp_path):
+    """
+    Test that flushed journal batches are synced to disk and that a snapshot
+    is synced and its rename made durable before the journal is truncated.
+    """
+    script = """
+    const fs = require('fs');
+    const calls = [];
+    for (const name of ['writeSync', 'fsyncSync', 'fdatasyncSync', 'renameSync', 'ftruncateSync']) {
+        const original = fs[name];
+        fs[name] = (...args) => {
+            calls.push(name);
+            return original(...args);
+        };
+    }
+    require('module').syncBuiltinESMExports();
+    const { TaskScheduler } = require('./dist/scheduler/TaskScheduler');
+    const { SchedulerJournal } = require('./dist/scheduler/SchedulerJournal');
+    
+    const journal = new SchedulerJournal({ directory: %s, snapshotEvery: 2 });
+    journal.recordCancel('a');
+    journal.flush();
+    const afterFlush = calls.splice(0);
+    journal.recordCancel('b');
+    journal.close();
+    console.log(JSON.stringify({ afterFlush, snapshot: calls }));
+    """ % json.dumps(str(tmp_path / 'journal'))
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0, f"Script failed: {result.stderr}"
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['afterFlush'][-2:] == ['writeSync', 'fdatasyncSync']
+        assert data['snapshot'] == ['writeSync', 'fdatasyncSync', 'writeSync', 'fsyncSync', 'renameSync', 'fsyncSync', 'ftruncateSync', 'fsyncSync']
+
+
+def test_wheel_pages_pick_only_the_requested_tasks():
+    """
+    Test that small pages over the timing wheel follow getPendingTasks order,
+    including runs of tasks tied on time and priority, and that a page is
+    picked without sorting the wheel.
+    """
+    script = """
+    const { TaskScheduler } = require('./dist/scheduler/TaskScheduler');
+    
+    const scheduler = new TaskScheduler({ timeIndex: 'wheel' });
+    const now = Date.now();
+    for (let i = 0; i < 60; i++) {
+        scheduler.schedule({ id: `t_${i}`, name: 'task', executeAt: new Date(now + 5000 + (i %% 4) * 10), priority: i %% 2, handler: async () => {} });
+    }
+    const expected = scheduler.getPendingTasks().map(task => task.id);
+    const paged = [];
+    let after;
+    for (;;) {
+        const page = Array.from(scheduler.pendingTasks({ limit: 4, after }), task => task.id);
+        if (page.length === 0) {
+            break;
+        }
+        paged.push(...page);
+        after = page[page.length - 1];
+    }
+    
+    let sorts = 0;
+    const originalSort = Array.prototype.sort;
+    Array.prototype.sort = function (...args) {
+        sorts++;
+        return originalSort.apply(this, args);
+    };
+    const firstPage = Array.from(scheduler.pendingTasks({ limit: 10 }), task => task.id);
+    Array.prototype.sort = originalSort;
+    
+    console.log(JSON.stringify({ matches: JSON.stringify(paged) === JSON.stringify(expected), firstPage, expectedFirst: expected.slice(0, 10), sorts }));
+    """.replace('%%', '%')
+    
+    result = subprocess.run(
+        ['node', '-e', script],
+        capture_output=True,
+        text=True,
+        timeout=5,
+        cwd=os.path.join(os.path.dirname(__file__), '../..')
+    )
+    
+    assert result.returncode == 0, f"Script failed: {result.stderr}"
+    output = result.stdout.strip()
+    if output:
+        data = json.loads(output.split('\n')[-1])
+        assert data['matches'] is True
+        assert data['firstPage'] == data['expectedFirst']
+        assert data['sorts'] == 0